@@ -0,0 +1,146 @@
+from typing import Any, Dict, List, Optional
+
+
+def format_response_routes(
+    routes_with_scores: List[Dict[str, Any]],
+    best_route_id: str,
+    include_geojson: bool = True
+) -> List[Dict[str, Any]]:
+    """
+    Format scored routes for the frontend (Google Maps-like overview_path and legs).
+    include_geojson=False drops the duplicate `geojson` copy of the geometry.
+    """
+    response_routes = []
+    for route in routes_with_scores:
+        # Label route based on whether it's the chosen best route
+        if route["id"] == best_route_id:
+            route_type = "recommended"
+        else:
+            route_type = "alternative"
+        geometry = route["geojson"]
+        coordinates = geometry.get("coordinates", [])
+
+        # Convert GeoJSON coordinates [lon, lat] to overview_path [{lat, lng}]
+        overview_path = [
+            {"lat": coord[1], "lng": coord[0]}  # GeoJSON is [lon, lat], we need {lat, lng}
+            for coord in coordinates
+        ]
+
+        # Create legs structure (one leg for the entire route)
+        distance_m = route["distance_m"]
+        duration_s = route.get("duration_s", int(distance_m / 1.4))  # Estimate: ~1.4 m/s walking speed
+
+        # Format distance and duration like Google Maps
+        if distance_m >= 1000:
+            distance_text = f"{distance_m/1000:.1f} km"
+        else:
+            distance_text = f"{int(distance_m)} m"
+
+        duration_mins = duration_s // 60
+        if duration_mins > 0:
+            duration_text = f"{duration_mins} mins"
+        else:
+            duration_text = f"{duration_s} secs"
+
+        # Get start and end locations
+        start_coord = coordinates[0] if coordinates else [0, 0]
+        end_coord = coordinates[-1] if coordinates else [0, 0]
+
+        # Create legs array (one leg for entire route)
+        legs = [{
+            "start_location": {"lat": start_coord[1], "lng": start_coord[0]},
+            "end_location": {"lat": end_coord[1], "lng": end_coord[0]},
+            "distance": {"text": distance_text, "value": int(distance_m)},
+            "duration": {"text": duration_text, "value": int(duration_s)},
+            "steps": []  # We don't have turn-by-turn from ORS
+        }]
+
+        formatted = {
+            "id": route["id"],
+            "type": route_type,  # "recommended" or "alternative" based on scoring
+            "overview_path": overview_path,  # Frontend format
+            "legs": legs,  # Frontend format
+            "distance_m": distance_m,
+            "score": route["score"].total_score,
+            "metrics": route["metrics"],
+        }
+        if include_geojson:
+            formatted["geojson"] = geometry  # Keep original for reference
+        response_routes.append(formatted)
+
+    return response_routes
+
+
+GEOMETRY_ENCODINGS = ("polyline", "quantized")
+
+
+def encode_polyline(coordinates: List[List[float]], precision: int = 5) -> str:
+    """
+    Google encoded polyline of GeoJSON [lon, lat] coordinates (lat first, as
+    the format expects). precision=5 matches the Google Maps JS decoder.
+    """
+    factor = 10 ** precision
+    out = []
+    prev_lat = prev_lng = 0
+    for coord in coordinates:
+        lat = int(round(coord[1] * factor))
+        lng = int(round(coord[0] * factor))
+        for delta in (lat - prev_lat, lng - prev_lng):
+            value = ~(delta << 1) if delta < 0 else delta << 1
+            while value >= 0x20:
+                out.append(chr((0x20 | (value & 0x1F)) + 63))
+                value >>= 5
+            out.append(chr(value + 63))
+        prev_lat, prev_lng = lat, lng
+    return "".join(out)
+
+
+def quantize_coordinates(coordinates: List[List[float]], precision: int = 6) -> List[int]:
+    """
+    Flat delta-encoded integers [lat0, lng0, dlat1, dlng1, ...] scaled by
+    10**precision; decode with a running sum divided by the same factor.
+    """
+    factor = 10 ** precision
+    out: List[int] = []
+    prev_lat = prev_lng = 0
+    for coord in coordinates:
+        lat = int(round(coord[1] * factor))
+        lng = int(round(coord[0] * factor))
+        out.append(lat - prev_lat)
+        out.append(lng - prev_lng)
+        prev_lat, prev_lng = lat, lng
+    return out
+
+
+def format_compact_routes(
+    routes_with_scores: List[Dict[str, Any]],
+    best_route_id: str,
+    encoding: str = "polyline",
+    precision: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Compact route format: one encoded copy of the geometry and no per-coordinate dicts.
+    """
+    if encoding not in GEOMETRY_ENCODINGS:
+        raise ValueError(f"encoding must be one of {', '.join(GEOMETRY_ENCODINGS)}")
+    if precision is None:
+        precision = 5 if encoding == "polyline" else 6
+    encode = encode_polyline if encoding == "polyline" else quantize_coordinates
+
+    compact_routes = []
+    for route in routes_with_scores:
+        distance_m = route["distance_m"]
+        compact_routes.append({
+            "id": route["id"],
+            "type": "recommended" if route["id"] == best_route_id else "alternative",
+            "distance_m": distance_m,
+            "duration_s": route.get("duration_s", int(distance_m / 1.4)),
+            "score": route["score"].total_score,
+            "metrics": route["metrics"],
+            "geometry": {
+                "encoding": encoding,
+                "precision": precision,
+                "value": encode(route["geojson"].get("coordinates", []), precision),
+            },
+        })
+    return compact_routes
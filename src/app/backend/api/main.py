@@ -1,26 +1,72 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Tuple
+from pydantic import BaseModel, Field
+from typing import Callable, List, Optional, Tuple
+from contextlib import asynccontextmanager
+import asyncio
+import gzip
 import sys
 import os
+import uuid
 from pathlib import Path
 
 # Add services to path
 backend_dir = Path(__file__).parent.parent
 sys.path.insert(0, str(backend_dir))
 
-from services.routing.ors_service import get_route_alternatives
-from services.routing.route_sampler import sample_route_points, calculate_bearing
-from services.scoring.wind_service import get_wind_data
-from services.scoring.wind_calculator import calculate_headwind_factor, calculate_wind_cost
-from services.scoring.route_scorer import RouteScorer, RouteMetrics
+from services import config  # loads .env once, before the services read their settings
+from services.routing.ors_service import get_route_alternatives, get_walking_matrix
+from services.routing.waypoints import comfort_cost_matrix, plan_stop_order
+from services.routing import candidates
+from services.routing.route_sampler import (
+    ROUTE_RESPONSE_SIMPLIFY_TOLERANCE_M, ROUTE_SIMPLIFY_TOLERANCE_M, sample_route_points, simplify_geometry,
+)
+from services.scoring.wind_service import MAX_FORECAST_HOURS, get_wind_data, get_wind_forecast
+from services.routing.adaptive_sampler import ROUTE_SAMPLING, adaptive_sample_route_points, segment_weights
+from services.scoring.route_metrics import WindExposureProfile, collect_route_segments, compute_route_costs
+from services.scoring.route_scorer import SCORING_PROFILES, RouteScorer, RouteMetrics
+from services.scoring import route_sets
 from services.buildings import BuildingService
 from services.snow import SnowService
 from services.scoring.mock_services import MockBuildingService, MockSnowService
-from services.scoring.gemini import generate_route_explanation
+from services.scoring.shared_lookups import SharedBuildingLookups, SharedSnowLookups
+from services.scoring.gemini import _fallback as fallback_route_explanation, generate_route_explanation
+from services import capture, deadline, disk_cache, heatmap, jobs, live_session, prewarm, shelter_index, snow_tiles, startup
+from services import snow as snow_module
+from services.resilience import breaker_states
+from services.upstream_scheduler import PRIORITY_INTERACTIVE, request_context, scheduler
+from api.formatting import GEOMETRY_ENCODINGS, format_compact_routes, format_response_routes
+from api.payload import CompressionMiddleware, dumps, json_response
+
+ADMIN_TOKEN = os.getenv("FROSTBYTE_ADMIN_TOKEN")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Multi-worker mode: map the host's shared geobase snapshot if one is already published
+    snow_module.attach_shared_snapshot()
+    # Directional shelter index (FROSTBYTE_SHELTER_INDEX), memory-mapped
+    shelter_index.load()
+    # Dataset loading and client warmup; /readyz stays 503 until the datasets are in
+    warmup_task = asyncio.create_task(startup.warm_up())
+    # Cache prewarming runs in the background so startup isn't blocked on upstreams
+    prewarm_task = asyncio.create_task(prewarm.prewarm_forever())
+    # Heatmap snapshot/wind refresh and coarse tile rendering
+    heatmap_task = asyncio.create_task(heatmap.refresh_forever())
+    # Snow vector tiles are rebuilt after each planif refresh
+    snow_tiles_task = asyncio.create_task(snow_tiles.refresh_forever())
+    # Worker pool for /jobs (long routes and batches)
+    jobs.start_workers()
+    yield
+    jobs.stop_workers()
+    warmup_task.cancel()
+    prewarm_task.cancel()
+    heatmap_task.cancel()
+    snow_tiles_task.cancel()
+    # Commit the disk cache's queued writes
+    await asyncio.to_thread(disk_cache.close)
 
-app = FastAPI(title="Frost Byte API", version="1.0.0")
+app = FastAPI(title="Frost Byte API", version="1.0.0", lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -36,27 +82,118 @@ scorer = RouteScorer()
 building_service = BuildingService()  # Real service
 snow_service = SnowService()  # Real service
 
+# Optional traffic capture (FROSTBYTE_CAPTURE_PATH) for benchmarks/replay.py
+if capture.CAPTURE_PATH:
+    app.add_middleware(capture.CaptureMiddleware, path=capture.CAPTURE_PATH)
+    building_service = capture.CapturingBuildingService(building_service)
+    snow_service = capture.CapturingSnowService(snow_service)
+    get_route_alternatives = capture.capturing(get_route_alternatives, "ors")
+    get_wind_data = capture.capturing(get_wind_data, "wind")
+
+# Lookups honour the request's latency budget, if it has one (services/deadline.py)
+building_service = deadline.BudgetedBuildingService(building_service)
+snow_service = deadline.BudgetedSnowService(snow_service)
+
+# gzip (or brotli when installed) for large responses; added last so capture sees plain bodies
+app.add_middleware(CompressionMiddleware)
+
+COMPACT_MEDIA_TYPE = "application/vnd.frostbyte.compact+json"
+MAX_WAYPOINTS = int(os.getenv("FROSTBYTE_MAX_WAYPOINTS", "10"))
+
 class RouteRequest(BaseModel):
     start: List[float]  # [lon, lat]
     end: List[float]    # [lon, lat]
+    budget_ms: Optional[int] = Field(None, ge=100, le=60000)  # lookup deadline; default FROSTBYTE_ROUTE_BUDGET_S
+
+def _budget_s(request: RouteRequest, default: Optional[float]) -> Optional[float]:
+    if request.budget_ms is not None:
+        return request.budget_ms / 1000
+    return default if default and default > 0 else None
 
 class RouteResponse(BaseModel):
     routes: List[dict]
     chosen_route_id: str
     wind: dict
     explanation: dict 
+    route_set_id: Optional[str] = None  # for /route/rerank
+    data_coverage: Optional[float] = None  # share of samples from real lookups (with a budget)
+    coverage: Optional[dict] = None
 
 @app.post("/route", response_model=RouteResponse)
-async def compute_routes(request: RouteRequest):
+async def compute_routes(
+    request: RouteRequest,
+    format: str = Query("default", description="'default' or 'compact'"),
+    encoding: str = Query("polyline", description="compact geometry: 'polyline' or 'quantized'"),
+    precision: Optional[int] = Query(None, ge=0, le=7, description="compact geometry decimals (default 5 polyline, 6 quantized)"),
+    omit_geojson: bool = Query(False, description="default format: drop the duplicate geojson copy"),
+    accept: Optional[str] = Header(None),
+):
     """
     Compute walking routes with wind and snow awareness.
+
+    The compact format (?format=compact or Accept: application/vnd.frostbyte.compact+json)
+    sends each geometry once as an encoded polyline or delta-encoded integers.
     """
+    compact = format == "compact" or (accept is not None and COMPACT_MEDIA_TYPE in accept)
+    if compact and encoding not in GEOMETRY_ENCODINGS:
+        raise HTTPException(status_code=422, detail=f"encoding must be one of {', '.join(GEOMETRY_ENCODINGS)}")
+    result = await route_request(request)
+    if not compact:
+        return route_response(result, include_geojson=not omit_geojson)
+    # Straight from the scored routes: no overview_path dicts, no pydantic model
+    return json_response({
+        "format": "compact",
+        "routes": format_compact_routes(result["routes_with_scores"], result["chosen_route_id"], encoding, precision),
+        "chosen_route_id": result["chosen_route_id"],
+        "wind": result["wind"],
+        "explanation": result["explanation"],
+        "route_set_id": result["route_set_id"],
+        "data_coverage": result["data_coverage"],
+        "coverage": result["coverage"],
+    }, headers={"Vary": "Accept"})
+
+async def route_request(request: RouteRequest) -> dict:
+    """One interactive route computation, as /route runs it (also used by benchmarks/replay.py)."""
+    # Each request is its own flow in the upstream scheduler's fair queue
+    with request_context(flow_id=uuid.uuid4().hex, priority=PRIORITY_INTERACTIVE), \
+            deadline.request_budget(_budget_s(request, deadline.ROUTE_BUDGET_S)):
+        return await _compute_routes(request)
+
+def route_response(result: dict, include_geojson: bool = True) -> RouteResponse:
+    """The default /route body for a _compute_routes result."""
+    return RouteResponse(
+        routes=format_response_routes(result["routes_with_scores"], result["chosen_route_id"], include_geojson),
+        chosen_route_id=result["chosen_route_id"],
+        wind=result["wind"],
+        explanation=result["explanation"],
+        route_set_id=result["route_set_id"],
+        data_coverage=result["data_coverage"],
+        coverage=result["coverage"],
+    )
+
+async def _sample_route(geometry: dict, buildings=None) -> Tuple[List[Tuple[float, float]], Optional[List[float]]]:
+    """Sampled points and per-segment weights (None for fixed 40 m sampling)."""
+    # Optionally drop near-collinear vertices so sampling follows the 40 m interval
+    sample_geometry = simplify_geometry(geometry, ROUTE_SIMPLIFY_TOLERANCE_M)
+    if ROUTE_SAMPLING == "adaptive":
+        # Coarse samples refined where shelter changes; weighted so costs keep the 40 m scale
+        sampled_points = await adaptive_sample_route_points(
+            sample_geometry, interval_m=40.0, building_service=buildings or building_service
+        )
+        return sampled_points, segment_weights(sampled_points, interval_m=40.0)
+    return sample_route_points(sample_geometry, interval_m=40.0), None
+
+async def _compute_routes(
+    request: RouteRequest,
+    progress: Optional[Callable[[int, int], None]] = None
+):
+    """Scored routes plus wind, explanation and coverage; callers format the body (route_response or compact)."""
     try:
         start = tuple(request.start)
         end = tuple(request.end)
         
-        # 1. Get route alternatives from ORS
-        alternatives = get_route_alternatives(start, end)
+        # 1. Get route alternatives from ORS (sync clients run in threads so the loop keeps serving)
+        alternatives = await asyncio.to_thread(get_route_alternatives, start, end)
         
         if not alternatives:
             raise HTTPException(status_code=404, detail="No routes found")
@@ -64,7 +201,7 @@ async def compute_routes(request: RouteRequest):
         # 2. Get wind data (use midpoint of first route)
         midpoint_lat = (start[1] + end[1]) / 2
         midpoint_lon = (start[0] + end[0]) / 2
-        wind_data = get_wind_data(midpoint_lat, midpoint_lon)
+        wind_data = await asyncio.to_thread(get_wind_data, midpoint_lat, midpoint_lon)
         
         # 3. Process each route
         routes_with_scores = []
@@ -74,8 +211,8 @@ async def compute_routes(request: RouteRequest):
             distance_m = route["distance_m"]
             duration_s = route.get("duration_s", int(distance_m / 1.4))  # Get from ORS or estimate
             
-            # Sample points
-            sampled_points = sample_route_points(geometry, interval_m=40.0)
+            sampled_points, weights = await _sample_route(geometry)
+            geometry = simplify_geometry(geometry, ROUTE_RESPONSE_SIMPLIFY_TOLERANCE_M)
             
             # Calculate metrics
             '''wind_cost = 0.0
@@ -114,51 +251,9 @@ async def compute_routes(request: RouteRequest):
                 
                 # Add snow cost
                 snow_cost += snow["risk"]'''
-                            # Calculate metrics
-            wind_cost = 0.0
-            snow_cost = 0.0
-            
-            # Track last snow status (update every 20 points)
-            last_snow = None
-            
-            for i in range(len(sampled_points) - 1):
-                point = sampled_points[i]
-                next_point = sampled_points[i + 1]
-                
-                # Get building density (Person 3)
-                building = await building_service.get_building_density(
-                    point[1], point[0]  # lat, lon
-                )
-                
-                # Get snow status (Person 3) - only every 20 points
-                if i % 20 == 0 or last_snow is None:
-                    # Update snow status every 20 points
-                    last_snow = await snow_service.get_snow_status(
-                        point[1], point[0]  # lat, lon
-                    )
-                
-                # Use the last known snow status
-                snow = last_snow
-                
-                # Calculate bearing
-                bearing = calculate_bearing(point, next_point)
-                
-                # Calculate headwind
-                headwind = calculate_headwind_factor(
-                    bearing,
-                    wind_data["direction"],
-                    wind_data["speed"]
-                )
-                
-                # Calculate wind cost
-                segment_wind_cost = calculate_wind_cost(
-                    headwind,
-                    building["shelter_score"]
-                )
-                wind_cost += segment_wind_cost
-                
-                # Add snow cost
-                snow_cost += snow["risk"]
+            wind_cost, snow_cost = await compute_route_costs(
+                sampled_points, wind_data, building_service, snow_service, weights
+            )
             
             # Score route
             metrics = RouteMetrics(
@@ -182,80 +277,48 @@ async def compute_routes(request: RouteRequest):
                     "snow_cost": metrics.snow_cost
                 }
             })
+            if progress is not None:
+                progress(idx + 1, len(alternatives))
         
         # 4. Choose best route (lowest score = best route)
         best_route = scorer.choose_best_route(routes_with_scores)
+        # Keep the raw metrics so /route/rerank can re-score them under other weights
+        route_set_id = route_sets.store_route_set(routes_with_scores)
         
-        # 5. Format response for frontend
-        response_routes = []
-        for route in routes_with_scores:
-            # Label route based on whether it's the chosen best route
-            if route["id"] == best_route["id"]:
-                route_type = "recommended"
-            else:
-                route_type = "alternative"
-            geometry = route["geojson"]
-            coordinates = geometry.get("coordinates", [])
-            
-            # Convert GeoJSON coordinates [lon, lat] to overview_path [{lat, lng}]
-            overview_path = [
-                {"lat": coord[1], "lng": coord[0]}  # GeoJSON is [lon, lat], we need {lat, lng}
-                for coord in coordinates
-            ]
-            
-            # Create legs structure (one leg for the entire route)
-            distance_m = route["distance_m"]
-            duration_s = route.get("duration_s", int(distance_m / 1.4))  # Estimate: ~1.4 m/s walking speed
-            
-            # Format distance and duration like Google Maps
-            if distance_m >= 1000:
-                distance_text = f"{distance_m/1000:.1f} km"
-            else:
-                distance_text = f"{int(distance_m)} m"
-            
-            duration_mins = duration_s // 60
-            if duration_mins > 0:
-                duration_text = f"{duration_mins} mins"
-            else:
-                duration_text = f"{duration_s} secs"
-            
-            # Get start and end locations
-            start_coord = coordinates[0] if coordinates else [0, 0]
-            end_coord = coordinates[-1] if coordinates else [0, 0]
-            
-            # Create legs array (one leg for entire route)
-            legs = [{
-                "start_location": {"lat": start_coord[1], "lng": start_coord[0]},
-                "end_location": {"lat": end_coord[1], "lng": end_coord[0]},
-                "distance": {"text": distance_text, "value": int(distance_m)},
-                "duration": {"text": duration_text, "value": int(duration_s)},
-                "steps": []  # We don't have turn-by-turn from ORS
-            }]
-            
-            response_routes.append({
-                "id": route["id"],
-                "type": route_type,  # "recommended" or "alternative" based on scoring
-                "overview_path": overview_path,  # Frontend format
-                "legs": legs,  # Frontend format
-                "distance_m": distance_m,
-                "score": route["score"].total_score,
-                "metrics": route["metrics"],
-                "geojson": geometry  # Keep original for reference
-            })
-        
-        # Get Gemini explanation
+        # 5. Get Gemini explanation (ids, labels and metrics are all it reads)
         gemini_payload = {
             "chosen_route_id": best_route["id"],
-            "routes": response_routes
+            "routes": [
+                {
+                    "id": r["id"],
+                    "type": "recommended" if r["id"] == best_route["id"] else "alternative",
+                    "metrics": r["metrics"],
+                }
+                for r in routes_with_scores
+            ]
         }
-        explanation = generate_route_explanation(gemini_payload)
+        budget = deadline.current()
+        if budget is None:
+            explanation = await asyncio.to_thread(generate_route_explanation, gemini_payload)
+        else:
+            try:
+                explanation = await asyncio.wait_for(
+                    asyncio.to_thread(generate_route_explanation, gemini_payload), max(budget.remaining(), 0)
+                )
+            except asyncio.TimeoutError:
+                explanation = fallback_route_explanation(gemini_payload)
+        data_coverage = budget.coverage() if budget is not None else None
+        coverage = budget.summary() if budget is not None else None
         
-        return RouteResponse(
-            routes=response_routes,
-            chosen_route_id=best_route["id"],
-            wind=wind_data,
-            explanation=explanation,
-        )
+        return {
+            "routes_with_scores": routes_with_scores,
+            "chosen_route_id": best_route["id"],
+            "wind": wind_data,
+            "explanation": explanation,
+            "route_set_id": route_set_id,
+            "data_coverage": data_coverage,
+            "coverage": coverage,
+        }
     
     except Exception as e:
         import traceback
@@ -265,10 +328,575 @@ async def compute_routes(request: RouteRequest):
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=error_detail)
 
+class RerankWeights(BaseModel):
+    distance: float = Field(1.0, ge=0)
+    wind: float = Field(20.0, ge=0)
+    snow: float = Field(50.0, ge=0)
+
+class RerankRequest(BaseModel):
+    route_set_id: str
+    profile: Optional[str] = None            # a name from SCORING_PROFILES
+    weights: Optional[RerankWeights] = None  # overrides the profile
+
+@app.post("/route/rerank")
+async def rerank_routes(request: RerankRequest):
+    """
+    Re-rank the routes of an earlier /route call (by its route_set_id) under
+    other weights, from stored metrics only.
+    """
+    routes = route_sets.get_route_set(request.route_set_id)
+    if routes is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired route_set_id")
+    if request.weights is not None:
+        weights = request.weights.model_dump()
+    elif request.profile is not None:
+        if request.profile not in SCORING_PROFILES:
+            raise HTTPException(status_code=422, detail=f"profile must be one of {', '.join(SCORING_PROFILES)}")
+        weights = SCORING_PROFILES[request.profile]
+    else:
+        weights = SCORING_PROFILES["default"]
+    custom_scorer = RouteScorer(weights["distance"], weights["wind"], weights["snow"])
+    return {"route_set_id": request.route_set_id, "weights": weights, **route_sets.rerank(routes, custom_scorer)}
+
+@app.get("/route/profiles")
+async def scoring_profiles():
+    return SCORING_PROFILES
+
+class DepartureRequest(BaseModel):
+    start: List[float]  # [lon, lat]
+    end: List[float]    # [lon, lat]
+    hours: int = Field(12, ge=1, le=MAX_FORECAST_HOURS)  # departure times to consider, hourly from now
+    window_hours: int = Field(1, ge=1, le=MAX_FORECAST_HOURS)  # length of the departure window to recommend
+
+@app.post("/route/departure")
+async def departure_times(request: DepartureRequest):
+    """
+    Score every route alternative at each forecast hour and recommend when to leave.
+
+    Shelter and snow are looked up once per route; each extra hour only re-scores
+    a binned wind-exposure profile (see WindExposureProfile).
+    """
+    with request_context(flow_id=uuid.uuid4().hex, priority=PRIORITY_INTERACTIVE):
+        return await _departure_times(request)
+
+async def _departure_times(request: DepartureRequest):
+    start = tuple(request.start)
+    end = tuple(request.end)
+    alternatives = await asyncio.to_thread(get_route_alternatives, start, end)
+    if not alternatives:
+        raise HTTPException(status_code=404, detail="No routes found")
+
+    try:
+        forecast = await asyncio.to_thread(
+            get_wind_forecast, (start[1] + end[1]) / 2, (start[0] + end[0]) / 2, request.hours
+        )
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Wind forecast unavailable: {e}")
+    if not forecast:
+        raise HTTPException(status_code=502, detail="Wind forecast unavailable")
+
+    routes = []
+    for idx, route in enumerate(alternatives):
+        sampled_points, weights = await _sample_route(route["geometry"])
+        segments, snow_cost = await collect_route_segments(sampled_points, building_service, snow_service, weights)
+        routes.append({
+            "id": f"route_{idx}",
+            "distance_m": route["distance_m"],
+            "duration_s": route.get("duration_s", int(route["distance_m"] / 1.4)),
+            "snow_cost": snow_cost,
+            "profile": WindExposureProfile(segments, sampled_points),
+        })
+
+    hours = []
+    for hour in forecast:
+        scores = {
+            r["id"]: scorer.score_route(RouteMetrics(
+                distance_m=r["distance_m"],
+                wind_cost=r["profile"].wind_cost(hour["speed"], hour["direction"]),
+                snow_cost=r["snow_cost"],
+            )).total_score
+            for r in routes
+        }
+        best_id = min(scores, key=scores.get)
+        hours.append({
+            "time": hour["time"],
+            "wind": {"speed": hour["speed"], "direction": hour["direction"]},
+            "best_route_id": best_id,
+            "score": scores[best_id],
+            "scores": scores,
+        })
+
+    window = min(request.window_hours, len(hours))
+    window_means = [
+        sum(h["score"] for h in hours[i:i + window]) / window
+        for i in range(len(hours) - window + 1)
+    ]
+    best_start = window_means.index(min(window_means))
+    best_hour = min(hours, key=lambda h: h["score"])
+    return {
+        "routes": [{k: v for k, v in r.items() if k != "profile"} for r in routes],
+        "hours": hours,
+        "now": {"time": hours[0]["time"], "route_id": hours[0]["best_route_id"], "score": hours[0]["score"]},
+        "best_departure": {"time": best_hour["time"], "route_id": best_hour["best_route_id"], "score": best_hour["score"]},
+        "best_window": {
+            "start": hours[best_start]["time"],
+            "end": hours[best_start + window - 1]["time"],
+            "hours": window,
+            "mean_score": window_means[best_start],
+        },
+    }
+
+async def _score_shared(route_id: str, route: dict, wind_data: dict, buildings, snow) -> dict:
+    """Score one ORS route through a request's shared lookup set (see shared_lookups.py)."""
+    sampled_points, weights = await _sample_route(route["geometry"], buildings)
+    wind_cost, snow_cost = await compute_route_costs(sampled_points, wind_data, buildings, snow, weights)
+    metrics = RouteMetrics(distance_m=route["distance_m"], wind_cost=wind_cost, snow_cost=snow_cost)
+    return {
+        "id": route_id,
+        "geojson": simplify_geometry(route["geometry"], ROUTE_RESPONSE_SIMPLIFY_TOLERANCE_M),
+        "distance_m": route["distance_m"],
+        "duration_s": route.get("duration_s", int(route["distance_m"] / 1.4)),
+        "score": scorer.score_route(metrics),
+        "metrics": {"distance_m": metrics.distance_m, "wind_cost": wind_cost, "snow_cost": snow_cost},
+    }
+
+@app.post("/route/candidates")
+async def candidate_routes(
+    request: RouteRequest,
+    omit_geojson: bool = Query(False, description="drop the duplicate geojson copy"),
+):
+    """
+    Wider search than /route: several concurrent ORS queries (other alternative
+    settings, via points through sheltered cells), near-duplicates removed, all
+    unique candidates scored through one shared lookup set. Returns the Pareto
+    front of distance vs wind vs snow, with the best-scoring route chosen.
+    """
+    with request_context(flow_id=uuid.uuid4().hex, priority=PRIORITY_INTERACTIVE), \
+            deadline.request_budget(_budget_s(request, deadline.ROUTE_BUDGET_S)) as budget:
+        result = await _candidate_routes(request, include_geojson=not omit_geojson)
+    if budget is not None:
+        result["data_coverage"] = budget.coverage()
+        result["coverage"] = budget.summary()
+    return result
+
+async def _candidate_routes(request: RouteRequest, include_geojson: bool = True):
+    start = tuple(request.start)
+    end = tuple(request.end)
+    wind_task = asyncio.create_task(
+        asyncio.to_thread(get_wind_data, (start[1] + end[1]) / 2, (start[0] + end[0]) / 2)
+    )
+    fetched, failed = await candidates.fetch_candidates(start, end, get_route_alternatives)
+    wind_data = await wind_task
+    if not fetched:
+        raise HTTPException(status_code=404, detail="No routes found")
+    unique = candidates.dedupe(fetched)
+
+    buildings = SharedBuildingLookups(building_service)
+    snow = SharedSnowLookups(snow_service)
+    scored = list(await asyncio.gather(*(
+        _score_shared(f"route_{i}", r, wind_data, buildings, snow) for i, r in enumerate(unique)
+    )))
+    for route, candidate in zip(scored, unique):
+        route["source"] = candidate["source"]
+
+    front = candidates.pareto_front(scored)
+    best_route = scorer.choose_best_route(front)
+    routes = format_response_routes(front, best_route["id"], include_geojson=include_geojson)
+    for formatted, route in zip(routes, front):
+        formatted["source"] = route["source"]
+    return {
+        "routes": routes,
+        "chosen_route_id": best_route["id"],
+        "wind": wind_data,
+        "candidates": {"fetched": len(fetched), "unique": len(unique), "pareto": len(front), "failed_queries": failed},
+        "lookups": {"buildings": buildings.stats(), "snow": snow.stats()},
+        "route_set_id": route_sets.store_route_set(scored),
+    }
+
+class MultiRouteRequest(BaseModel):
+    waypoints: List[List[float]] = Field(..., min_length=2, max_length=MAX_WAYPOINTS)  # [[lon, lat], ...] in visiting order
+    optimize_order: bool = False  # reorder intermediate stops; first and last stay fixed
+
+@app.post("/route/multi")
+async def compute_multi_route(
+    request: MultiRouteRequest,
+    omit_geojson: bool = Query(False, description="drop the duplicate geojson copy"),
+):
+    """
+    Comfort routing through an ordered list of waypoints.
+
+    Legs are fetched and scored concurrently. Wind is fetched once for the whole
+    trip, and all legs share one lookup set so a cell shared by two legs is only
+    looked up once. Returns every leg's alternatives (best one chosen) plus the
+    combined totals of the chosen alternatives.
+    """
+    with request_context(flow_id=uuid.uuid4().hex, priority=PRIORITY_INTERACTIVE):
+        return await _multi_route(request, include_geojson=not omit_geojson)
+
+async def _multi_route(request: MultiRouteRequest, include_geojson: bool = True):
+    waypoints = [tuple(w) for w in request.waypoints]
+    centroid_lat = sum(w[1] for w in waypoints) / len(waypoints)
+    centroid_lon = sum(w[0] for w in waypoints) / len(waypoints)
+    wind_data = await asyncio.to_thread(get_wind_data, centroid_lat, centroid_lon)
+
+    order = list(range(len(waypoints)))
+    if request.optimize_order and len(waypoints) > 3:
+        try:
+            matrix = await asyncio.to_thread(get_walking_matrix, waypoints)
+        except Exception as e:
+            raise HTTPException(status_code=502, detail=f"Routing matrix unavailable: {e}")
+        order = plan_stop_order(comfort_cost_matrix(waypoints, matrix["distances"], wind_data, scorer))
+    stops = [waypoints[i] for i in order]
+
+    buildings = SharedBuildingLookups(building_service)
+    snow = SharedSnowLookups(snow_service)
+
+    async def leg(start: Tuple[float, float], end: Tuple[float, float]) -> List[dict]:
+        alternatives = await asyncio.to_thread(get_route_alternatives, start, end)
+        if not alternatives:
+            raise HTTPException(status_code=404, detail=f"No routes found between {list(start)} and {list(end)}")
+        return await asyncio.gather(*(
+            _score_shared(f"route_{i}", r, wind_data, buildings, snow) for i, r in enumerate(alternatives)
+        ))
+
+    try:
+        legs_with_scores = await asyncio.gather(*(leg(a, b) for a, b in zip(stops, stops[1:])))
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"ERROR in /route/multi endpoint: {e!r}")
+        raise HTTPException(status_code=500, detail=str(e) or repr(e))
+
+    legs = []
+    totals = {"distance_m": 0.0, "duration_s": 0, "score": 0.0, "wind_cost": 0.0, "snow_cost": 0.0}
+    for (start, end), routes_with_scores in zip(zip(stops, stops[1:]), legs_with_scores):
+        best_route = scorer.choose_best_route(routes_with_scores)
+        legs.append({
+            "start": list(start),
+            "end": list(end),
+            "chosen_route_id": best_route["id"],
+            "routes": format_response_routes(routes_with_scores, best_route["id"], include_geojson=include_geojson),
+        })
+        totals["distance_m"] += best_route["distance_m"]
+        totals["duration_s"] += best_route["duration_s"]
+        totals["score"] += best_route["score"].total_score
+        totals["wind_cost"] += best_route["metrics"]["wind_cost"]
+        totals["snow_cost"] += best_route["metrics"]["snow_cost"]
+
+    return {
+        "order": order,
+        "waypoints": [list(w) for w in stops],
+        "legs": legs,
+        "total": totals,
+        "wind": wind_data,
+        "lookups": {"buildings": buildings.stats(), "snow": snow.stats()},
+    }
+
+@app.websocket("/route/live")
+async def live_route(websocket: WebSocket):
+    """
+    Live re-scoring while walking.
+
+    Client messages:
+        {"type": "start", "start": [lon, lat], "end": [lon, lat]}   (first message)
+        {"type": "position", "position": [lon, lat]}
+        {"type": "switch", "route_id": "route_1"}                    (accept a reroute)
+    Server messages:
+        {"type": "route", ...}    alternatives and the chosen one, after "start"
+        {"type": "status", ...}   remaining score after each position/switch
+        {"type": "update", "reason": "wind" | "snow", ...} when conditions ahead change
+    Status and update messages carry "reroute" when another alternative becomes
+    clearly better for the rest of the walk.
+    """
+    await websocket.accept()
+    try:
+        start_message = await websocket.receive_json()
+        if start_message.get("type") != "start":
+            await websocket.close(code=1008, reason="first message must be a start message")
+            return
+        with request_context(flow_id=uuid.uuid4().hex, priority=PRIORITY_INTERACTIVE):
+            session = await _start_live_session(tuple(start_message["start"]), tuple(start_message["end"]))
+    except WebSocketDisconnect:
+        return
+    except Exception as e:
+        await websocket.send_json({"type": "error", "detail": str(e) or repr(e)})
+        await websocket.close(code=1011)
+        return
+
+    await websocket.send_json({
+        "type": "route",
+        "chosen_route_id": session.chosen,
+        "routes": [
+            {"id": r.id, "samples": len(r.points), **r.remaining(0, session.wind)}
+            for r in session.routes.values()
+        ],
+        "wind": session.wind,
+    })
+
+    async def receive():
+        while True:
+            session.events.put_nowait(("client", await websocket.receive_json()))
+
+    async def refresh_wind():
+        start, end = session.routes[session.chosen].points[0], session.routes[session.chosen].points[-1]
+        while True:
+            await asyncio.sleep(live_session.LIVE_WIND_REFRESH_S)
+            try:
+                wind = await asyncio.to_thread(get_wind_data, (start[1] + end[1]) / 2, (start[0] + end[0]) / 2)
+                session.events.put_nowait(("wind", wind))
+            except Exception as e:
+                print(f"WARNING: live wind refresh failed: {e}")
+
+    tasks = [asyncio.create_task(receive()), asyncio.create_task(refresh_wind())]
+    try:
+        with session:
+            while True:
+                get_event = asyncio.create_task(session.events.get())
+                done, _ = await asyncio.wait([get_event, tasks[0]], return_when=asyncio.FIRST_COMPLETED)
+                if get_event not in done:
+                    get_event.cancel()
+                    tasks[0].result()  # re-raises the disconnect
+                kind, payload = get_event.result()
+                if kind == "client":
+                    reply = {"type": "status"}
+                    if payload.get("type") == "position":
+                        reply.update(session.update_position(tuple(payload["position"])))
+                    elif payload.get("type") == "switch":
+                        try:
+                            session.switch(payload.get("route_id"))
+                        except KeyError:
+                            await websocket.send_json({"type": "error", "detail": "unknown route_id"})
+                            continue
+                    else:
+                        await websocket.send_json({"type": "error", "detail": "unknown message type"})
+                        continue
+                    await websocket.send_json({**reply, **session.evaluate()})
+                elif kind == "wind" and session.update_wind(payload):
+                    await websocket.send_json({"type": "update", "reason": "wind", **session.evaluate()})
+                elif kind == "snow" and session.update_snow(payload):
+                    await websocket.send_json({"type": "update", "reason": "snow", **session.evaluate()})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def _start_live_session(start: Tuple[float, float], end: Tuple[float, float]) -> live_session.LiveSession:
+    alternatives = await asyncio.to_thread(get_route_alternatives, start, end)
+    if not alternatives:
+        raise ValueError("No routes found")
+    wind_data = await asyncio.to_thread(get_wind_data, (start[1] + end[1]) / 2, (start[0] + end[0]) / 2)
+
+    async def collect(idx: int, route: dict) -> live_session.LiveRoute:
+        sampled_points, weights = await _sample_route(route["geometry"])
+        live_route = live_session.LiveRoute(f"route_{idx}", sampled_points, route["distance_m"])
+        # snow_service results carry cote_rue_id, so snow changes can be re-read by street side
+        await live_route.collect(building_service, snow_service, weights)
+        return live_route
+
+    # Alternatives are looked up concurrently, so a cold start waits on the slowest one, not the sum
+    routes = await asyncio.gather(*(collect(idx, route) for idx, route in enumerate(alternatives)))
+    return live_session.LiveSession(list(routes), wind_data, scorer)
+
+@app.get("/tiles/comfort/{z}/{x}/{y}.png")
+async def comfort_tile(z: int, x: int, y: int, if_none_match: Optional[str] = Header(None)):
+    """
+    Comfort heatmap tile (shelter, snow risk and current wind), rendered from
+    cached data only; cells without cached data are transparent.
+    """
+    if not heatmap.MIN_ZOOM <= z <= heatmap.MAX_ZOOM or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise HTTPException(status_code=404, detail="Tile out of range")
+    png, etag = heatmap.get_tile(z, x, y)
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={int(heatmap.HEATMAP_REFRESH_S)}"}
+    if if_none_match == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=png, media_type="image/png", headers=headers)
+
+@app.get("/tiles/snow/{z}/{x}/{y}.mvt")
+async def snow_tile(
+    z: int,
+    x: int,
+    y: int,
+    if_none_match: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
+):
+    """
+    Planif-neige state per street side as a Mapbox vector tile (layer "snow"),
+    prebuilt after each planif refresh. 204 when the tile has no street sides.
+    """
+    if not snow_tiles.SNOW_TILES_GEOMETRY:
+        raise HTTPException(status_code=404, detail="Snow tiles are not configured")
+    if not snow_tiles.MIN_ZOOM <= z <= snow_tiles.MAX_ZOOM:
+        raise HTTPException(status_code=404, detail="Tile out of range")
+    tile = snow_tiles.get_tile(z, x, y)
+    if tile is None:
+        return Response(status_code=204)
+    body, etag = tile
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=60", "Vary": "Accept-Encoding"}
+    if if_none_match == etag:
+        return Response(status_code=304, headers=headers)
+    if accept_encoding is not None and "gzip" in accept_encoding:
+        headers["Content-Encoding"] = "gzip"
+    else:
+        body = gzip.decompress(body)
+    return Response(content=body, media_type="application/x-protobuf", headers=headers)
+
+JOB_BATCH_MAX = int(os.getenv("JOB_BATCH_MAX", "50"))
+JOB_EVENTS_KEEPALIVE_S = 15.0
+
+class RouteBatchRequest(BaseModel):
+    requests: List[RouteRequest] = Field(..., min_length=1, max_length=JOB_BATCH_MAX)
+
+def _submit_job(kind: str, runner, total: int) -> dict:
+    try:
+        job = jobs.submit(kind, runner, total)
+    except jobs.QueueFull as e:
+        raise HTTPException(status_code=503, detail=f"Job queue full: {e}", headers={"Retry-After": "30"})
+    return {
+        **job.to_dict(),
+        "links": {"status": f"/jobs/{job.id}", "events": f"/jobs/{job.id}/events"},
+    }
+
+@app.post("/jobs/route", status_code=202)
+async def submit_route_job(request: RouteRequest, omit_geojson: bool = Query(False)):
+    """
+    Run a /route computation in the background. Poll GET /jobs/{job_id} or
+    subscribe to GET /jobs/{job_id}/events; the result is the /route response.
+    """
+    async def run(progress):
+        with deadline.request_budget(_budget_s(request, None)):
+            result = await _compute_routes(request, progress=progress)
+        return route_response(result, include_geojson=not omit_geojson).model_dump()
+    return _submit_job("route", run, 1)
+
+@app.post("/jobs/batch", status_code=202)
+async def submit_batch_job(request: RouteBatchRequest, omit_geojson: bool = Query(False)):
+    """
+    Run several /route computations in one background job, one after another.
+    The result lists a /route response or an error for each request, in order.
+    """
+    async def run(progress):
+        results = []
+        for i, item in enumerate(request.requests):
+            try:
+                with deadline.request_budget(_budget_s(item, None)):
+                    result = await _compute_routes(item)
+                results.append({"status": "done", "response": route_response(result, not omit_geojson).model_dump()})
+            except HTTPException as e:
+                results.append({"status": "failed", "error": e.detail})
+            progress(i + 1, len(request.requests))
+        return {"results": results}
+    return _submit_job("batch", run, len(request.requests))
+
+def _get_job(job_id: str) -> jobs.Job:
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job_id")
+    return job
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    """Status and progress of a job; includes the result once it is done."""
+    return json_response(_get_job(job_id).to_dict())
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a queued or running job (finished jobs are left as they are)."""
+    if jobs.cancel(job_id) is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job_id")
+    return _get_job(job_id).to_dict(include_result=False)
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """
+    Server-sent events for a job: a `progress` event on every change and a
+    final event named after the end status (done/failed/cancelled) with the job.
+    """
+    job = _get_job(job_id)
+
+    async def stream():
+        last = None
+        while True:
+            change = job.next_change()
+            if job.status in jobs.FINISHED:
+                yield b"event: " + job.status.encode() + b"\ndata: " + dumps(job.to_dict()) + b"\n\n"
+                return
+            state = job.to_dict()
+            if state != last:
+                yield b"event: progress\ndata: " + dumps(state) + b"\n\n"
+                last = state
+            try:
+                await asyncio.wait_for(change.wait(), JOB_EVENTS_KEEPALIVE_S)
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
 @app.get("/")
 async def root():
     return {"message": "Frost Byte API", "status": "running"}
 
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and its event loop is answering."""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    """
+    Readiness: 200 once the datasets are loaded (503 before), with upstream
+    circuit states. Open circuits don't make a pod unready, since every pod shares the
+    same upstreams and lookups fall back.
+    """
+    report = {**startup.readiness(), "circuits": breaker_states()}
+    return json_response(report, status_code=200 if report["ready"] else 503)
+
+@app.get("/metrics/upstreams")
+async def upstream_metrics():
+    """Rate-limit queue depth and wait times per upstream, plus circuit breaker states."""
+    return {
+        "scheduler": scheduler.stats(),
+        "circuits": breaker_states(),
+    }
+
+class BBoxRequest(BaseModel):
+    bbox: List[float]  # [min_lon, min_lat, max_lon, max_lat]
+    max_cells: Optional[int] = Field(None, ge=1)  # capped at FROSTBYTE_PREWARM_MAX_CELLS
+
+def _check_admin(token: Optional[str]):
+    # Closed unless a token is configured: warm spends upstream quota, evict drops caches
+    if not ADMIN_TOKEN or token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+def _bbox(values: List[float]) -> prewarm.BBox:
+    if len(values) != 4:
+        raise HTTPException(status_code=422, detail="bbox must be [min_lon, min_lat, max_lon, max_lat]")
+    return prewarm.normalize_bbox(values)
+
+@app.post("/admin/warm", status_code=202)
+async def admin_warm(request: BBoxRequest, x_admin_token: Optional[str] = Header(None)):
+    """Warm building, snow and wind caches for a bbox in the background (batch priority)."""
+    _check_admin(x_admin_token)
+    bbox = _bbox(request.bbox)
+    if prewarm.clip_bbox(bbox) is None:
+        raise HTTPException(status_code=422, detail="bbox is outside the service area")
+    cells = await prewarm.start_warm([bbox], request.max_cells or prewarm.PREWARM_MAX_CELLS)
+    return {"status": "warming", "cells": cells}
+
+@app.post("/admin/evict")
+async def admin_evict(request: BBoxRequest, x_admin_token: Optional[str] = Header(None)):
+    """Drop cached data inside a bbox."""
+    _check_admin(x_admin_token)
+    return {"evicted": prewarm.evict_bbox(_bbox(request.bbox))}
+
+@app.get("/admin/coverage")
+async def admin_coverage(x_admin_token: Optional[str] = Header(None)):
+    """Share of the service area with warm building and snow data."""
+    _check_admin(x_admin_token)
+    return {**prewarm.coverage(), "heatmap": heatmap.status(), "snow_tiles": snow_tiles.status(),
+            "jobs": jobs.status(), "shelter_index": shelter_index.status(),
+            "disk_cache": await asyncio.to_thread(disk_cache.status)}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
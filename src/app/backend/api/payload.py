@@ -0,0 +1,111 @@
+"""
+Response encoding helpers: fast JSON serialization and response compression.
+
+orjson and brotli are optional; without them we fall back to the stdlib json
+module and gzip-only compression.
+"""
+import gzip
+import json
+import os
+from typing import Any
+
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.getenv("FROSTBYTE_COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("FROSTBYTE_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("FROSTBYTE_BROTLI_QUALITY", "5"))
+
+# Responses that must keep streaming (SSE) or are already compressed
+_SKIP_CONTENT_TYPES = ("text/event-stream", "image/png", "application/x-protobuf", "application/gzip")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, separators=(",", ":")).encode("utf-8")
+
+
+def json_response(content: Any, status_code: int = 200, headers: dict = None) -> Response:
+    """JSON response that skips pydantic/jsonable_encoder (content must already be plain JSON types)."""
+    return Response(content=dumps(content), status_code=status_code, headers=headers, media_type="application/json")
+
+
+def _choose_encoding(accept_encoding: str) -> str:
+    accepted = {part.split(";")[0].strip().lower() for part in accept_encoding.split(",")}
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return ""
+
+
+class CompressionMiddleware:
+    """
+    Pure ASGI gzip/brotli middleware. Buffers complete responses and compresses
+    those above `minimum_size`; streaming and already-compressed responses pass through.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers", [])}
+        encoding = _choose_encoding(headers.get("accept-encoding", ""))
+        if not encoding:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        body = []
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                response_headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in message.get("headers", [])}
+                content_type = response_headers.get("content-type", "")
+                if "content-encoding" in response_headers or content_type.startswith(_SKIP_CONTENT_TYPES):
+                    passthrough = True
+                    await send(message)
+                    return
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            body.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            await self._send_buffered(send, start_message, b"".join(body), encoding)
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def _send_buffered(self, send, start_message, data: bytes, encoding: str) -> None:
+        headers = [(k, v) for k, v in start_message.get("headers", []) if k.lower() != b"content-length"]
+        if len(data) >= self.minimum_size:
+            if encoding == "br":
+                data = brotli.compress(data, quality=BROTLI_QUALITY)
+            else:
+                data = gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+            headers.append((b"content-encoding", encoding.encode("latin-1")))
+            headers.append((b"vary", b"Accept-Encoding"))
+        headers.append((b"content-length", str(len(data)).encode("latin-1")))
+        await send({**start_message, "headers": headers})
+        await send({"type": "http.response.body", "body": data})
@@ -0,0 +1,256 @@
+"""
+End-to-end benchmark for POST /route against local fake upstreams.
+
+Starts the fakes from benchmarks/fake_upstreams.py, launches the API with
+uvicorn pointed at them, drives /route with synthetic trips at a fixed
+concurrency and writes a JSON report.
+
+Usage (from src/app/backend):
+    python -m benchmarks.e2e --requests 40 --concurrency 4 --min-km 1 --max-km 20 \\
+        --latency overpass=300 --jitter overpass=150 --error-rate overpass=0.05
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List
+
+import httpx
+
+BACKEND_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from benchmarks.fake_upstreams import FaultConfig, UPSTREAMS, start_fake_upstreams, upstream_env
+from benchmarks.synthetic import generate_trips
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+DISTANCE_BUCKETS_KM = [(0, 2), (2, 5), (5, 10), (10, 20), (20, float("inf"))]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile (pct in 0-100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(int(round(pct / 100.0 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def latency_summary(latencies_ms: List[float]) -> Dict[str, float]:
+    return {
+        "p50": round(percentile(latencies_ms, 50), 1),
+        "p95": round(percentile(latencies_ms, 95), 1),
+        "p99": round(percentile(latencies_ms, 99), 1),
+        "mean": round(statistics.fmean(latencies_ms), 1) if latencies_ms else 0.0,
+        "max": round(max(latencies_ms), 1) if latencies_ms else 0.0,
+    }
+
+
+def _parse_per_upstream(values: List[str], flag: str) -> Dict[str, float]:
+    """Parse repeated `name=value` flags, e.g. --latency overpass=300."""
+    parsed = {}
+    for item in values or []:
+        name, _, raw = item.partition("=")
+        if name not in UPSTREAMS and name != "all":
+            raise SystemExit(f"{flag}: unknown upstream '{name}' (expected one of {', '.join(UPSTREAMS)} or all)")
+        parsed[name] = float(raw)
+    return parsed
+
+
+def build_fault_configs(args) -> Dict[str, FaultConfig]:
+    latency = _parse_per_upstream(args.latency, "--latency")
+    jitter = _parse_per_upstream(args.jitter, "--jitter")
+    errors = _parse_per_upstream(args.error_rate, "--error-rate")
+    configs = {}
+    for name in UPSTREAMS:
+        configs[name] = FaultConfig(
+            latency_ms=latency.get(name, latency.get("all", 0.0)),
+            jitter_ms=jitter.get(name, jitter.get("all", 0.0)),
+            error_rate=errors.get(name, errors.get("all", 0.0)),
+        )
+    return configs
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_api_server(env_overrides: Dict[str, str], workers: int, log_path: str | None) -> tuple[subprocess.Popen, str]:
+    port = _free_port()
+    env = dict(os.environ)
+    env.update(env_overrides)
+    log = open(log_path, "w") if log_path else subprocess.DEVNULL
+    cmd = [
+        sys.executable, "-m", "uvicorn", "api.main:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(workers), "--log-level", "warning",
+    ]
+    proc = subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    return proc, f"http://127.0.0.1:{port}"
+
+
+def wait_until_up(base_url: str, timeout_s: float = 30.0) -> None:
+    deadline = time.time() + timeout_s
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"{base_url}/", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"API server did not come up at {base_url} within {timeout_s}s")
+
+
+async def drive(base_url: str, trips: List[Dict[str, Any]], concurrency: int, timeout_s: float) -> List[Dict[str, Any]]:
+    semaphore = asyncio.Semaphore(concurrency)
+    results = []
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout_s) as client:
+        async def one(trip):
+            async with semaphore:
+                t0 = time.perf_counter()
+                try:
+                    response = await client.post("/route", json={"start": trip["start"], "end": trip["end"]})
+                    status = response.status_code
+                    size = len(response.content)
+                except httpx.HTTPError as e:
+                    status, size = f"error:{type(e).__name__}", 0
+                elapsed_ms = (time.perf_counter() - t0) * 1000
+                results.append({"km": trip["km"], "status": status, "latency_ms": round(elapsed_ms, 1), "bytes": size})
+
+        await asyncio.gather(*(one(trip) for trip in trips))
+    return results
+
+
+def summarize(results: List[Dict[str, Any]], wall_s: float, calls: Dict[str, Dict[str, int]]) -> Dict[str, Any]:
+    ok = [r for r in results if r["status"] == 200]
+    latencies = [r["latency_ms"] for r in ok]
+    n = len(results) or 1
+
+    by_distance = {}
+    for lo, hi in DISTANCE_BUCKETS_KM:
+        bucket = [r["latency_ms"] for r in ok if lo <= r["km"] < hi]
+        if bucket:
+            label = f"{lo}-{hi}km" if hi != float("inf") else f"{lo}km+"
+            by_distance[label] = {"requests": len(bucket), "latency_ms": latency_summary(bucket)}
+
+    return {
+        "requests": len(results),
+        "ok": len(ok),
+        "errors": len(results) - len(ok),
+        "wall_s": round(wall_s, 3),
+        "throughput_rps": round(len(ok) / wall_s, 3) if wall_s else 0.0,
+        "latency_ms": latency_summary(latencies),
+        "mean_response_bytes": round(statistics.fmean(r["bytes"] for r in ok), 1) if ok else 0.0,
+        "by_distance": by_distance,
+        "upstream_calls": {
+            name: {**c, "per_request": round(c["calls"] / n, 2)}
+            for name, c in calls.items()
+        },
+    }
+
+
+def _git_rev() -> str | None:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="End-to-end /route benchmark against local fake upstreams")
+    parser.add_argument("--requests", type=int, default=20, help="number of /route calls")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--warmup", type=int, default=0, help="untimed calls before measuring")
+    parser.add_argument("--min-km", type=float, default=1.0)
+    parser.add_argument("--max-km", type=float, default=20.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    parser.add_argument("--timeout", type=float, default=300.0, help="per-request client timeout (s)")
+    parser.add_argument("--latency", action="append", metavar="UPSTREAM=MS", help="base latency per upstream (or all=MS)")
+    parser.add_argument("--jitter", action="append", metavar="UPSTREAM=MS", help="+/- uniform jitter per upstream")
+    parser.add_argument("--error-rate", action="append", metavar="UPSTREAM=FRACTION", help="injected error rate per upstream")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="extra env for the API server")
+    parser.add_argument("--server-log", default=None, help="write API server output to this file")
+    parser.add_argument("--out", default=None, help="JSON report path (default: benchmarks/results/e2e-<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    faults = build_fault_configs(args)
+    fakes = start_fake_upstreams(faults, seed=args.seed)
+    env = upstream_env(fakes)
+    for item in args.env:
+        key, _, value = item.partition("=")
+        env[key] = value
+
+    proc, base_url = start_api_server(env, args.workers, args.server_log)
+    try:
+        wait_until_up(base_url)
+        if args.warmup:
+            asyncio.run(drive(base_url, generate_trips(args.warmup, args.min_km, args.max_km, seed=args.seed + 1),
+                              args.concurrency, args.timeout))
+
+        before = {name: fake.stats.snapshot() for name, fake in fakes.items()}
+        trips = generate_trips(args.requests, args.min_km, args.max_km, seed=args.seed)
+        t0 = time.perf_counter()
+        results = asyncio.run(drive(base_url, trips, args.concurrency, args.timeout))
+        wall_s = time.perf_counter() - t0
+        after = {name: fake.stats.snapshot() for name, fake in fakes.items()}
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        for fake in fakes.values():
+            fake.stop()
+
+    calls = {
+        name: {key: after[name][key] - before[name][key] for key in after[name]}
+        for name in fakes
+    }
+    report = {
+        "benchmark": "e2e_route",
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_rev": _git_rev(),
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "warmup": args.warmup,
+            "min_km": args.min_km,
+            "max_km": args.max_km,
+            "seed": args.seed,
+            "workers": args.workers,
+            "faults": {name: vars(cfg) for name, cfg in faults.items()},
+            "env": {k: v for k, v in env.items() if not k.endswith("_URL") and not k.endswith("_KEY")},
+        },
+        "summary": summarize(results, wall_s, calls),
+        "samples": sorted(results, key=lambda r: r["km"]),
+    }
+
+    out = Path(args.out) if args.out else RESULTS_DIR / f"e2e-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+
+    s = report["summary"]
+    print(f"{s['ok']}/{s['requests']} ok  p50={s['latency_ms']['p50']}ms  p95={s['latency_ms']['p95']}ms  "
+          f"p99={s['latency_ms']['p99']}ms  {s['throughput_rps']} req/s")
+    for name, c in s["upstream_calls"].items():
+        print(f"  {name:10s} {c['calls']:6d} calls  {c['per_request']:8.2f}/request  {c['errors_injected']} injected errors")
+    print(f"Report written to {out}")
+    return 0 if s["errors"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
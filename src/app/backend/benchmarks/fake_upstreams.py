@@ -0,0 +1,253 @@
+"""
+Local stand-ins for every upstream the backend talks to.
+
+Each fake is a small threaded HTTP server that answers from the recorded
+fixtures in benchmarks/fixtures/, with configurable latency, jitter and
+error injection, and counts every call it receives.
+
+    ors        POST /v2/directions/foot-walking/geojson  (synthetic geometry, via points honoured)
+               POST /v2/matrix/foot-walking  (straight-line distance x 1.3)
+    overpass   POST /api/interpreter
+    nominatim  GET  /reverse
+    openmeteo  GET  /v1/forecast
+    planif     GET  /planif-neige.json, /geobase-map.json
+    gemini     POST /v1beta/models/<model>:generateContent
+"""
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.synthetic import geometry_length_m, synthetic_geometry
+from services.routing.route_sampler import haversine_distance
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+UPSTREAMS = ("ors", "overpass", "nominatim", "openmeteo", "planif", "gemini")
+
+_AROUND = re.compile(r"around:\d+,(-?[\d.]+),(-?[\d.]+)")
+
+
+@lru_cache(maxsize=None)
+def load_fixture(name: str) -> Any:
+    with open(FIXTURES_DIR / name, encoding="utf-8") as f:
+        return json.load(f)
+
+
+@dataclass
+class FaultConfig:
+    """Latency and error injection for one fake upstream."""
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0  # fraction of calls answered with error_status
+    error_status: int = 503
+
+
+@dataclass
+class UpstreamStats:
+    calls: int = 0
+    errors_injected: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, injected_error: bool) -> None:
+        with self._lock:
+            self.calls += 1
+            if injected_error:
+                self.errors_injected += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {"calls": self.calls, "errors_injected": self.errors_injected}
+
+
+# Response builders: (method, path, query, body) -> (status, payload)
+Responder = Callable[[str, str, Dict[str, list], bytes], Tuple[int, Any]]
+
+
+def _stable_index(key: Tuple, n: int) -> int:
+    return hash(key) % n if n else 0
+
+
+def _ors_matrix(data):
+    locations = [tuple(loc) for loc in data.get("locations") or []]
+    distances = [[round(haversine_distance(a, b) * 1.3, 1) for b in locations] for a in locations]
+    return 200, {
+        "distances": distances,
+        "durations": [[round(d / 1.4, 1) for d in row] for row in distances],
+    }
+
+
+def _ors_responder(method, path, query, body):
+    data = json.loads(body or b"{}")
+    if "/matrix/" in path:
+        return _ors_matrix(data)
+    coords = data.get("coordinates") or []
+    if len(coords) < 2:
+        return 400, {"error": {"code": 2003, "message": "coordinates missing"}}
+    if len(coords) > 2:  # via points: one route through every coordinate, like ORS
+        legs = [synthetic_geometry(tuple(a), tuple(b))["coordinates"] for a, b in zip(coords, coords[1:])]
+        geometry = {"type": "LineString", "coordinates": legs[0] + [c for leg in legs[1:] for c in leg[1:]]}
+        distance = geometry_length_m(geometry)
+        return 200, {"type": "FeatureCollection", "features": [{
+            "type": "Feature",
+            "geometry": geometry,
+            "properties": {"summary": {"distance": round(distance, 1), "duration": round(distance / 1.4, 1)}},
+        }]}
+    start, end = tuple(coords[0]), tuple(coords[-1])
+    target = (data.get("alternative_routes") or {}).get("target_count", 0)
+    features = []
+    for variant in range(target + 1):
+        geometry = synthetic_geometry(start, end, variant=variant)
+        distance = geometry_length_m(geometry)
+        features.append({
+            "type": "Feature",
+            "geometry": geometry,
+            "properties": {"summary": {"distance": round(distance, 1), "duration": round(distance / 1.4, 1)}},
+        })
+    return 200, {"type": "FeatureCollection", "features": features}
+
+
+def _overpass_responder(method, path, query, body):
+    variants = load_fixture("overpass.json")["variants"]
+    m = _AROUND.search(body.decode("utf-8", "replace"))
+    key = (round(float(m.group(1)), 3), round(float(m.group(2)), 3)) if m else ()
+    return 200, variants[_stable_index(key, len(variants))]
+
+
+def _nominatim_responder(method, path, query, body):
+    addresses = load_fixture("nominatim.json")["addresses"]
+    lat = float(query.get("lat", ["0"])[0])
+    lon = float(query.get("lon", ["0"])[0])
+    # Neighbouring points (~100 m) resolve to the same street like they would in reality
+    address = addresses[_stable_index((round(lat, 3), round(lon, 3)), len(addresses))]
+    return 200, {"lat": str(lat), "lon": str(lon), "address": address}
+
+
+def _openmeteo_responder(method, path, query, body):
+    data = load_fixture("open_meteo.json")
+    if "hourly" not in query:
+        return 200, {k: v for k, v in data.items() if not k.startswith("hourly")}
+    hours = int(query.get("forecast_hours", ["24"])[0])
+    return 200, {
+        "hourly": {key: values[:hours] for key, values in data["hourly"].items()},
+        "hourly_units": data["hourly_units"],
+    }
+
+
+def _planif_responder(method, path, query, body):
+    if path.endswith("geobase-map.json"):
+        return 200, load_fixture("geobase-map.json")
+    return 200, load_fixture("planif-neige.json")
+
+
+def _gemini_responder(method, path, query, body):
+    return 200, load_fixture("gemini.json")
+
+
+RESPONDERS: Dict[str, Responder] = {
+    "ors": _ors_responder,
+    "overpass": _overpass_responder,
+    "nominatim": _nominatim_responder,
+    "openmeteo": _openmeteo_responder,
+    "planif": _planif_responder,
+    "gemini": _gemini_responder,
+}
+
+
+class FakeUpstream:
+    """One fake upstream server running on a background thread."""
+
+    def __init__(self, name: str, faults: Optional[FaultConfig] = None, seed: int = 0):
+        self.name = name
+        self.faults = faults or FaultConfig()
+        self.stats = UpstreamStats()
+        self._responder = RESPONDERS[name]
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeUpstream":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _draw_fault(self) -> Tuple[float, bool]:
+        with self._rng_lock:
+            jitter = self._rng.uniform(-self.faults.jitter_ms, self.faults.jitter_ms)
+            fail = self._rng.random() < self.faults.error_rate
+        return max(self.faults.latency_ms + jitter, 0.0) / 1000.0, fail
+
+    def _make_handler(self):
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _handle(self, method: str):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                parsed = urlparse(self.path)
+                delay_s, fail = upstream._draw_fault()
+                upstream.stats.record(fail)
+                if delay_s:
+                    time.sleep(delay_s)
+                if fail:
+                    status, payload = upstream.faults.error_status, {"error": "injected failure"}
+                else:
+                    status, payload = upstream._responder(method, parsed.path, parse_qs(parsed.query), body)
+                raw = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def do_GET(self):
+                self._handle("GET")
+
+            def do_POST(self):
+                self._handle("POST")
+
+            def log_message(self, format, *args):  # keep benchmark output quiet
+                pass
+
+        return Handler
+
+
+def start_fake_upstreams(faults: Optional[Dict[str, FaultConfig]] = None, seed: int = 0) -> Dict[str, FakeUpstream]:
+    """Start one fake per upstream; `faults` maps upstream name -> FaultConfig."""
+    faults = faults or {}
+    return {
+        name: FakeUpstream(name, faults.get(name), seed=seed + i).start()
+        for i, name in enumerate(UPSTREAMS)
+    }
+
+
+def upstream_env(fakes: Dict[str, FakeUpstream]) -> Dict[str, str]:
+    """Environment variables that point the backend services at the fakes."""
+    return {
+        "ORS_BASE_URL": f"{fakes['ors'].url}/v2",
+        "ORS_API_KEY": "benchmark",
+        "OVERPASS_URL": f"{fakes['overpass'].url}/api/interpreter",
+        "NOMINATIM_URL": f"{fakes['nominatim'].url}/reverse",
+        "OPEN_METEO_URL": f"{fakes['openmeteo'].url}/v1/forecast",
+        "PLANIF_URL": f"{fakes['planif'].url}/planif-neige.json",
+        "GEOMAP_URL": f"{fakes['planif'].url}/geobase-map.json",
+        "GEMINI_BASE_URL": fakes["gemini"].url,
+        "GEMINI_API_KEY": "benchmark",
+    }
@@ -0,0 +1,290 @@
+"""
+Microbenchmarks for the pure-Python hot paths, with regression gating.
+
+Every case runs on fixed, seeded inputs at several sizes. Timings are the
+best of several repeats, reported per call in microseconds.
+
+Usage (from src/app/backend):
+    python -m benchmarks.micro                        # run and print
+    python -m benchmarks.micro --save-baseline        # store benchmarks/baselines/micro.json
+    python -m benchmarks.micro --compare --threshold 0.2
+        # exit 1 if any case is more than 20% slower than the stored baseline
+    python -m benchmarks.micro --only find_cote_rue_id --sizes small,medium
+"""
+import argparse
+import json
+import random
+import sys
+import timeit
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+BACKEND_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from benchmarks.synthetic import MONTREAL_ORIGINS, geobase_queries, offset_point, synthetic_geobase, synthetic_geometry
+from services.routing.route_sampler import calculate_bearing, sample_route_points, simplify_geometry
+from services.scoring.route_scorer import RouteMetrics, RouteScorer
+from services.scoring.wind_calculator import calculate_headwind_factor
+from services import buildings, snow
+from services.snow_store import GeobaseStore
+from api.formatting import format_compact_routes, format_response_routes
+
+BASELINE_PATH = Path(__file__).parent / "baselines" / "micro.json"
+RESULTS_DIR = Path(__file__).parent / "results"
+
+SIZES = ("small", "medium", "large", "xlarge")
+
+# Route length (km) per size for the geometry-based cases
+ROUTE_KM = {"small": 0.5, "medium": 2.0, "large": 8.0, "xlarge": 20.0}
+# Number of items per size for the per-call cases
+ITEMS = {"small": 100, "medium": 1_000, "large": 10_000, "xlarge": 50_000}
+# Street sides in the synthetic geobase (Montreal has on the order of 100k)
+GEOBASE_SEGMENTS = {"small": 1_000, "medium": 10_000, "large": 50_000, "xlarge": 120_000}
+
+
+def _route_geometry(size: str, variant: int = 0) -> dict:
+    start = MONTREAL_ORIGINS[0]
+    end = offset_point(start, 60.0, ROUTE_KM[size] * 1000)
+    return synthetic_geometry(start, end, variant=variant, seed=1)
+
+
+def _point_pairs(n: int) -> List[Tuple[Tuple[float, float], Tuple[float, float]]]:
+    rng = random.Random(3)
+    pairs = []
+    for _ in range(n):
+        a = (-73.6 + rng.random() * 0.1, 45.45 + rng.random() * 0.1)
+        pairs.append((a, offset_point(a, rng.uniform(0, 360), 40.0)))
+    return pairs
+
+
+# Each case: size -> (callable, calls per invocation)
+def case_sample_route_points(size: str):
+    geometry = _route_geometry(size)
+    return (lambda: sample_route_points(geometry, interval_m=40.0)), 1
+
+
+def case_simplify_geometry(size: str):
+    geometry = _route_geometry(size)
+    return (lambda: simplify_geometry(geometry, tolerance_m=3.0)), 1
+
+
+def case_calculate_bearing(size: str):
+    pairs = _point_pairs(ITEMS[size])
+
+    def run():
+        for a, b in pairs:
+            calculate_bearing(a, b)
+    return run, len(pairs)
+
+
+def case_calculate_headwind_factor(size: str):
+    rng = random.Random(5)
+    inputs = [(rng.uniform(0, 360), rng.uniform(0, 360), rng.uniform(0, 15)) for _ in range(ITEMS[size])]
+
+    def run():
+        for bearing, direction, speed in inputs:
+            calculate_headwind_factor(bearing, direction, speed)
+    return run, len(inputs)
+
+
+def case_score_route(size: str):
+    rng = random.Random(7)
+    scorer = RouteScorer()
+    metrics = [RouteMetrics(rng.uniform(500, 20000), rng.uniform(0, 500), rng.uniform(0, 300)) for _ in range(ITEMS[size])]
+
+    def run():
+        for m in metrics:
+            scorer.score_route(m)
+    return run, len(metrics)
+
+
+def case_choose_best_route(size: str):
+    rng = random.Random(11)
+    scorer = RouteScorer()
+    routes = [
+        {"id": f"route_{i}", "score": scorer.score_route(RouteMetrics(rng.uniform(500, 20000), rng.uniform(0, 500), rng.uniform(0, 300)))}
+        for i in range(ITEMS[size])
+    ]
+    return (lambda: scorer.choose_best_route(routes)), 1
+
+
+def case_find_cote_rue_id(size: str):
+    geomap = synthetic_geobase(GEOBASE_SEGMENTS[size], seed=13)
+    queries = geobase_queries(geomap, 20, seed=17)
+    snow._store = GeobaseStore.build(geomap)
+
+    def run():
+        for street, number in queries:
+            snow.find_cote_rue_id(street, number)
+    return run, len(queries)
+
+
+def case_estimate_height_m(size: str):
+    rng = random.Random(19)
+    tag_pool = [
+        {"building": "yes", "height": "45 m"},
+        {"building": "yes", "height": "12.5"},
+        {"building": "apartments", "building:levels": "6"},
+        {"building": "yes"},
+        {"building": "house", "building:levels": "2;3"},
+        {"building": "yes", "height": "unknown"},
+    ]
+    tags = [rng.choice(tag_pool) for _ in range(ITEMS[size])]
+
+    def run():
+        for t in tags:
+            buildings._estimate_height_m(t)
+    return run, len(tags)
+
+
+def _scored_routes(size: str) -> List[dict]:
+    scorer = RouteScorer()
+    routes = []
+    for variant in range(3):
+        geometry = _route_geometry(size, variant)
+        metrics = RouteMetrics(distance_m=ROUTE_KM[size] * 1000, wind_cost=10.0 * variant, snow_cost=5.0)
+        routes.append({
+            "id": f"route_{variant}",
+            "geojson": geometry,
+            "distance_m": metrics.distance_m,
+            "duration_s": metrics.distance_m / 1.4,
+            "score": scorer.score_route(metrics),
+            "metrics": {"distance_m": metrics.distance_m, "wind_cost": metrics.wind_cost, "snow_cost": metrics.snow_cost},
+        })
+    return routes
+
+
+def case_format_response_routes(size: str):
+    routes = _scored_routes(size)
+    return (lambda: format_response_routes(routes, "route_1")), 1
+
+
+def case_format_compact_routes(size: str):
+    routes = _scored_routes(size)
+    return (lambda: format_compact_routes(routes, "route_1")), 1
+
+
+CASES: Dict[str, Callable] = {
+    "sample_route_points": case_sample_route_points,
+    "simplify_geometry": case_simplify_geometry,
+    "calculate_bearing": case_calculate_bearing,
+    "calculate_headwind_factor": case_calculate_headwind_factor,
+    "RouteScorer.score_route": case_score_route,
+    "RouteScorer.choose_best_route": case_choose_best_route,
+    "find_cote_rue_id": case_find_cote_rue_id,
+    "_estimate_height_m": case_estimate_height_m,
+    "format_response_routes": case_format_response_routes,
+    "format_compact_routes": case_format_compact_routes,
+}
+
+
+def time_case(fn: Callable, calls: int, repeat: int, min_time_s: float) -> Dict[str, float]:
+    timer = timeit.Timer(fn)
+    number = 1
+    while True:  # scale `number` until one run takes at least min_time_s
+        if timer.timeit(number) >= min_time_s or number >= 1_000_000:
+            break
+        number *= 2
+    runs = sorted(t / number for t in timer.repeat(repeat=repeat, number=number))
+    return {
+        "best_us": round(runs[0] * 1e6, 3),
+        "median_us": round(runs[len(runs) // 2] * 1e6, 3),
+        "per_call_us": round(runs[0] * 1e6 / calls, 4),
+        "calls": calls,
+        "number": number,
+    }
+
+
+def run_cases(names: List[str], sizes: List[str], repeat: int, min_time_s: float) -> Dict[str, Dict[str, dict]]:
+    results: Dict[str, Dict[str, dict]] = {}
+    saved_store = snow._store
+    try:
+        for name in names:
+            results[name] = {}
+            for size in sizes:
+                fn, calls = CASES[name](size)
+                results[name][size] = time_case(fn, calls, repeat, min_time_s)
+                r = results[name][size]
+                print(f"{name:32s} {size:7s} {r['best_us']:12.1f} us  ({r['per_call_us']:.3f} us/call)")
+    finally:
+        snow._store = saved_store
+    return results
+
+
+def compare(results: Dict[str, Dict[str, dict]], baseline: Dict[str, Dict[str, dict]], threshold: float) -> List[str]:
+    """Return one message per case/size slower than baseline * (1 + threshold)."""
+    regressions = []
+    for name, by_size in results.items():
+        for size, r in by_size.items():
+            base = baseline.get(name, {}).get(size)
+            if not base:
+                continue
+            ratio = r["best_us"] / base["best_us"] if base["best_us"] else 1.0
+            marker = "REGRESSION" if ratio > 1 + threshold else "ok"
+            print(f"{name:32s} {size:7s} {ratio:6.2f}x baseline  {marker}")
+            if ratio > 1 + threshold:
+                regressions.append(f"{name} [{size}]: {base['best_us']:.1f} us -> {r['best_us']:.1f} us ({ratio:.2f}x)")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Microbenchmarks for backend hot paths")
+    parser.add_argument("--only", default=None, help="comma-separated case names (default: all)")
+    parser.add_argument("--sizes", default=",".join(SIZES), help="comma-separated sizes: " + ", ".join(SIZES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.05, help="minimum seconds per timed run")
+    parser.add_argument("--baseline", default=str(BASELINE_PATH))
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--compare", action="store_true", help="fail if slower than the baseline beyond --threshold")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown fraction (0.25 = 25%%)")
+    parser.add_argument("--out", default=None, help="also write results JSON here")
+    args = parser.parse_args(argv)
+
+    names = args.only.split(",") if args.only else list(CASES)
+    unknown = [n for n in names if n not in CASES]
+    if unknown:
+        parser.error(f"unknown case(s): {', '.join(unknown)}")
+    sizes = args.sizes.split(",")
+    if any(s not in SIZES for s in sizes):
+        parser.error(f"sizes must be among {', '.join(SIZES)}")
+
+    results = run_cases(names, sizes, args.repeat, args.min_time)
+    report = {
+        "benchmark": "micro",
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "results": results,
+    }
+
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(json.dumps(report, indent=2))
+
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        existing = json.loads(baseline_path.read_text())["results"] if baseline_path.exists() else {}
+        for name, by_size in results.items():
+            existing.setdefault(name, {}).update(by_size)
+        report["results"] = existing
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(report, indent=2))
+        print(f"Baseline written to {baseline_path}")
+
+    if args.compare:
+        if not baseline_path.exists():
+            print(f"No baseline at {baseline_path}; run with --save-baseline first")
+            return 2
+        regressions = compare(results, json.loads(baseline_path.read_text())["results"], args.threshold)
+        if regressions:
+            print("\nRegressions beyond threshold:")
+            for msg in regressions:
+                print(f"  {msg}")
+            return 1
+        print("\nNo regressions beyond threshold")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+"""
+Deterministic replay of captured /route traffic.
+
+Reads a log written by the capture middleware (FROSTBYTE_CAPTURE_PATH, see
+services/capture.py) and re-runs each request through the current
+compute_routes, answering every upstream call from the data recorded with
+that request. Nothing touches the network, so the timings measure our own
+code on a real trip distribution.
+
+Usage (from src/app/backend):
+    python -m benchmarks.replay captured.jsonl --speed 10
+    python -m benchmarks.replay captured.jsonl --speed 0 --concurrency 8   # as fast as possible
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+BACKEND_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.pop("FROSTBYTE_CAPTURE_PATH", None)  # never capture while replaying
+
+from benchmarks.e2e import RESULTS_DIR, latency_summary
+from services.capture import call_key, point_key
+from services.scoring.interfaces import BuildingServiceInterface, SnowServiceInterface
+
+_entry: ContextVar[Optional[Dict[str, Any]]] = ContextVar("frostbyte_replay_entry", default=None)
+
+
+class MissingRecording(Exception):
+    """The captured entry has no data for an upstream call the current code made."""
+
+
+def load_log(path: str, include_errors: bool = False) -> List[Dict[str, Any]]:
+    entries = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            if not entry.get("request"):
+                continue
+            if entry.get("status") != 200 and not include_errors:
+                continue
+            entries.append(entry)
+    entries.sort(key=lambda e: e["ts"])
+    return entries
+
+
+def _recorded(kind: str) -> Dict[str, Any]:
+    entry = _entry.get()
+    if entry is None:
+        raise MissingRecording("no captured entry is active")
+    table = entry["upstream"].get(kind)
+    if not table:
+        raise MissingRecording(f"captured entry has no '{kind}' data")
+    return table
+
+
+def _nearest(kind: str, lat: float, lon: float) -> Any:
+    """Exact point if recorded, otherwise the closest recorded point (sampling may have changed)."""
+    table = _recorded(kind)
+    value = table.get(point_key(lat, lon))
+    if value is not None:
+        return value
+    entry = _entry.get()
+    points = entry.setdefault("_points", {}).get(kind)
+    if points is None:
+        points = [(float(k.split(",")[0]), float(k.split(",")[1]), v) for k, v in table.items()]
+        entry["_points"][kind] = points
+    entry["_misses"] = entry.get("_misses", 0) + 1
+    return min(points, key=lambda p: (p[0] - lat) ** 2 + (p[1] - lon) ** 2)[2]
+
+
+def _replay_fn(kind: str):
+    def replay(*args, **kwargs):
+        table = _recorded(kind)
+        key = call_key(args, kwargs)
+        if key in table:
+            return table[key]
+        return next(iter(table.values()))  # one call per request, so the only recording is the answer
+    return replay
+
+
+class ReplayBuildingService(BuildingServiceInterface):
+    async def get_building_density(self, lat: float, lon: float) -> dict:
+        return _nearest("buildings", lat, lon)
+
+
+class ReplaySnowService(SnowServiceInterface):
+    async def get_snow_status(self, lat: float, lon: float) -> dict:
+        return _nearest("snow", lat, lon)
+
+
+def install_replay_doubles(main_module) -> None:
+    """Point compute_routes at the recorded data instead of the live services."""
+    from services.scoring.gemini import _fallback
+
+    main_module.get_route_alternatives = _replay_fn("ors")
+    main_module.get_wind_data = _replay_fn("wind")
+    main_module.building_service = ReplayBuildingService()
+    main_module.snow_service = ReplaySnowService()
+    main_module.generate_route_explanation = _fallback
+
+
+async def replay(entries: List[Dict[str, Any]], speed: float, concurrency: int) -> List[Dict[str, Any]]:
+    from api import main
+
+    install_replay_doubles(main)
+    semaphore = asyncio.Semaphore(concurrency)
+    t_first = entries[0]["ts"] if entries else 0.0
+    t_start = time.perf_counter()
+    results = []
+
+    async def one(entry):
+        if speed > 0:
+            delay = (entry["ts"] - t_first) / speed - (time.perf_counter() - t_start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        async with semaphore:
+            _entry.set(entry)
+            t0 = time.perf_counter()
+            outcome: Dict[str, Any] = {"captured_latency_ms": entry.get("latency_ms")}
+            try:
+                response = main.route_response(await main.route_request(main.RouteRequest(**entry["request"])))
+                outcome["status"] = 200
+                outcome["chosen_route_id"] = response.chosen_route_id
+                outcome["scores"] = {r["id"]: r["score"] for r in response.routes}
+            except Exception as e:
+                outcome["status"] = getattr(e, "status_code", "error")
+                outcome["error"] = str(getattr(e, "detail", e))[:200]
+            outcome["latency_ms"] = round((time.perf_counter() - t0) * 1000, 3)
+            outcome["point_misses"] = entry.get("_misses", 0)
+            captured = entry.get("response") or {}
+            if captured and outcome["status"] == 200:
+                outcome["same_choice"] = captured.get("chosen_route_id") == outcome["chosen_route_id"]
+                deltas = [
+                    abs(outcome["scores"][rid] - score)
+                    for rid, score in (captured.get("scores") or {}).items()
+                    if rid in outcome["scores"] and score is not None
+                ]
+                outcome["max_score_delta"] = max(deltas) if deltas else 0.0
+            results.append(outcome)
+
+    await asyncio.gather(*(asyncio.create_task(one(e)) for e in entries))
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Replay captured /route traffic against the current code")
+    parser.add_argument("log", help="capture log (JSON lines) written via FROSTBYTE_CAPTURE_PATH")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="pacing multiplier: 1 = original timing, 10 = ten times faster, 0 = no pacing")
+    parser.add_argument("--concurrency", type=int, default=64, help="max requests in flight")
+    parser.add_argument("--limit", type=int, default=None, help="replay only the first N entries")
+    parser.add_argument("--include-errors", action="store_true", help="also replay requests that failed when captured")
+    parser.add_argument("--out", default=None, help="JSON report path (default: benchmarks/results/replay-<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    entries = load_log(args.log, include_errors=args.include_errors)[:args.limit]
+    if not entries:
+        print(f"No replayable entries in {args.log}")
+        return 1
+
+    t0 = time.perf_counter()
+    results = asyncio.run(replay(entries, args.speed, args.concurrency))
+    wall_s = time.perf_counter() - t0
+
+    ok = [r for r in results if r["status"] == 200]
+    compared = [r for r in ok if "same_choice" in r]
+    summary = {
+        "requests": len(results),
+        "ok": len(ok),
+        "errors": len(results) - len(ok),
+        "wall_s": round(wall_s, 3),
+        "latency_ms": latency_summary([r["latency_ms"] for r in ok]),
+        "captured_latency_ms": latency_summary([r["captured_latency_ms"] for r in ok if r["captured_latency_ms"] is not None]),
+        "choice_changed": sum(1 for r in compared if not r["same_choice"]),
+        "max_score_delta": max((r["max_score_delta"] for r in compared), default=0.0),
+        "point_misses": sum(r["point_misses"] for r in results),
+    }
+    report = {
+        "benchmark": "replay",
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "log": str(args.log),
+        "config": {"speed": args.speed, "concurrency": args.concurrency, "limit": args.limit},
+        "summary": summary,
+        "samples": results,
+    }
+    out = Path(args.out) if args.out else RESULTS_DIR / f"replay-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+
+    print(f"{summary['ok']}/{summary['requests']} ok  p50={summary['latency_ms']['p50']}ms  "
+          f"p95={summary['latency_ms']['p95']}ms  p99={summary['latency_ms']['p99']}ms  "
+          f"(captured p50={summary['captured_latency_ms']['p50']}ms)")
+    print(f"  choice changed on {summary['choice_changed']} requests, max score delta {summary['max_score_delta']:.3f}, "
+          f"{summary['point_misses']} sampled points answered by nearest recording")
+    print(f"Report written to {out}")
+    return 0 if summary["errors"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+"""
+Fixed vs adaptive sampling benchmark: upstream lookups and cost accuracy.
+
+Each synthetic trip is scored three ways against a reference computed from
+dense 10 m samples weighted by length:
+
+    fixed     sample_route_points every 40 m (what /route does by default; every
+              vertex is also a sample, so its costs are on a different scale)
+    fixed_w   same samples, costs weighted by segment length
+    adaptive  adaptive_sample_route_points with length-weighted costs
+
+Shelter comes from a deterministic field with parks (no shelter), uniform
+residential blocks and a patchy downtown, on the same ~100 m grid as the real
+building cache. "lookups" counts distinct cells, i.e. what would reach Overpass.
+
+Usage (from src/app/backend):
+    python -m benchmarks.sampling --trips 30 --min-km 2 --max-km 15
+"""
+import argparse
+import asyncio
+import json
+import sys
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List
+
+BACKEND_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from benchmarks.synthetic import generate_trips, synthetic_geometry
+from services.buildings import _get_cache_key
+from services.routing.adaptive_sampler import adaptive_sample_route_points, segment_weights
+from services.routing.route_sampler import sample_route_points
+from services.scoring.interfaces import BuildingServiceInterface, SnowServiceInterface
+from services.scoring.route_metrics import compute_route_costs
+from services.scoring.route_scorer import RouteMetrics, RouteScorer
+
+RESULTS_DIR = Path(__file__).parent / "results"
+VARIANTS = 3
+WIND = {"speed": 6.0, "direction": 270.0}
+METHODS = ("fixed", "fixed_w", "adaptive")
+
+
+def _hash01(key: str) -> float:
+    return (zlib.crc32(key.encode()) % 10_000) / 10_000
+
+
+def shelter_field(lat: float, lon: float) -> float:
+    """Parks and open areas, uniform blocks, and patchy downtown, by ~1 km district."""
+    district = f"{round(lat, 2)},{round(lon, 2)}"
+    kind = _hash01("district" + district)
+    if kind < 0.3:
+        return 0.0  # park / open area
+    if kind < 0.7:
+        return round(0.3 + 0.3 * _hash01("block" + district), 2)  # uniform residential
+    return round(_hash01("cell" + _get_cache_key(lat, lon)), 2)  # downtown: changes cell to cell
+
+
+class FieldBuildingService(BuildingServiceInterface):
+    def __init__(self):
+        self.cells = set()
+
+    async def get_building_density(self, lat: float, lon: float) -> Dict[str, Any]:
+        self.cells.add(_get_cache_key(lat, lon))
+        return {"count": 0, "area": 0.0, "shelter_score": shelter_field(lat, lon)}
+
+
+class ConstantSnowService(SnowServiceInterface):
+    async def get_snow_status(self, lat: float, lon: float) -> Dict[str, Any]:
+        return {"status": "cleared", "risk": 0.1}
+
+
+async def score(geometry: dict, method: str) -> Dict[str, Any]:
+    buildings = FieldBuildingService()
+    snow = ConstantSnowService()
+    if method == "reference":
+        points = sample_route_points(geometry, interval_m=10.0)
+        weights = segment_weights(points, 40.0)
+    elif method == "adaptive":
+        points = await adaptive_sample_route_points(geometry, 40.0, building_service=buildings)
+        weights = segment_weights(points, 40.0)
+    else:
+        points = sample_route_points(geometry, interval_m=40.0)
+        weights = segment_weights(points, 40.0) if method == "fixed_w" else None
+    wind_cost, snow_cost = await compute_route_costs(points, WIND, buildings, snow, weights)
+    return {"wind_cost": wind_cost, "snow_cost": snow_cost, "samples": len(points), "lookups": len(buildings.cells)}
+
+
+async def run(trips: List[Dict[str, Any]]) -> Dict[str, Any]:
+    scorer = RouteScorer()
+    totals = {m: {"samples": 0, "lookups": 0, "wind_err_pct": [], "choice_agrees": 0} for m in METHODS}
+    for trip in trips:
+        geometries = [synthetic_geometry(tuple(trip["start"]), tuple(trip["end"]), variant=v, seed=3) for v in range(VARIANTS)]
+        reference = [await score(g, "reference") for g in geometries]
+
+        def best(results):
+            scores = [scorer.score_route(RouteMetrics(0.0, r["wind_cost"], r["snow_cost"])).total_score for r in results]
+            return scores.index(min(scores))
+
+        ref_best = best(reference)
+        for method in METHODS:
+            results = [await score(g, method) for g in geometries]
+            row = totals[method]
+            row["samples"] += sum(r["samples"] for r in results)
+            row["lookups"] += sum(r["lookups"] for r in results)
+            row["choice_agrees"] += best(results) == ref_best
+            # Error relative to the trip's largest reference cost, so near-zero (tailwind) routes don't dominate
+            scale = max(ref["wind_cost"] for ref in reference)
+            for r, ref in zip(results, reference):
+                if scale:
+                    row["wind_err_pct"].append(abs(r["wind_cost"] - ref["wind_cost"]) / scale * 100)
+
+    summary = {}
+    for method, row in totals.items():
+        errors = sorted(row["wind_err_pct"])
+        summary[method] = {
+            "samples": row["samples"],
+            "lookups": row["lookups"],
+            "wind_err_pct_mean": round(sum(errors) / len(errors), 2) if errors else 0.0,
+            "wind_err_pct_p95": round(errors[min(int(0.95 * len(errors)), len(errors) - 1)], 2) if errors else 0.0,
+            "choice_agrees": row["choice_agrees"],
+        }
+    return summary
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Fixed vs adaptive sampling benchmark")
+    parser.add_argument("--trips", type=int, default=30)
+    parser.add_argument("--min-km", type=float, default=2.0)
+    parser.add_argument("--max-km", type=float, default=15.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default=None, help="report path (default: benchmarks/results/sampling-<ts>.json)")
+    args = parser.parse_args(argv)
+
+    trips = generate_trips(args.trips, args.min_km, args.max_km, args.seed)
+    summary = asyncio.run(run(trips))
+
+    print(f"{'method':>9} {'samples':>8} {'lookups':>8} {'wind err % mean':>16} {'p95':>7} {'same choice':>12}")
+    for method, row in summary.items():
+        print(f"{method:>9} {row['samples']:8d} {row['lookups']:8d} {row['wind_err_pct_mean']:16.2f} "
+              f"{row['wind_err_pct_p95']:7.2f} {row['choice_agrees']:8d}/{len(trips)}")
+
+    report = {
+        "benchmark": "sampling",
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": vars(args),
+        "summary": summary,
+    }
+    out = Path(args.out) if args.out else RESULTS_DIR / f"sampling-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+    print(f"Report written to {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""
+Geometry simplification benchmark: samples, lookups and cost deltas per tolerance.
+
+For each synthetic trip, three route variants are scored with and without
+Douglas-Peucker simplification (services/routing/route_sampler.py). Building
+and snow data come from a deterministic spatial field on the same ~100 m grid
+as the real caches, so cost differences come only from the geometry.
+
+Usage (from src/app/backend):
+    python -m benchmarks.simplify --trips 30 --tolerances 0,1,2,3,5,10
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List
+
+BACKEND_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from benchmarks.synthetic import generate_trips, geometry_length_m, synthetic_geometry
+from services.buildings import _get_cache_key
+from services.routing.route_sampler import sample_route_points, simplify_geometry
+from services.scoring.interfaces import BuildingServiceInterface, SnowServiceInterface
+from services.scoring.route_metrics import compute_route_costs
+from services.scoring.route_scorer import RouteMetrics, RouteScorer
+
+RESULTS_DIR = Path(__file__).parent / "results"
+VARIANTS = 3
+WIND = {"speed": 6.0, "direction": 270.0}
+
+
+def _cell_value(lat: float, lon: float, salt: bytes) -> float:
+    """Stable pseudo-random value in [0, 1) per cache cell."""
+    return (zlib.crc32(salt + _get_cache_key(lat, lon).encode()) % 10_000) / 10_000
+
+
+class FieldBuildingService(BuildingServiceInterface):
+    def __init__(self):
+        self.lookups = 0
+
+    async def get_building_density(self, lat: float, lon: float) -> Dict[str, Any]:
+        self.lookups += 1
+        shelter = _cell_value(lat, lon, b"shelter")
+        return {"count": int(shelter * 40), "area": 0.0, "shelter_score": shelter}
+
+
+class FieldSnowService(SnowServiceInterface):
+    def __init__(self):
+        self.lookups = 0
+
+    async def get_snow_status(self, lat: float, lon: float) -> Dict[str, Any]:
+        self.lookups += 1
+        risk = (0.1, 0.3, 0.5, 0.9)[int(_cell_value(lat, lon, b"snow") * 4)]
+        return {"status": "synthetic", "risk": risk}
+
+
+async def score_routes(geometries: List[dict], tolerance_m: float) -> Dict[str, Any]:
+    scorer = RouteScorer()
+    buildings, snow = FieldBuildingService(), FieldSnowService()
+    routes = []
+    vertices = samples = 0
+    t0 = time.perf_counter()
+    for idx, geometry in enumerate(geometries):
+        simplified = simplify_geometry(geometry, tolerance_m)
+        points = sample_route_points(simplified, interval_m=40.0)
+        vertices += len(simplified["coordinates"])
+        samples += len(points)
+        wind_cost, snow_cost = await compute_route_costs(points, WIND, buildings, snow)
+        metrics = RouteMetrics(distance_m=geometry_length_m(geometry), wind_cost=wind_cost, snow_cost=snow_cost)
+        routes.append({"id": f"route_{idx}", "score": scorer.score_route(metrics), "metrics": metrics})
+    return {
+        "seconds": time.perf_counter() - t0,
+        "vertices": vertices,
+        "samples": samples,
+        "lookups": buildings.lookups + snow.lookups,
+        "routes": routes,
+        "chosen": scorer.choose_best_route(routes)["id"],
+    }
+
+
+def _pct(new: float, old: float) -> float:
+    return (new - old) / old * 100 if old else 0.0
+
+
+async def run(trips: List[Dict[str, Any]], tolerances: List[float]) -> Dict[str, Any]:
+    rows = {tol: {"vertices": 0, "samples": 0, "lookups": 0, "seconds": 0.0, "choice_changed": 0,
+                  "wind_delta_pct": [], "snow_delta_pct": [], "score_delta_pct": []} for tol in tolerances}
+    for trip in trips:
+        geometries = [synthetic_geometry(tuple(trip["start"]), tuple(trip["end"]), variant=v, seed=7) for v in range(VARIANTS)]
+        baseline = await score_routes(geometries, 0.0)
+        for tol in tolerances:
+            result = baseline if tol == 0 else await score_routes(geometries, tol)
+            row = rows[tol]
+            for key in ("vertices", "samples", "lookups", "seconds"):
+                row[key] += result[key]
+            row["choice_changed"] += result["chosen"] != baseline["chosen"]
+            for new, old in zip(result["routes"], baseline["routes"]):
+                row["wind_delta_pct"].append(_pct(new["metrics"].wind_cost, old["metrics"].wind_cost))
+                row["snow_delta_pct"].append(_pct(new["metrics"].snow_cost, old["metrics"].snow_cost))
+                row["score_delta_pct"].append(_pct(new["score"].total_score, old["score"].total_score))
+
+    summary = {}
+    for tol, row in rows.items():
+        summary[str(tol)] = {
+            "vertices": row["vertices"],
+            "samples": row["samples"],
+            "lookups": row["lookups"],
+            "seconds": round(row["seconds"], 3),
+            "choice_changed": row["choice_changed"],
+            **{
+                key: {
+                    "mean": round(sum(row[key]) / len(row[key]), 2),
+                    "max_abs": round(max(abs(v) for v in row[key]), 2),
+                }
+                for key in ("wind_delta_pct", "snow_delta_pct", "score_delta_pct")
+            },
+        }
+    return summary
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Route simplification benchmark")
+    parser.add_argument("--trips", type=int, default=30)
+    parser.add_argument("--min-km", type=float, default=1.0)
+    parser.add_argument("--max-km", type=float, default=15.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--tolerances", default="0,1,2,3,5,10", help="comma-separated tolerances in meters")
+    parser.add_argument("--out", default=None, help="report path (default: benchmarks/results/simplify-<ts>.json)")
+    args = parser.parse_args(argv)
+
+    tolerances = sorted({float(t) for t in args.tolerances.split(",")} | {0.0})
+    trips = generate_trips(args.trips, args.min_km, args.max_km, args.seed)
+    summary = asyncio.run(run(trips, tolerances))
+
+    base = summary["0.0"]
+    print(f"{'tol m':>6} {'vertices':>9} {'samples':>8} {'lookups':>8} {'time s':>7} "
+          f"{'wind Δ%':>8} {'snow Δ%':>8} {'score Δ%':>9} {'choice chg':>10}")
+    for tol, row in summary.items():
+        print(f"{float(tol):6.1f} {row['vertices']:9d} {row['samples']:8d} {row['lookups']:8d} {row['seconds']:7.2f} "
+              f"{row['wind_delta_pct']['mean']:8.1f} {row['snow_delta_pct']['mean']:8.1f} "
+              f"{row['score_delta_pct']['mean']:9.2f} {row['choice_changed']:6d}/{len(trips)}")
+    print(f"(lookups relative to unsimplified: "
+          + ", ".join(f"{float(t):g} m {r['lookups'] / base['lookups']:.0%}" for t, r in summary.items()) + ")")
+
+    report = {
+        "benchmark": "simplify",
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": vars(args),
+        "summary": summary,
+    }
+    out = Path(args.out) if args.out else RESULTS_DIR / f"simplify-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+    print(f"Report written to {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""
+Synthetic trips and route geometries for the benchmarks.
+
+Trips are (start, end) pairs around Montreal at a chosen straight-line
+distance, and geometries are dense ORS-like polylines between them so that
+long routes exercise sampling and lookups the same way real ones do.
+"""
+import math
+import random
+from typing import Any, Dict, List, Tuple
+
+from services.routing.route_sampler import haversine_distance
+
+# A few busy origins (lon, lat) so trips cover downtown, the Plateau and Old Montreal
+MONTREAL_ORIGINS = [
+    (-73.5673, 45.5017),
+    (-73.5534, 45.5088),
+    (-73.5790, 45.5220),
+    (-73.5878, 45.5048),
+]
+
+_M_PER_DEG_LAT = 111_320.0
+
+
+def offset_point(origin: Tuple[float, float], bearing_deg: float, distance_m: float) -> Tuple[float, float]:
+    """Move `distance_m` from origin (lon, lat) along a bearing (flat-earth, fine at city scale)."""
+    lon, lat = origin
+    bearing = math.radians(bearing_deg)
+    dlat = distance_m * math.cos(bearing) / _M_PER_DEG_LAT
+    dlon = distance_m * math.sin(bearing) / (_M_PER_DEG_LAT * math.cos(math.radians(lat)))
+    return (lon + dlon, lat + dlat)
+
+
+def generate_trips(
+    count: int,
+    min_km: float = 1.0,
+    max_km: float = 20.0,
+    seed: int = 42
+) -> List[Dict[str, Any]]:
+    """
+    Generate `count` trips with straight-line lengths spread evenly in [min_km, max_km].
+
+    Returns a list of {"start": [lon, lat], "end": [lon, lat], "km": float}.
+    """
+    rng = random.Random(seed)
+    trips = []
+    for i in range(count):
+        if count > 1:
+            km = min_km + (max_km - min_km) * i / (count - 1)
+        else:
+            km = min_km
+        origin = rng.choice(MONTREAL_ORIGINS)
+        end = offset_point(origin, rng.uniform(0, 360), km * 1000)
+        trips.append({"start": list(origin), "end": list(end), "km": round(km, 2)})
+    rng.shuffle(trips)
+    return trips
+
+
+def synthetic_geometry(
+    start: Tuple[float, float],
+    end: Tuple[float, float],
+    variant: int = 0,
+    vertex_spacing_m: float = 12.0,
+    seed: int = 0
+) -> Dict[str, Any]:
+    """
+    Build a GeoJSON LineString from start to end that looks like a walking route.
+
+    Each variant bows out to a different side, and every vertex gets a little
+    lateral noise so the line has the many near-collinear vertices ORS returns
+    for city walks.
+    """
+    straight_m = max(haversine_distance(start, end), 1.0)
+    n_vertices = max(int(straight_m / vertex_spacing_m), 2)
+    rng = random.Random(hash((round(start[0], 5), round(start[1], 5), variant, seed)))
+
+    bulge = (0.0, 0.12, -0.12, 0.2, -0.2)[variant % 5]
+    # Unit vectors along and across the straight line, in degrees
+    dlon = end[0] - start[0]
+    dlat = end[1] - start[1]
+    cos_lat = math.cos(math.radians(start[1]))
+    length = math.hypot(dlon * cos_lat, dlat) or 1e-9
+    perp_lon = -dlat / length / cos_lat
+    perp_lat = dlon * cos_lat / length
+
+    coordinates = []
+    for i in range(n_vertices + 1):
+        t = i / n_vertices
+        lateral = bulge * math.sin(math.pi * t) * length
+        if 0 < i < n_vertices:
+            lateral += rng.uniform(-1.5, 1.5) / _M_PER_DEG_LAT  # ~1.5 m of wobble
+        coordinates.append([
+            start[0] + dlon * t + perp_lon * lateral,
+            start[1] + dlat * t + perp_lat * lateral,
+        ])
+    return {"type": "LineString", "coordinates": coordinates}
+
+
+def geometry_length_m(geometry: Dict[str, Any]) -> float:
+    coords = geometry.get("coordinates", [])
+    return sum(
+        haversine_distance(tuple(coords[i]), tuple(coords[i + 1]))
+        for i in range(len(coords) - 1)
+    )
+
+
+_STREET_TYPES = ["Rue", "Avenue", "Boulevard", "Chemin", "Place", "Côte"]
+_STREET_NAMES = [
+    "Sainte-Catherine", "Saint-Denis", "Sherbrooke", "Notre-Dame", "Saint-Laurent",
+    "Mont-Royal", "Rachel", "Papineau", "Ontario", "Beaubien", "Jean-Talon", "Bélanger",
+    "de la Montagne", "Peel", "Crescent", "Guy", "Atwater", "du Parc", "Laurier", "Fairmount",
+]
+
+
+def synthetic_geobase(n_segments: int, seed: int = 0) -> Dict[str, Dict[str, Any]]:
+    """
+    Build a geobase-map-like dict (cote_rue_id -> {nom_voie, debut_adresse, fin_adresse})
+    with `n_segments` street sides spread over many distinct streets, like the real dataset.
+    """
+    rng = random.Random(seed)
+    geomap = {}
+    cote_id = 1_000_000
+    street_no = 0
+    while len(geomap) < n_segments:
+        name = f"{_STREET_TYPES[street_no % len(_STREET_TYPES)]} {_STREET_NAMES[street_no % len(_STREET_NAMES)]}"
+        if street_no >= len(_STREET_NAMES):
+            name += f" {street_no // len(_STREET_NAMES)}"  # e.g. "Rue Peel 12" to get many distinct streets
+        blocks = rng.randint(5, 60)
+        for block in range(blocks):
+            for side in (0, 1):
+                if len(geomap) >= n_segments:
+                    break
+                start = block * 100 + 1 + side
+                geomap[str(cote_id)] = {
+                    "nom_voie": name,
+                    "debut_adresse": start,
+                    "fin_adresse": start + 98,
+                    "cote": "Gauche" if side == 0 else "Droit",
+                }
+                cote_id += 1
+        street_no += 1
+    return geomap
+
+
+def geobase_queries(geomap: Dict[str, Dict[str, Any]], count: int, seed: int = 0) -> List[Tuple[str, Any]]:
+    """(street, house_number) lookups against a synthetic geobase; some miss, some have no number."""
+    rng = random.Random(seed)
+    records = list(geomap.values())
+    queries = []
+    for i in range(count):
+        rec = rng.choice(records)
+        street = rec["nom_voie"].upper() if i % 7 == 0 else rec["nom_voie"]  # normalization matters
+        if i % 10 == 0:
+            queries.append((street, None))
+        elif i % 13 == 0:
+            queries.append(("Rue Inexistante", rng.randint(1, 5000)))
+        else:
+            queries.append((street, rng.randint(rec["debut_adresse"], rec["fin_adresse"])))
+    return queries
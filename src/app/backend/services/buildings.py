@@ -73,17 +73,59 @@ async def get_building_features(lat: float, lon: float, radius_m: int = 40):
     }'''
 
 # Building feature extraction (Overpass)
+import asyncio
+import os
+import time
 import httpx
 import re
 from services.scoring.interfaces import BuildingServiceInterface
+from services import disk_cache
+from services.resilience import HEDGE_LOST, CircuitOpenError, get_breaker, hedge_cancel_reason, hedged_request
+from services.upstream_scheduler import scheduler
 
 _NUM = re.compile(r"(-?\d+(\.\d+)?)")
-OVERPASS_URL = "https://overpass-api.de/api/interpreter"
+_DEFAULT_OVERPASS_URL = "https://overpass-api.de/api/interpreter"
+OVERPASS_URL = os.getenv("OVERPASS_URL", _DEFAULT_OVERPASS_URL)
+
+# Mirrors are tried in order: a request is hedged to the next mirror when the
+# current ones are slower than OVERPASS_HEDGE_AFTER_S, and each mirror has its
+# own circuit breaker.
+_env_mirrors = [u.strip() for u in os.getenv("OVERPASS_MIRRORS", "").split(",") if u.strip()]
+if _env_mirrors:
+    OVERPASS_MIRRORS = _env_mirrors
+elif OVERPASS_URL == _DEFAULT_OVERPASS_URL:
+    OVERPASS_MIRRORS = [OVERPASS_URL, "https://overpass.kumi.systems/api/interpreter"]
+else:
+    OVERPASS_MIRRORS = [OVERPASS_URL]
+
+OVERPASS_HEDGE_AFTER_S = float(os.getenv("OVERPASS_HEDGE_AFTER_S", "1.5"))
+OVERPASS_TIMEOUT_S = float(os.getenv("OVERPASS_TIMEOUT_S", "8"))  # bound on the whole hedged lookup
+# One mirror call; shorter than OVERPASS_TIMEOUT_S so a hung mirror fails (and trips its breaker) on its own
+OVERPASS_ATTEMPT_TIMEOUT_S = float(os.getenv("OVERPASS_ATTEMPT_TIMEOUT_S", "6"))
+OVERPASS_BREAKER_FAILURES = int(os.getenv("OVERPASS_BREAKER_FAILURES", "5"))
+OVERPASS_BREAKER_RESET_S = float(os.getenv("OVERPASS_BREAKER_RESET_S", "30"))
+OVERPASS_NEGATIVE_TTL_S = float(os.getenv("OVERPASS_NEGATIVE_TTL_S", "60"))
 
 # Add caching to reduce API calls
 _BUILDING_CACHE = {}
 _CACHE_GRID_SIZE = 0.002  # ~100m grid (points within 100m share cache)
 
+# Failed lookups are remembered only briefly so one outage doesn't zero a cell forever
+_BUILDING_NEGATIVE_CACHE = {}  # cache_key -> expiry (time.monotonic())
+
+_client: httpx.AsyncClient | None = None
+_client_loop = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    """Shared client (connection pooling across lookups), one per event loop."""
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client_loop is not loop:
+        _client = httpx.AsyncClient(timeout=min(OVERPASS_ATTEMPT_TIMEOUT_S, OVERPASS_TIMEOUT_S))
+        _client_loop = loop
+    return _client
+
 def _get_cache_key(lat: float, lon: float) -> str:
     """Round coordinates to cache grid"""
     lat_rounded = round(lat / _CACHE_GRID_SIZE) * _CACHE_GRID_SIZE
@@ -143,26 +185,74 @@ def _compute_shelter_score(building_count: int, avg_height: float | None) -> flo
     
     return min(count_score + height_bonus, 1.0)
 
+def _overpass_attempt(url: str, query: str):
+    """One mirror call, reported to that mirror's circuit breaker."""
+    breaker = get_breaker(f"overpass:{url}", OVERPASS_BREAKER_FAILURES, OVERPASS_BREAKER_RESET_S)
+
+    async def attempt():
+        if not breaker.allow():
+            raise CircuitOpenError(f"circuit open for {url}")  # skip straight to the next mirror
+        try:
+            response = await _get_client().post(url, content=query) # holds what overpass sent
+            response.raise_for_status() # throws an exception if overpass returned an error code
+            data = response.json() # parses response body as json
+        except asyncio.CancelledError as e:
+            reason = hedge_cancel_reason(e)
+            if reason is None or reason == HEDGE_LOST:
+                breaker.release()  # lost the race, or the caller gave up: says nothing about the mirror
+            else:
+                breaker.record_failure()  # still hanging at the overall deadline
+            raise
+        except Exception:
+            breaker.record_failure()
+            raise
+        breaker.record_success()
+        return data
+    return attempt
+
+
+async def _fetch_overpass(query: str) -> dict:
+    """Raises CircuitOpenError only when every mirror was skipped by an open circuit;
+    if any mirror was actually tried, its error is raised instead."""
+    attempts = [_overpass_attempt(url, query) for url in OVERPASS_MIRRORS]
+    await scheduler.acquire("overpass")  # one fair-use token per lookup, hedges included
+    return await hedged_request(attempts, OVERPASS_HEDGE_AFTER_S, OVERPASS_TIMEOUT_S)
+
+
+def _default_features(source: str) -> dict:
+    return {
+        "building_count_40m": 0,
+        "building_area_m2_40m": None,
+        "source": source,
+    }
+
+
 async def get_building_features(lat: float, lon: float, radius_m: int = 40):
     # Check cache first
     cache_key = _get_cache_key(lat, lon)
     if cache_key in _BUILDING_CACHE:
         return _BUILDING_CACHE[cache_key]
+
+    expires = _BUILDING_NEGATIVE_CACHE.get(cache_key)
+    if expires is not None:
+        if time.monotonic() < expires:
+            return _default_features("overpass_error_cached")
+        del _BUILDING_NEGATIVE_CACHE[cache_key]
+
+    # L2: features from an earlier run (FROSTBYTE_DISK_CACHE)
+    stored = await asyncio.to_thread(disk_cache.get, "overpass", cache_key)
+    if stored is not None:
+        _BUILDING_CACHE[cache_key] = stored
+        return stored
     
     query = _buildings_query(lat, lon, radius_m)
     try:
-        async with httpx.AsyncClient(timeout=30) as client:
-            response = await client.post(OVERPASS_URL, content=query) # holds what overpass sent
-            response.raise_for_status() # throws an exception if overpass returned an error code
-            data = response.json() # parses response body as json
+        data = await _fetch_overpass(query)
+    except CircuitOpenError:
+        return _default_features("overpass_circuit_open")
     except Exception:
-        result = {
-            "building_count_40m": 0,
-            "building_area_m2_40m": None,
-            "source": "overpass_error_default",
-        }
-        _BUILDING_CACHE[cache_key] = result  # Cache even errors
-        return result
+        _BUILDING_NEGATIVE_CACHE[cache_key] = time.monotonic() + OVERPASS_NEGATIVE_TTL_S
+        return _default_features("overpass_error_default")
     
     elements = data.get("elements", []) # elements is where overpass stores buildings, if key is missing it uses an empty list
     heights = []
@@ -185,6 +275,7 @@ async def get_building_features(lat: float, lon: float, radius_m: int = 40):
     
     # Cache the result
     _BUILDING_CACHE[cache_key] = result
+    disk_cache.put("overpass", cache_key, result)
     return result
 
 class BuildingService(BuildingServiceInterface):
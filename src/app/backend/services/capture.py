@@ -0,0 +1,149 @@
+"""
+Optional request capture for /route.
+
+When FROSTBYTE_CAPTURE_PATH is set, every /route request is appended to that
+file as one JSON line together with the upstream data it used (ORS
+alternatives, wind, building density and snow status per sampled point).
+benchmarks/replay.py re-runs such a log against the current code with no
+network access.
+"""
+import json
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional
+
+from services.scoring.interfaces import BuildingServiceInterface, SnowServiceInterface
+
+CAPTURE_PATH = os.getenv("FROSTBYTE_CAPTURE_PATH")  # capture is off unless this is set
+CAPTURED_PATHS = ("/route",)
+
+_current: ContextVar[Optional[Dict[str, Any]]] = ContextVar("frostbyte_capture", default=None)
+_write_lock = threading.Lock()
+
+
+def point_key(lat: float, lon: float) -> str:
+    """Key used for per-point upstream data in capture records."""
+    return f"{lat:.7f},{lon:.7f}"
+
+
+def record_upstream(kind: str, key: str, value: Any) -> None:
+    """Attach upstream data to the request being captured (no-op outside a capture)."""
+    record = _current.get()
+    if record is None:
+        return
+    record["upstream"].setdefault(kind, {})[key] = value
+
+
+def _append(path: str, record: Dict[str, Any]) -> None:
+    line = json.dumps(record, separators=(",", ":"))
+    with _write_lock:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+def _response_summary(body: bytes) -> Optional[Dict[str, Any]]:
+    """Keep only what replay needs to check for drift, not the whole payload."""
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return None
+    return {
+        "chosen_route_id": data.get("chosen_route_id"),
+        "scores": {r.get("id"): r.get("score") for r in data.get("routes", [])},
+    }
+
+
+class CaptureMiddleware:
+    """ASGI middleware that records captured paths (request body, upstream data, outcome)."""
+
+    def __init__(self, app, path: str, paths=CAPTURED_PATHS):
+        self.app = app
+        self.path = path
+        self.paths = paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        request_body = []
+        response_body = []
+        outcome = {"status": None}
+
+        async def receive_wrapper():
+            message = await receive()
+            if message["type"] == "http.request":
+                request_body.append(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                outcome["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                response_body.append(message.get("body", b""))
+            await send(message)
+
+        record = {"ts": time.time(), "path": scope["path"], "upstream": {}}
+        token = _current.set(record)
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            _current.reset(token)
+            record["latency_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+            record["status"] = outcome["status"]
+            try:
+                record["request"] = json.loads(b"".join(request_body) or b"null")
+            except ValueError:
+                record["request"] = None
+            if outcome["status"] == 200:
+                record["response"] = _response_summary(b"".join(response_body))
+            try:
+                _append(self.path, record)
+            except OSError as e:
+                print(f"WARNING: could not write capture record: {e}")
+
+
+def call_key(args: tuple, kwargs: dict) -> str:
+    """Recording key of a sync upstream call (keyword arguments only when given)."""
+    key = [list(a) if isinstance(a, tuple) else a for a in args]
+    if kwargs:
+        key.append(kwargs)
+    return json.dumps(key)
+
+
+def capturing(fn: Callable, kind: str) -> Callable:
+    """Wrap a sync upstream function so its result is recorded under `kind`."""
+    def wrapper(*args, **kwargs):
+        result = fn(*args, **kwargs)
+        record_upstream(kind, call_key(args, kwargs), result)
+        return result
+    wrapper.__name__ = getattr(fn, "__name__", kind)
+    wrapper.__doc__ = fn.__doc__
+    return wrapper
+
+
+class CapturingBuildingService(BuildingServiceInterface):
+    """Records every building density lookup made by the wrapped service."""
+
+    def __init__(self, inner: BuildingServiceInterface):
+        self.inner = inner
+
+    async def get_building_density(self, lat: float, lon: float) -> dict:
+        result = await self.inner.get_building_density(lat, lon)
+        record_upstream("buildings", point_key(lat, lon), result)
+        return result
+
+
+class CapturingSnowService(SnowServiceInterface):
+    """Records every snow status lookup made by the wrapped service."""
+
+    def __init__(self, inner: SnowServiceInterface):
+        self.inner = inner
+
+    async def get_snow_status(self, lat: float, lon: float) -> dict:
+        result = await self.inner.get_snow_status(lat, lon)
+        record_upstream("snow", point_key(lat, lon), result)
+        return result
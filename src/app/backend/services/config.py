@@ -0,0 +1,31 @@
+"""
+Process configuration, loaded once at import.
+
+The project-root `.env` is read here, a single time, before the service
+modules read their settings from the environment. Variables already set in
+the environment win over `.env`. Nothing is printed at import; `summary()`
+reports what was found (logged once at startup, secrets masked).
+"""
+import os
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+ENV_PATH = Path(__file__).resolve().parents[4] / ".env"  # project root
+ENV_LOADED = load_dotenv(ENV_PATH)
+
+ORS_API_KEY = os.getenv("ORS_API_KEY")
+# Base URLs can be overridden (e.g. to point at the local stand-ins in benchmarks/)
+ORS_BASE_URL = os.getenv("ORS_BASE_URL", "https://api.openrouteservice.org/v2")
+
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL")  # optional override, used by the benchmarks
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "models/gemini-2.5-flash")
+
+
+def summary() -> dict:
+    return {
+        "env_file": str(ENV_PATH) if ENV_LOADED else None,
+        "ors_api_key": bool(ORS_API_KEY),
+        "gemini_api_key": bool(GEMINI_API_KEY),
+    }
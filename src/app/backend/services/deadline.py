@@ -0,0 +1,190 @@
+"""
+Per-request latency budgets for shelter and snow lookups.
+
+A request opens a budget with `request_budget(seconds)`; it lives in a context
+variable, so every lookup made while serving the request (including in tasks
+and threads started from it) sees the same deadline without passing it around.
+
+BudgetedBuildingService / BudgetedSnowService wrap the real services. Inside a
+budget, a lookup gets at most the time left minus DEADLINE_RESERVE_S (kept for
+scoring and the response). When that runs out the sample is filled instead:
+
+    interpolated  inverse-distance average of cached cells within
+                  FALLBACK_RINGS cells (~100 m each) of the point
+    default       nothing cached nearby: no shelter, snow risk 0.3 (unknown)
+
+A lookup that misses its slot keeps running in the background and warms the
+cache for the next request. Outside a budget the wrappers just pass through.
+`Budget.coverage()` is the share of samples answered by a real lookup.
+"""
+import asyncio
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional
+
+from services import buildings, snow
+from services.scoring.interfaces import BuildingServiceInterface, SnowServiceInterface
+
+ROUTE_BUDGET_S = float(os.getenv("FROSTBYTE_ROUTE_BUDGET_S", "2"))
+DEADLINE_RESERVE_S = float(os.getenv("FROSTBYTE_DEADLINE_RESERVE_S", "0.25"))
+FALLBACK_RINGS = 2
+DEFAULT_SNOW_RISK = 0.3
+
+
+class Budget:
+    def __init__(self, budget_s: float):
+        self.budget_s = budget_s
+        self.deadline = time.monotonic() + budget_s
+        self.exact = 0
+        self.interpolated = 0
+        self.defaulted = 0
+
+    def remaining(self) -> float:
+        return self.deadline - time.monotonic()
+
+    def lookup_time_left(self) -> float:
+        return self.remaining() - DEADLINE_RESERVE_S
+
+    def coverage(self) -> float:
+        total = self.exact + self.interpolated + self.defaulted
+        return self.exact / total if total else 1.0
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "budget_ms": round(self.budget_s * 1000),
+            "exact": self.exact,
+            "interpolated": self.interpolated,
+            "default": self.defaulted,
+        }
+
+
+_budget: ContextVar[Optional[Budget]] = ContextVar("frostbyte_budget", default=None)
+
+
+@contextmanager
+def request_budget(budget_s: Optional[float]) -> Iterator[Optional[Budget]]:
+    """Bound lookups made inside this block to `budget_s` seconds (None = no budget)."""
+    budget = Budget(budget_s) if budget_s is not None else None
+    token = _budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _budget.reset(token)
+
+
+def current() -> Optional[Budget]:
+    return _budget.get()
+
+
+def _nearby(cache: Dict[str, Any], grid: float, lat: float, lon: float,
+            value: Callable[[Any], Optional[float]]) -> Optional[float]:
+    """Inverse-distance weighted value of cached cells around a point (None if none are cached)."""
+    base_lat, base_lon = round(lat / grid), round(lon / grid)
+    total = weights = 0.0
+    for i in range(-FALLBACK_RINGS, FALLBACK_RINGS + 1):
+        for j in range(-FALLBACK_RINGS, FALLBACK_RINGS + 1):
+            cell_lat, cell_lon = (base_lat + i) * grid, (base_lon + j) * grid
+            entry = cache.get(f"{cell_lat:.4f},{cell_lon:.4f}")
+            v = value(entry) if entry is not None else None
+            if v is None:
+                continue
+            w = 1.0 / (((cell_lat - lat) / grid) ** 2 + ((cell_lon - lon) / grid) ** 2 + 0.25)
+            total += w * v
+            weights += w
+    return total / weights if weights else None
+
+
+def _cached_shelter(features: Dict[str, Any]) -> Optional[float]:
+    if features.get("source") != "overpass":
+        return None  # error defaults say nothing about the neighbourhood
+    return buildings._compute_shelter_score(features.get("building_count_40m", 0), features.get("avg_building_height_m"))
+
+
+def _cached_risk(result: Dict[str, Any]) -> Optional[float]:
+    return result.get("risk") if result.get("cote_rue_id") else None
+
+
+def _retrieve(task: asyncio.Future) -> None:
+    if not task.cancelled():
+        task.exception()  # orphaned lookups must not log "exception was never retrieved"
+
+
+async def _within_budget(
+    budget: Budget,
+    fetch: Callable[[], Awaitable[Dict[str, Any]]],
+    cached: bool,
+    fallback: Callable[[], Optional[Dict[str, Any]]],
+    default: Callable[[], Dict[str, Any]]
+) -> Dict[str, Any]:
+    if cached:  # answered from memory, no reason to skip it
+        budget.exact += 1
+        return await fetch()
+    left = budget.lookup_time_left()
+    if left > 0:
+        task = asyncio.ensure_future(fetch())
+        try:
+            result = await asyncio.wait_for(asyncio.shield(task), left)
+            budget.exact += 1
+            return result
+        except asyncio.TimeoutError:
+            task.add_done_callback(_retrieve)  # finishes in the background and fills the cache
+    result = fallback()
+    if result is not None:
+        budget.interpolated += 1
+        return result
+    budget.defaulted += 1
+    return default()
+
+
+class BudgetedBuildingService(BuildingServiceInterface):
+    """Building lookups bounded by the request budget (pass-through without one)."""
+
+    def __init__(self, inner: BuildingServiceInterface):
+        self.inner = inner
+
+    async def get_building_density(self, lat: float, lon: float) -> dict:
+        budget = _budget.get()
+        if budget is None:
+            return await self.inner.get_building_density(lat, lon)
+
+        def fallback():
+            shelter = _nearby(buildings._BUILDING_CACHE, buildings._CACHE_GRID_SIZE, lat, lon, _cached_shelter)
+            if shelter is None:
+                return None
+            return {"count": 0, "area": 0.0, "shelter_score": shelter, "source": "interpolated"}
+
+        return await _within_budget(
+            budget,
+            lambda: self.inner.get_building_density(lat, lon),
+            buildings._get_cache_key(lat, lon) in buildings._BUILDING_CACHE,
+            fallback,
+            lambda: {"count": 0, "area": 0.0, "shelter_score": 0.0, "source": "default"},
+        )
+
+
+class BudgetedSnowService(SnowServiceInterface):
+    """Snow lookups bounded by the request budget (pass-through without one)."""
+
+    def __init__(self, inner: SnowServiceInterface):
+        self.inner = inner
+
+    async def get_snow_status(self, lat: float, lon: float) -> dict:
+        budget = _budget.get()
+        if budget is None:
+            return await self.inner.get_snow_status(lat, lon)
+
+        def fallback():
+            risk = _nearby(snow._SNOW_CACHE, snow._SNOW_CACHE_GRID_SIZE, lat, lon, _cached_risk)
+            if risk is None:
+                return None
+            return {"status": "unknown", "risk": risk, "source": "interpolated"}
+
+        return await _within_budget(
+            budget,
+            lambda: self.inner.get_snow_status(lat, lon),
+            snow._get_snow_cache_key(lat, lon) in snow._SNOW_CACHE,
+            fallback,
+            lambda: {"status": "unknown", "risk": DEFAULT_SNOW_RISK, "source": "default"},
+        )
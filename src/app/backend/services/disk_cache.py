@@ -0,0 +1,291 @@
+"""
+Persistent on-disk L2 cache (SQLite) under the in-memory upstream caches.
+
+With FROSTBYTE_DISK_CACHE set to a file path, normalized upstream results
+survive restarts and deploys. Currently cached:
+
+    overpass      building features per cache cell (buildings.py)
+    openmeteo     current wind per ~1 km cell (wind_service.py)
+    openmeteo_forecast  hourly forecast per ~1 km cell
+
+Geocoded addresses are not stored here: snow.py persists them in its own
+point cache file (FROSTBYTE_SNOW_POINT_CACHE).
+
+Each source has its own TTL (SOURCE_TTL_S, overridable per source with
+FROSTBYTE_DISK_CACHE_TTL_<SOURCE>). Values are zlib-compressed JSON.
+
+Reads are single primary-key lookups. Each thread uses its own connection, and WAL
+mode lets reads proceed during a write. A read can still wait up to the 5 s busy
+timeout (e.g. during a checkpoint), so async code reads through asyncio.to_thread.
+The wind functions are sync and already run in a worker thread.
+Writes are queued and committed in batches by one background thread, so the event loop
+never waits on the disk.
+
+The size limit (FROSTBYTE_DISK_CACHE_MAX_MB) applies to the stored rows (key + value +
+ROW_OVERHEAD each), a running total kept by the writer. Page usage is not a usable
+measure: deleting scattered rows empties few whole pages. Past the limit,
+expired rows go first, then the oldest written, picked in one pass to bring the
+total down to EVICT_TO of the limit. The file uses incremental auto-vacuum, so
+the freed pages are handed back to the filesystem. `forget(source, match)` drops entries explicitly (admin
+evict), also on the writer thread, so it is applied after any writes queued before it.
+"""
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+DISK_CACHE_PATH = os.getenv("FROSTBYTE_DISK_CACHE")
+DISK_CACHE_MAX_BYTES = int(float(os.getenv("FROSTBYTE_DISK_CACHE_MAX_MB", "512")) * 1024 * 1024)
+SOURCE_TTL_S = {
+    "overpass": 30 * 86400.0,        # buildings change rarely
+    "openmeteo": 300.0,              # same as the in-memory current-wind TTL
+    "openmeteo_forecast": 1800.0,
+}
+for _source in SOURCE_TTL_S:
+    SOURCE_TTL_S[_source] = float(os.getenv(f"FROSTBYTE_DISK_CACHE_TTL_{_source.upper()}", SOURCE_TTL_S[_source]))
+WRITE_BATCH = 500      # rows per transaction at most
+WRITE_FLUSH_S = 0.5    # how long the writer gathers rows before committing
+EVICT_TO = 0.9         # shrink to this fraction of the limit
+ROW_OVERHEAD = 32      # timestamps, record header and cell pointer, per row
+_COMPRESS_LEVEL = 6
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    source TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    expires REAL NOT NULL,
+    written REAL NOT NULL,
+    PRIMARY KEY (source, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_written ON entries (written);
+CREATE INDEX IF NOT EXISTS entries_expires ON entries (expires);
+"""
+
+
+Row = Tuple[str, str, bytes, float, float]  # source, key, value, expires, written
+Forget = Tuple[str, Callable[[str], bool]]  # source, key predicate
+
+
+_ROW_BYTES = f"length(source) + length(key) + length(value) + {ROW_OVERHEAD}"
+
+
+def _encode(value: Any) -> bytes:
+    return zlib.compress(json.dumps(value, separators=(",", ":")).encode("utf-8"), _COMPRESS_LEVEL)
+
+
+def _decode(blob: bytes) -> Any:
+    return json.loads(zlib.decompress(blob))
+
+
+class DiskCache:
+    def __init__(self, path: str, max_bytes: int = DISK_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._pending: "queue.Queue[Optional[Union[Row, Forget]]]" = queue.Queue()
+        self.stats = {"hits": 0, "misses": 0, "written": 0, "evicted": 0, "forgotten": 0, "write_errors": 0}
+        conn = self._connect()
+        conn.executescript(_SCHEMA)
+        self._bytes = conn.execute(f"SELECT COALESCE(SUM({_ROW_BYTES}), 0) FROM entries").fetchone()[0]
+        conn.close()
+        self._writer = threading.Thread(target=self._write_loop, name="disk-cache-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")  # only takes effect on a new, empty file
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")  # a crash may lose the last batch, never corrupt the file
+        return conn
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def get(self, source: str, key: str) -> Optional[Any]:
+        try:
+            row = self._reader().execute(
+                "SELECT value, expires FROM entries WHERE source = ? AND key = ?", (source, key)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"WARNING: disk cache read failed: {e}")
+            return None
+        if row is None or row[1] <= time.time():
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return _decode(row[0])
+
+    def put(self, source: str, key: str, value: Any) -> None:
+        """Queue a write; returns immediately."""
+        now = time.time()
+        self._pending.put((source, key, _encode(value), now + SOURCE_TTL_S[source], now))
+
+    def forget(self, source: str, match: Callable[[str], bool]) -> None:
+        """Queue removal of every `source` entry whose key matches."""
+        self._pending.put((source, match))
+
+    def _write_loop(self) -> None:
+        conn = self._connect()
+        while True:
+            item = self._pending.get()
+            if item is None:
+                break
+            batch: List[Union[Row, Forget]] = [item]
+            deadline = time.monotonic() + WRITE_FLUSH_S
+            stop = False
+            while len(batch) < WRITE_BATCH:
+                try:
+                    item = self._pending.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            try:
+                self._apply(conn, batch)
+                self._evict(conn)
+            except sqlite3.Error as e:
+                self.stats["write_errors"] += 1
+                print(f"WARNING: disk cache write of {len(batch)} rows failed: {e}")
+            if stop:
+                break
+        conn.close()
+
+    def _delete(self, conn: sqlite3.Connection, keys: List[Tuple[str, str]]) -> int:
+        """Delete rows by (source, key); returns the bytes they held."""
+        freed = 0
+        for source, key in keys:
+            row = conn.execute(
+                f"DELETE FROM entries WHERE source = ? AND key = ? RETURNING {_ROW_BYTES}", (source, key)
+            ).fetchone()
+            freed += row[0] if row else 0
+        return freed
+
+    def _apply(self, conn: sqlite3.Connection, batch: List[Union[Row, Forget]]) -> None:
+        """Write a batch in one transaction, keeping writes and forgets in queue order."""
+        delta = written = forgotten = 0
+        with conn:
+            conn.execute("BEGIN")
+            for item in batch:
+                if len(item) == 5:
+                    source, key, value = item[:3]
+                    delta += self._delete(conn, [(source, key)])  # the row it replaces, if any
+                    conn.execute("INSERT INTO entries VALUES (?, ?, ?, ?, ?)", item)
+                    delta -= len(source) + len(key) + len(value) + ROW_OVERHEAD
+                    written += 1
+                else:
+                    source, match = item
+                    keys = [(source, k) for (k,) in conn.execute("SELECT key FROM entries WHERE source = ?", (source,))
+                            if match(k)]
+                    delta += self._delete(conn, keys)
+                    forgotten += len(keys)
+        # Committed: now the running total and stats can move
+        self._bytes -= delta
+        self.stats["written"] += written
+        self.stats["forgotten"] += forgotten
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        if self._bytes <= self.max_bytes:
+            return
+        target = self.max_bytes * EVICT_TO
+        with conn:
+            conn.execute("BEGIN")
+            expired = conn.execute(
+                f"DELETE FROM entries WHERE expires <= ? RETURNING {_ROW_BYTES}", (time.time(),)
+            ).fetchall()
+            freed = sum(size for (size,) in expired)
+            # Oldest first, just enough of them to get under the target
+            victims: List[Tuple[str, str]] = []
+            over = self._bytes - freed - target
+            if over > 0:
+                cursor = conn.execute(f"SELECT source, key, {_ROW_BYTES} FROM entries ORDER BY written")
+                for source, key, size in cursor:
+                    victims.append((source, key))
+                    over -= size
+                    if over <= 0:
+                        break
+                cursor.close()
+            freed += self._delete(conn, victims)
+        self._bytes -= freed
+        self.stats["evicted"] += len(expired) + len(victims)
+        conn.execute("PRAGMA incremental_vacuum")  # give the freed pages back
+
+    def close(self) -> None:
+        """Flush queued writes and stop the writer."""
+        self._pending.put(None)
+        self._writer.join(timeout=10)
+
+    def status(self) -> Dict[str, Any]:
+        try:
+            rows = self._reader().execute("SELECT source, COUNT(*) FROM entries GROUP BY source").fetchall()
+        except sqlite3.Error:
+            rows = []
+        try:
+            file_bytes = os.path.getsize(self.path)
+        except OSError:
+            file_bytes = 0
+        return {
+            "path": self.path,
+            "max_mb": round(self.max_bytes / 1024 / 1024, 1),
+            "stored_mb": round(self._bytes / 1024 / 1024, 1),
+            "file_mb": round(file_bytes / 1024 / 1024, 1),
+            "entries": dict(rows),
+            "pending_writes": self._pending.qsize(),
+            **self.stats,
+        }
+
+
+_cache: Optional[DiskCache] = None
+_open_lock = threading.Lock()
+
+
+def open_cache() -> Optional[DiskCache]:
+    """The process's cache, opened on first use (None when FROSTBYTE_DISK_CACHE is unset or unusable)."""
+    global _cache, DISK_CACHE_PATH
+    if _cache is None and DISK_CACHE_PATH:
+        with _open_lock:
+            if _cache is None and DISK_CACHE_PATH:
+                try:
+                    _cache = DiskCache(DISK_CACHE_PATH)
+                except (sqlite3.Error, OSError) as e:
+                    print(f"WARNING: disk cache disabled: {e}")
+                    DISK_CACHE_PATH = None
+    return _cache
+
+
+def get(source: str, key: str) -> Optional[Any]:
+    cache = open_cache()
+    return cache.get(source, key) if cache is not None else None
+
+
+def put(source: str, key: str, value: Any) -> None:
+    cache = open_cache()
+    if cache is not None:
+        cache.put(source, key, value)
+
+
+def forget(source: str, match: Callable[[str], bool]) -> None:
+    cache = open_cache()
+    if cache is not None:
+        cache.forget(source, match)
+
+
+def close() -> None:
+    global _cache
+    if _cache is not None:
+        _cache.close()
+        _cache = None
+
+
+def status() -> Dict[str, Any]:
+    cache = open_cache()
+    return cache.status() if cache is not None else {"enabled": False}
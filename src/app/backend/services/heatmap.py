@@ -0,0 +1,271 @@
+"""
+Comfort heatmap tiles (XYZ, 256 px PNG) for the map overlay.
+
+Tiles are rendered only from what is already cached: shelter from the building
+cache, snow risk from the snow cache, and the last wind reading fetched by the
+background refresher. Serving a tile never calls an upstream; cells nobody has
+looked up yet are transparent (warm them with /admin/warm or prewarming).
+
+A snapshot of the cached cells is rebuilt every HEATMAP_REFRESH_S. Its version
+only changes when a cell's value changes, and rendered tiles are cached under
+(version, wind bucket, z, x, y), so tiles are re-rendered only when the data or
+the wind bucket actually moves. Coarse zooms over the service area are
+rendered ahead of time after each change.
+
+Config (environment):
+    FROSTBYTE_HEATMAP_REFRESH_S       seconds between snapshot/wind refreshes (default 60)
+    FROSTBYTE_HEATMAP_WIND_BUCKET     wind speed bucket width in m/s (default 1)
+    FROSTBYTE_HEATMAP_PRECOMPUTE_ZOOM render zooms up to this one ahead of time (default 12)
+    FROSTBYTE_HEATMAP_TILE_CACHE      max cached tiles (default 4096)
+"""
+import asyncio
+import math
+import os
+import struct
+import time
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from services import buildings, prewarm, snow
+from services.scoring import wind_service
+from services.scoring.route_scorer import RouteScorer
+from services.upstream_scheduler import PRIORITY_BATCH, request_context
+
+HEATMAP_REFRESH_S = float(os.getenv("FROSTBYTE_HEATMAP_REFRESH_S", "60"))
+HEATMAP_WIND_BUCKET = float(os.getenv("FROSTBYTE_HEATMAP_WIND_BUCKET", "1"))
+HEATMAP_PRECOMPUTE_ZOOM = int(os.getenv("FROSTBYTE_HEATMAP_PRECOMPUTE_ZOOM", "12"))
+HEATMAP_TILE_CACHE = int(os.getenv("FROSTBYTE_HEATMAP_TILE_CACHE", "4096"))
+MIN_ZOOM = 10
+MAX_ZOOM = 18
+TILE_SIZE = 256
+WIND_SPEED_SCALE = 15.0  # m/s at which wind exposure counts fully
+LEVELS = 16  # colour steps; palette index 0 is transparent (no data)
+
+GRID = buildings._CACHE_GRID_SIZE
+_UNKNOWN_SNOW_RISK = 0.3  # what the snow service falls back to for an unknown street
+
+Cell = Tuple[int, int]  # (round(lat / GRID), round(lon / GRID))
+
+_cells: Dict[Cell, Tuple[float, float]] = {}  # cell -> (shelter, snow risk)
+_version = 0
+_wind: Optional[Dict[str, float]] = None
+_tiles: Dict[Tuple[int, float, int, int, int], bytes] = {}
+_status: Dict[str, Any] = {"last_refresh": None, "precomputed": 0}
+
+
+def _palette() -> Tuple[bytes, bytes]:
+    """PLTE and tRNS payloads: index 0 transparent, then green -> yellow -> red."""
+    rgb = [(0, 0, 0)]
+    alpha = [0]
+    for level in range(LEVELS):
+        t = level / (LEVELS - 1)
+        red = int(255 * min(1.0, 2 * t))
+        green = int(255 * min(1.0, 2 * (1 - t)))
+        rgb.append((red, green, 60))
+        alpha.append(150)
+    return b"".join(bytes(c) for c in rgb), bytes(alpha)
+
+
+_PLTE, _TRNS = _palette()
+
+
+def _chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+def encode_png(rows: Iterable[bytes], width: int = TILE_SIZE, height: int = TILE_SIZE) -> bytes:
+    """Indexed-colour PNG from rows of palette indices (one byte per pixel)."""
+    raw = b"".join(b"\x00" + row for row in rows)  # filter type 0 on every row
+    return b"".join((
+        b"\x89PNG\r\n\x1a\n",
+        _chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 3, 0, 0, 0)),
+        _chunk(b"PLTE", _PLTE),
+        _chunk(b"tRNS", _TRNS),
+        _chunk(b"IDAT", zlib.compress(raw, 6)),
+        _chunk(b"IEND", b""),
+    ))
+
+
+EMPTY_TILE = encode_png(bytes(TILE_SIZE) for _ in range(TILE_SIZE))
+
+
+def wind_bucket(speed: float) -> float:
+    """Lower edge of the speed bucket tiles are rendered for."""
+    return math.floor(speed / HEATMAP_WIND_BUCKET) * HEATMAP_WIND_BUCKET
+
+
+def discomfort(shelter: float, risk: float, wind_speed: float, scorer: RouteScorer = RouteScorer()) -> float:
+    """
+    0 (comfortable) to 1 (exposed and snowy) for one cell.
+
+    A cell has no walking direction, so the full wind speed counts as headwind;
+    wind and snow are weighted like RouteScorer weights them per segment.
+    """
+    wind = min(wind_speed / WIND_SPEED_SCALE, 1.0) * (1 - shelter)
+    return (scorer.weight_wind * wind + scorer.weight_snow * risk) / (scorer.weight_wind + scorer.weight_snow)
+
+
+def _cell_of_key(key: str) -> Optional[Cell]:
+    parsed = prewarm._parse_key(key)
+    if parsed is None:
+        return None
+    return round(parsed[0] / GRID), round(parsed[1] / GRID)
+
+
+def snapshot_cells() -> Dict[Cell, Tuple[float, float]]:
+    """(shelter, snow risk) for every cell that has cached building or snow data."""
+    shelter: Dict[Cell, float] = {}
+    for key, features in list(buildings._BUILDING_CACHE.items()):
+        cell = _cell_of_key(key)
+        if cell is not None:
+            shelter[cell] = buildings._compute_shelter_score(
+                features.get("building_count_40m", 0), features.get("avg_building_height_m")
+            )
+    risk: Dict[Cell, float] = {}
+    for key, result in list(snow._SNOW_CACHE.items()):
+        cell = _cell_of_key(key)
+        if cell is not None:
+            risk[cell] = result.get("risk", _UNKNOWN_SNOW_RISK)
+    no_buildings = buildings._compute_shelter_score(0, None)
+    return {
+        cell: (shelter.get(cell, no_buildings), risk.get(cell, _UNKNOWN_SNOW_RISK))
+        for cell in shelter.keys() | risk.keys()
+    }
+
+
+def refresh_snapshot() -> bool:
+    """Rebuild the cell snapshot; bumps the version (and returns True) only if it changed."""
+    global _cells, _version
+    cells = snapshot_cells()
+    if cells == _cells:
+        return False
+    _cells = cells
+    _version += 1
+    return True
+
+
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """(min_lon, min_lat, max_lon, max_lat) of a web-mercator tile."""
+    def lat_of(row: float) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / 2 ** z))))
+    n = 2 ** z
+    return (x / n * 360 - 180, lat_of(y + 1), (x + 1) / n * 360 - 180, lat_of(y))
+
+
+def tiles_for_bbox(bbox: prewarm.BBox, z: int) -> List[Tuple[int, int]]:
+    min_lon, min_lat, max_lon, max_lat = bbox
+    n = 2 ** z
+
+    def col(lon: float) -> int:
+        return min(n - 1, max(0, int((lon + 180) / 360 * n)))
+
+    def row(lat: float) -> int:
+        rad = math.radians(lat)
+        return min(n - 1, max(0, int((1 - math.asinh(math.tan(rad)) / math.pi) / 2 * n)))
+
+    return [(x, y) for x in range(col(min_lon), col(max_lon) + 1) for y in range(row(max_lat), row(min_lat) + 1)]
+
+
+def render_tile(z: int, x: int, y: int, cells: Dict[Cell, Tuple[float, float]], wind_speed: float) -> bytes:
+    """Render one tile from a cell snapshot (pixel centres are snapped to cells)."""
+    min_lon, _, max_lon, _ = tile_bounds(z, x, y)
+    n = 2 ** z
+    # Cell column of every pixel column, and cell row of every pixel row
+    col_cells = [round((min_lon + (max_lon - min_lon) * (px + 0.5) / TILE_SIZE) / GRID) for px in range(TILE_SIZE)]
+    row_cells = [
+        round(math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + (py + 0.5) / TILE_SIZE) / n)))) / GRID)
+        for py in range(TILE_SIZE)
+    ]
+    min_row, max_row = min(row_cells), max(row_cells)
+    min_col, max_col = min(col_cells), max(col_cells)
+    if not any(min_row <= i <= max_row and min_col <= j <= max_col for i, j in cells):
+        return EMPTY_TILE
+
+    levels: Dict[Cell, int] = {}
+
+    def level(cell: Cell) -> int:
+        value = cells.get(cell)
+        if value is None:
+            return 0
+        return 1 + min(LEVELS - 1, int(discomfort(value[0], value[1], wind_speed) * LEVELS))
+
+    rows = []
+    previous_row, previous = None, b""
+    for i in row_cells:
+        if i != previous_row:  # neighbouring pixel rows usually fall in the same cell row
+            pixels = bytearray(TILE_SIZE)
+            for px, j in enumerate(col_cells):
+                cell = (i, j)
+                if cell not in levels:
+                    levels[cell] = level(cell)
+                pixels[px] = levels[cell]
+            previous_row, previous = i, bytes(pixels)
+        rows.append(previous)
+    return encode_png(rows)
+
+
+def current_key() -> Tuple[int, float]:
+    return _version, wind_bucket(_wind["speed"] if _wind else 0.0)
+
+
+def get_tile(z: int, x: int, y: int) -> Tuple[bytes, str]:
+    """PNG bytes and an ETag for a tile; renders from cached data only."""
+    version, bucket = current_key()
+    key = (version, bucket, z, x, y)
+    png = _tiles.get(key)
+    if png is None:
+        png = render_tile(z, x, y, _cells, bucket + HEATMAP_WIND_BUCKET / 2)
+        if len(_tiles) >= HEATMAP_TILE_CACHE:
+            del _tiles[next(iter(_tiles))]  # oldest first
+        _tiles[key] = png
+    return png, f'"{version}-{bucket:g}"'
+
+
+async def precompute(bbox: prewarm.BBox = prewarm.SERVICE_AREA, max_zoom: int = HEATMAP_PRECOMPUTE_ZOOM) -> int:
+    """Render the coarse zooms over `bbox` for the current version and wind bucket."""
+    rendered = 0
+    for z in range(MIN_ZOOM, max_zoom + 1):
+        for x, y in tiles_for_bbox(bbox, z):
+            get_tile(z, x, y)
+            rendered += 1
+            await asyncio.sleep(0)  # let requests through between tiles
+    return rendered
+
+
+def _drop_stale_tiles() -> None:
+    current = current_key()
+    for key in [k for k in _tiles if k[:2] != current]:
+        del _tiles[key]
+
+
+async def _refresh_wind() -> None:
+    global _wind
+    min_lon, min_lat, max_lon, max_lat = prewarm.SERVICE_AREA
+    with request_context(flow_id="heatmap", priority=PRIORITY_BATCH):
+        try:
+            _wind = await asyncio.to_thread(
+                wind_service.get_wind_data, (min_lat + max_lat) / 2, (min_lon + max_lon) / 2
+            )
+        except Exception as e:
+            print(f"WARNING: heatmap wind refresh failed: {e}")
+
+
+async def refresh_forever() -> None:
+    """Refresh wind and the cell snapshot, and re-render coarse tiles when either moved."""
+    while True:
+        try:
+            before = current_key()
+            await _refresh_wind()
+            refresh_snapshot()
+            if current_key() != before or not _status["precomputed"]:
+                _drop_stale_tiles()
+                _status["precomputed"] = await precompute()
+            _status["last_refresh"] = time.time()
+        except Exception as e:
+            print(f"WARNING: heatmap refresh failed: {e}")
+        await asyncio.sleep(HEATMAP_REFRESH_S)
+
+
+def status() -> Dict[str, Any]:
+    version, bucket = current_key()
+    return {"version": version, "wind_bucket": bucket, "cells": len(_cells), "tiles_cached": len(_tiles), **_status}
@@ -0,0 +1,217 @@
+"""
+Background jobs for long or expensive route computations (see /jobs in main.py).
+
+A job is submitted with a coroutine function, queued, and run by one of
+JOB_WORKERS asyncio workers, so at most that many heavy computations run at
+once however many are submitted. The queue holds up to JOB_QUEUE_MAX jobs;
+submitting past that raises QueueFull (503 at the API).
+
+Each job runs under its own flow id at batch priority in the upstream
+scheduler, so interactive /route calls get upstream tokens first.
+
+A job's runner receives a `progress(done, total)` callback. A job can be
+cancelled while queued (it is skipped) or running (its task is cancelled).
+Finished jobs (done, failed or cancelled) are kept for JOB_RESULT_TTL_S and
+then dropped.
+
+Jobs live in the memory of the worker process that accepted them. With several
+uvicorn workers, the load balancer must send a client's /jobs calls to the same
+worker (sticky routing, e.g. on the client's address), or the API must run with a
+single worker. Otherwise status, events and cancel return 404.
+"""
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from services.upstream_scheduler import PRIORITY_BATCH, request_context
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_QUEUE_MAX = int(os.getenv("JOB_QUEUE_MAX", "100"))
+JOB_RESULT_TTL_S = float(os.getenv("JOB_RESULT_TTL_S", "3600"))
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+Progress = Callable[[int, int], None]
+Runner = Callable[[Progress], Awaitable[Any]]
+
+
+class QueueFull(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, kind: str, runner: Runner, total: int = 1):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.runner = runner
+        self.status = QUEUED
+        self.done = 0
+        self.total = total
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.expires_at: Optional[float] = None  # monotonic, set when finished
+        self.task: Optional[asyncio.Task] = None
+        self.cancel_requested = False
+        self._changed = asyncio.Event()
+
+    def _notify(self) -> None:
+        """Wake everyone waiting on `next_change()` and start a fresh event."""
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def progress(self, done: int, total: int) -> None:
+        self.done, self.total = done, total
+        self._notify()
+
+    def _finish(self, status: str) -> None:
+        self.status = status
+        self.finished_at = time.time()
+        self.expires_at = time.monotonic() + JOB_RESULT_TTL_S
+        self.runner = None  # drop the request it closed over
+        self._notify()
+
+    def next_change(self) -> asyncio.Event:
+        """Event set on the next status or progress change (take it before reading the state)."""
+        return self._changed
+
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        info = {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": {"done": self.done, "total": self.total},
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if self.status == DONE and include_result:
+            info["result"] = self.result
+        if self.error is not None:
+            info["error"] = self.error
+        return info
+
+
+# job id -> Job, oldest first
+_jobs: "OrderedDict[str, Job]" = OrderedDict()
+_queue: Optional[asyncio.Queue] = None
+_workers: List[asyncio.Task] = []
+_running = 0
+
+
+def _expire() -> None:
+    now = time.monotonic()
+    for job_id in [j.id for j in _jobs.values() if j.expires_at is not None and j.expires_at <= now]:
+        del _jobs[job_id]
+
+
+def submit(kind: str, runner: Runner, total: int = 1) -> Job:
+    """Queue a job; raises QueueFull when JOB_QUEUE_MAX jobs are already waiting."""
+    if _queue is None:
+        raise RuntimeError("job workers are not running")
+    _expire()
+    job = Job(kind, runner, total)
+    try:
+        _queue.put_nowait(job)
+    except asyncio.QueueFull:
+        raise QueueFull(f"{_queue.qsize()} jobs already queued")
+    _jobs[job.id] = job
+    return job
+
+
+def get(job_id: str) -> Optional[Job]:
+    _expire()
+    return _jobs.get(job_id)
+
+
+def cancel(job_id: str) -> Optional[Job]:
+    """Cancel a queued or running job. Finished jobs are returned unchanged."""
+    job = get(job_id)
+    if job is None:
+        return None
+    if job.status == QUEUED:
+        job._finish(CANCELLED)  # the worker skips it when dequeued
+    elif job.status == RUNNING and job.task is not None:
+        job.cancel_requested = True
+        job.task.cancel()
+    return job
+
+
+async def _run(job: Job) -> None:
+    job.status = RUNNING
+    job.started_at = time.time()
+    job._notify()
+    # Its own flow at batch priority: interactive requests are served first upstream
+    with request_context(flow_id=f"job-{job.id}", priority=PRIORITY_BATCH):
+        job.task = asyncio.create_task(job.runner(job.progress))
+        try:
+            job.result = await job.task
+        except asyncio.CancelledError:
+            if not job.cancel_requested:
+                raise  # the worker itself is shutting down
+            job._finish(CANCELLED)
+            return
+        except Exception as e:
+            job.error = getattr(e, "detail", None) or str(e) or repr(e)
+            print(f"WARNING: job {job.id} ({job.kind}) failed: {job.error}")
+            job._finish(FAILED)
+            return
+        finally:
+            job.task = None
+    job._finish(DONE)
+
+
+async def _worker() -> None:
+    global _running
+    while True:
+        job = await _queue.get()
+        try:
+            if job.status != QUEUED:
+                continue  # cancelled while waiting
+            _running += 1
+            try:
+                await _run(job)
+            finally:
+                _running -= 1
+        finally:
+            _queue.task_done()
+
+
+def start_workers() -> None:
+    """Create the queue and worker tasks on the running loop (app lifespan)."""
+    global _queue
+    _queue = asyncio.Queue(maxsize=JOB_QUEUE_MAX)
+    _workers[:] = [asyncio.create_task(_worker()) for _ in range(JOB_WORKERS)]
+
+
+def stop_workers() -> None:
+    global _queue
+    for task in _workers:
+        task.cancel()
+    _workers.clear()
+    for job in _jobs.values():
+        if job.status in (QUEUED, RUNNING):
+            if job.task is not None:
+                job.task.cancel()
+            job._finish(CANCELLED)
+    _queue = None
+
+
+def status() -> Dict[str, Any]:
+    _expire()
+    counts: Dict[str, int] = {}
+    for job in _jobs.values():
+        counts[job.status] = counts.get(job.status, 0) + 1
+    return {
+        "workers": len(_workers),
+        "running": _running,
+        "queued": _queue.qsize() if _queue is not None else 0,
+        "queue_max": JOB_QUEUE_MAX,
+        "jobs": counts,
+    }
@@ -0,0 +1,205 @@
+"""
+Live re-scoring for a user walking a route (see the /route/live WebSocket).
+
+When a session starts, every alternative is sampled and looked up once; its
+samples, bearings, shelter and the street side (cote_rue_id) behind each snow
+sample are kept in the session. After that nothing goes upstream:
+
+    position update  advance along the route (searching forward from the last
+                     position, so cost follows the remaining route)
+    wind update      re-score the remaining segments with the new wind
+    planif change    re-read snow risk for the affected street sides from the
+                     loaded snapshot (snow.status_for_cote)
+
+Re-scoring only covers what is left to walk. A reroute is suggested when an
+alternative's remaining score beats the current route's by LIVE_REROUTE_MARGIN.
+"""
+import asyncio
+import os
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from services import shelter_index, snow
+from services.routing.route_sampler import haversine_distance
+from services.scoring.interfaces import BuildingServiceInterface, SnowServiceInterface
+from services.scoring.route_metrics import collect_route_lookups
+from services.scoring.route_scorer import RouteMetrics, RouteScorer
+from services.scoring.wind_calculator import calculate_headwind_factor, calculate_wind_cost
+
+LIVE_REROUTE_MARGIN = float(os.getenv("LIVE_REROUTE_MARGIN", "0.1"))  # 10% better remaining score
+LIVE_WIND_REFRESH_S = float(os.getenv("LIVE_WIND_REFRESH_S", "300"))
+LIVE_SEARCH_WINDOW = 50  # samples ahead of the last position searched for the nearest point
+OFF_ROUTE_M = 60.0       # farther than this from every sample ahead = off the route
+
+Point = Tuple[float, float]
+
+_sessions: Set["LiveSession"] = set()
+
+
+class LiveRoute:
+    """One alternative's per-segment state, indexed by sample."""
+
+    def __init__(self, route_id: str, points: List[Point], distance_m: float):
+        self.id = route_id
+        self.points = points
+        self.bearings: List[float] = []
+        self.shelter: List[float] = []
+        self.weights: List[float] = []
+        self.snow_ref: List[int] = []              # segment -> index into snow_risk
+        self.snow_risk: List[float] = []
+        self.snow_cote: List[Optional[str]] = []  # street side behind each snow sample
+        self.cumulative = [0.0]
+        for a, b in zip(points, points[1:]):
+            self.cumulative.append(self.cumulative[-1] + haversine_distance(a, b))
+        # ORS distance is what /route scores; keep remaining distance on that scale
+        self.distance_scale = distance_m / self.cumulative[-1] if self.cumulative[-1] else 1.0
+        self.progress = 0  # index of the sample the user last passed
+        self._directional: Dict[int, List[float]] = {}  # shelter index direction bin -> shelter per segment
+
+    async def collect(
+        self,
+        building_service: BuildingServiceInterface,
+        snow_service: SnowServiceInterface,
+        weights: Optional[List[float]] = None
+    ) -> None:
+        """Look up shelter and snow once, the same way /route does (collect_route_lookups)."""
+        segments, self.snow_ref, samples = await collect_route_lookups(
+            self.points, building_service, snow_service, weights
+        )
+        self.bearings = [bearing for bearing, _, _ in segments]
+        self.shelter = [shelter for _, shelter, _ in segments]
+        self.weights = [weight for _, _, weight in segments]
+        self.snow_risk = [sample["risk"] for sample in samples]
+        self.snow_cote = [sample.get("cote_rue_id") for sample in samples]
+
+    def nearest(self, position: Point, window: Optional[int] = LIVE_SEARCH_WINDOW) -> Tuple[int, float]:
+        """(sample index, distance in m) of the closest sample at or after the current progress."""
+        end = len(self.points) if window is None else min(len(self.points), self.progress + window + 1)
+        best, best_d = self.progress, float("inf")
+        for i in range(self.progress, end):
+            d = haversine_distance(position, self.points[i])
+            if d < best_d:
+                best, best_d = i, d
+        return best, best_d
+
+    def shelter_for(self, direction: float) -> List[float]:
+        """Per-segment shelter from wind blowing from `direction` (directional where the shelter index covers it)."""
+        if not shelter_index.is_loaded():
+            return self.shelter
+        k = shelter_index.direction_bin(direction)
+        if k not in self._directional:
+            self._directional[k] = shelter_index.directional_shelter(self.shelter, self.points, direction)
+        return self._directional[k]
+
+    def remaining(self, start: int, wind_data: Dict[str, Any]) -> Dict[str, float]:
+        """Distance, wind and snow cost of the segments from sample `start` to the end."""
+        wind_cost = snow_cost = 0.0
+        shelter = self.shelter_for(wind_data["direction"])
+        for i in range(start, len(self.bearings)):
+            headwind = calculate_headwind_factor(self.bearings[i], wind_data["direction"], wind_data["speed"])
+            wind_cost += self.weights[i] * calculate_wind_cost(headwind, shelter[i])
+            snow_cost += self.weights[i] * self.snow_risk[self.snow_ref[i]]
+        distance_m = (self.cumulative[-1] - self.cumulative[start]) * self.distance_scale
+        return {"distance_m": distance_m, "wind_cost": wind_cost, "snow_cost": snow_cost}
+
+    def refresh_snow(self, changed: Set[str]) -> bool:
+        """Re-read risk for snow samples on changed street sides still ahead. True if any changed."""
+        updated = False
+        first_ahead = self.snow_ref[self.progress] if self.progress < len(self.snow_ref) else len(self.snow_risk)
+        for k in range(first_ahead, len(self.snow_risk)):
+            cote_id = self.snow_cote[k]
+            if cote_id in changed:
+                current = snow.status_for_cote(cote_id)
+                if current is not None and current[1] != self.snow_risk[k]:
+                    self.snow_risk[k] = current[1]
+                    updated = True
+        return updated
+
+    def cotes(self) -> Set[str]:
+        return {c for c in self.snow_cote if c}
+
+
+class LiveSession:
+    def __init__(self, routes: List[LiveRoute], wind_data: Dict[str, Any], scorer: RouteScorer):
+        self.routes = {r.id: r for r in routes}
+        self.wind = wind_data
+        self.scorer = scorer
+        self.chosen = min(routes, key=lambda r: self._score(r.remaining(0, wind_data))).id
+        self.position: Optional[Point] = None
+        self.suggested: Optional[str] = None
+        self.events: asyncio.Queue = asyncio.Queue()  # ("snow", changed ids) from the planif listener
+        self._cotes = set().union(*(r.cotes() for r in routes))
+
+    def __enter__(self) -> "LiveSession":
+        _sessions.add(self)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        _sessions.discard(self)
+
+    def _score(self, remaining: Dict[str, float]) -> float:
+        return self.scorer.score_route(RouteMetrics(**remaining)).total_score
+
+    def update_position(self, position: Point) -> Dict[str, Any]:
+        self.position = position
+        route = self.routes[self.chosen]
+        index, distance = route.nearest(position)
+        route.progress = index
+        return {"progress": index, "off_route": distance > OFF_ROUTE_M}
+
+    def update_wind(self, wind_data: Dict[str, Any]) -> bool:
+        changed = (wind_data["speed"], wind_data["direction"]) != (self.wind["speed"], self.wind["direction"])
+        self.wind = wind_data
+        return changed
+
+    def update_snow(self, changed: Set[str]) -> bool:
+        if not changed & self._cotes:
+            return False
+        return any([r.refresh_snow(changed) for r in self.routes.values()])
+
+    def evaluate(self) -> Dict[str, Any]:
+        """Remaining score of the current route, and a reroute suggestion if one is clearly better."""
+        current = self.routes[self.chosen]
+        current_remaining = current.remaining(current.progress, self.wind)
+        current_score = self._score(current_remaining)
+
+        best_id, best_score = None, current_score * (1 - LIVE_REROUTE_MARGIN)
+        if self.position is not None:
+            for route in self.routes.values():
+                if route.id == self.chosen:
+                    continue
+                index, join_m = route.nearest(self.position, window=None)
+                route.progress = index  # later searches start here, so they cover only what's left
+                remaining = route.remaining(index, self.wind)
+                remaining["distance_m"] += join_m  # walking over to the alternative
+                score = self._score(remaining)
+                if score < best_score:
+                    best_id, best_score = route.id, score
+
+        suggestion = None
+        if best_id is not None and best_id != self.suggested:
+            suggestion = {"route_id": best_id, "remaining_score": best_score}
+        self.suggested = best_id
+        return {
+            "route_id": self.chosen,
+            "remaining": {**current_remaining, "score": current_score},
+            "wind": self.wind,
+            "reroute": suggestion,
+        }
+
+    def switch(self, route_id: str) -> None:
+        """Follow another alternative (after accepting a suggestion)."""
+        if route_id not in self.routes:
+            raise KeyError(route_id)
+        self.chosen = route_id
+        self.suggested = None
+        if self.position is not None:
+            route = self.routes[route_id]
+            route.progress = route.nearest(self.position, window=None)[0]
+
+
+def _on_planif_change(changed: Set[str]) -> None:
+    for session in list(_sessions):
+        session.events.put_nowait(("snow", changed))
+
+
+snow.add_planif_listener(_on_planif_change)
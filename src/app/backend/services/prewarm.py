@@ -0,0 +1,301 @@
+"""
+Cache prewarming for the building, snow and wind caches.
+
+Cells to warm come from recent request history (a capture log, see
+services/capture.py) and/or configured hot bboxes. Warming goes through the
+normal service functions at batch priority, so it shares the rate-limited
+upstream path with live traffic and never jumps ahead of it.
+
+Config (environment):
+    FROSTBYTE_PREWARM_BBOXES      "minlon,minlat,maxlon,maxlat;..." hot areas
+    FROSTBYTE_PREWARM_HISTORY     capture log to mine for hot cells (defaults to FROSTBYTE_CAPTURE_PATH)
+    FROSTBYTE_PREWARM_INTERVAL_S  seconds between scheduled runs (0 = startup only)
+    FROSTBYTE_PREWARM_MAX_CELLS   cap on cells per run (also the most /admin/warm may ask for)
+    FROSTBYTE_SERVICE_AREA        bbox used for coverage reporting; warm bboxes are clipped to it
+                                  (default: island of Montreal)
+"""
+import asyncio
+import json
+import math
+import os
+import time
+from collections import Counter
+from itertools import chain, islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from services import buildings, disk_cache, snow
+from services.scoring import wind_service
+from services.upstream_scheduler import PRIORITY_BATCH, request_context
+
+BBox = Tuple[float, float, float, float]  # (min_lon, min_lat, max_lon, max_lat)
+
+GRID = buildings._CACHE_GRID_SIZE  # same ~100 m cells as the building and snow caches
+
+
+def parse_bboxes(raw: str) -> List[BBox]:
+    boxes = []
+    for part in raw.split(";"):
+        part = part.strip()
+        if not part:
+            continue
+        values = [float(v) for v in part.split(",")]
+        if len(values) != 4:
+            raise ValueError(f"bbox needs 4 numbers (minlon,minlat,maxlon,maxlat): {part!r}")
+        boxes.append(normalize_bbox(values))
+    return boxes
+
+
+def normalize_bbox(values) -> BBox:
+    min_lon, min_lat, max_lon, max_lat = (float(v) for v in values)
+    return (min(min_lon, max_lon), min(min_lat, max_lat), max(min_lon, max_lon), max(min_lat, max_lat))
+
+
+PREWARM_BBOXES = parse_bboxes(os.getenv("FROSTBYTE_PREWARM_BBOXES", ""))
+PREWARM_HISTORY = os.getenv("FROSTBYTE_PREWARM_HISTORY") or os.getenv("FROSTBYTE_CAPTURE_PATH")
+PREWARM_INTERVAL_S = float(os.getenv("FROSTBYTE_PREWARM_INTERVAL_S", "1800"))
+PREWARM_MAX_CELLS = int(os.getenv("FROSTBYTE_PREWARM_MAX_CELLS", "2000"))
+PREWARM_CONCURRENCY = int(os.getenv("FROSTBYTE_PREWARM_CONCURRENCY", "4"))
+PREWARM_HISTORY_LINES = 5000  # most recent captured requests considered
+SERVICE_AREA: BBox = normalize_bbox(
+    os.getenv("FROSTBYTE_SERVICE_AREA", "-73.98,45.40,-73.47,45.71").split(",")
+)
+
+_status: Dict[str, Any] = {"running": 0, "last_run": None}
+_tasks: set = set()  # references to background runs so they aren't garbage collected
+
+
+def cell_of(lat: float, lon: float) -> Tuple[float, float]:
+    """Snap a point to the centre of its cache cell."""
+    return (round(lat / GRID) * GRID, round(lon / GRID) * GRID)
+
+
+def clip_bbox(bbox: BBox, area: BBox = SERVICE_AREA) -> Optional[BBox]:
+    """The part of `bbox` inside `area` (None when they don't overlap)."""
+    clipped = (max(bbox[0], area[0]), max(bbox[1], area[1]), min(bbox[2], area[2]), min(bbox[3], area[3]))
+    if clipped[0] > clipped[2] or clipped[1] > clipped[3]:
+        return None
+    return clipped
+
+
+def cells_in_bbox(bbox: BBox) -> Iterator[Tuple[float, float]]:
+    """Cell centres in a bbox, row by row (lazily: callers stop after as many as they need)."""
+    min_lon, min_lat, max_lon, max_lat = bbox
+    for i in range(math.floor(min_lat / GRID), math.ceil(max_lat / GRID) + 1):
+        for j in range(math.floor(min_lon / GRID), math.ceil(max_lon / GRID) + 1):
+            lat, lon = i * GRID, j * GRID
+            if min_lat <= lat <= max_lat and min_lon <= lon <= max_lon:
+                yield (lat, lon)
+
+
+def _parse_key(key: str, sep: str = ",") -> Optional[Tuple[float, float]]:
+    try:
+        lat, lon = key.split(sep)
+        return float(lat), float(lon)
+    except ValueError:
+        return None
+
+
+def _in_bbox(lat: float, lon: float, bbox: BBox) -> bool:
+    return bbox[0] <= lon <= bbox[2] and bbox[1] <= lat <= bbox[3]
+
+
+def _line_cells(start: List[float], end: List[float]) -> Iterable[Tuple[float, float]]:
+    """Cells along the straight line between two [lon, lat] points (history without samples)."""
+    steps = max(int(max(abs(end[0] - start[0]), abs(end[1] - start[1])) / (GRID / 2)), 1)
+    for k in range(steps + 1):
+        t = k / steps
+        yield cell_of(start[1] + (end[1] - start[1]) * t, start[0] + (end[0] - start[0]) * t)
+
+
+def _tail_lines(path: str, max_lines: int, block: int = 1 << 16) -> List[str]:
+    """The last `max_lines` lines of a file, read backwards in blocks (capture logs grow unbounded)."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        chunks: List[bytes] = []
+        newlines = 0
+        while pos > 0 and newlines <= max_lines:
+            step = min(block, pos)
+            pos -= step
+            f.seek(pos)
+            chunks.append(f.read(step))
+            newlines += chunks[-1].count(b"\n")
+    lines = b"".join(reversed(chunks)).splitlines()
+    if pos > 0:
+        lines = lines[1:]  # the first one is cut off
+    return [line.decode("utf-8", "replace") for line in lines[-max_lines:]]
+
+
+def cells_from_history(path: str, max_lines: int = PREWARM_HISTORY_LINES) -> Counter:
+    """Count how often each cell was touched by recent captured /route requests."""
+    counts: Counter = Counter()
+    try:
+        lines = _tail_lines(path, max_lines)
+    except OSError:
+        return counts
+    for line in lines:
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue
+        points = (entry.get("upstream") or {}).get("buildings") or {}
+        if points:
+            counts.update({cell_of(*p) for p in map(_parse_key, points) if p})
+            continue
+        request = entry.get("request") or {}
+        if request.get("start") and request.get("end"):
+            counts.update(set(_line_cells(request["start"], request["end"])))
+    return counts
+
+
+def plan_cells(
+    bboxes: Iterable[BBox] = (),
+    history_path: Optional[str] = None,
+    max_cells: int = PREWARM_MAX_CELLS
+) -> List[Tuple[float, float]]:
+    """Hot history cells first (most used first), then bboxes clipped to SERVICE_AREA, skipping warm cells."""
+    history = (cell for cell, _ in cells_from_history(history_path).most_common()) if history_path else ()
+    clipped = [b for b in map(clip_bbox, bboxes) if b is not None]
+    candidates = chain(history, *map(cells_in_bbox, clipped))
+
+    def cold() -> Iterator[Tuple[float, float]]:
+        seen = set()
+        for lat, lon in candidates:
+            key = buildings._get_cache_key(lat, lon)
+            if key in seen:
+                continue
+            seen.add(key)
+            if key in buildings._BUILDING_CACHE and snow._get_snow_cache_key(lat, lon) in snow._SNOW_CACHE:
+                continue
+            yield (lat, lon)
+
+    return list(islice(cold(), min(max_cells, PREWARM_MAX_CELLS)))
+
+
+async def warm_cells(cells: List[Tuple[float, float]], concurrency: int = PREWARM_CONCURRENCY) -> Dict[str, Any]:
+    """Populate building, snow and wind caches for these cells at batch priority."""
+    semaphore = asyncio.Semaphore(concurrency)
+    wind_keys = {}
+    t0 = time.monotonic()
+    done = 0
+
+    async def warm(lat: float, lon: float):
+        nonlocal done
+        async with semaphore:
+            await buildings.get_building_features(lat, lon)
+            await snow.get_snow_status(lat, lon)
+            done += 1
+
+    with request_context(flow_id="prewarm", priority=PRIORITY_BATCH):
+        for lat, lon in cells:
+            wind_keys.setdefault(f"{round(lat, 2)}_{round(lon, 2)}", (lat, lon))
+        await asyncio.gather(*(warm(lat, lon) for lat, lon in cells))
+        for lat, lon in wind_keys.values():
+            try:
+                await asyncio.to_thread(wind_service.get_wind_data, lat, lon)
+            except Exception as e:
+                print(f"WARNING: prewarm wind lookup failed: {e}")
+
+    return {"cells": done, "wind_cells": len(wind_keys), "seconds": round(time.monotonic() - t0, 1)}
+
+
+async def run_prewarm(
+    bboxes: Optional[Iterable[BBox]] = None,
+    history_path: Optional[str] = None,
+    max_cells: int = PREWARM_MAX_CELLS
+) -> Dict[str, Any]:
+    # Reads and parses the history file: keep it off the event loop
+    cells = await asyncio.to_thread(
+        plan_cells,
+        PREWARM_BBOXES if bboxes is None else bboxes,
+        PREWARM_HISTORY if history_path is None else history_path,
+        max_cells,
+    )
+    return await _run(cells)
+
+
+async def start_warm(bboxes: Iterable[BBox], max_cells: int = PREWARM_MAX_CELLS) -> int:
+    """Plan and start a background warm-up of `bboxes`; returns the number of cells queued."""
+    cells = await asyncio.to_thread(plan_cells, list(bboxes), None, max_cells)
+    task = asyncio.ensure_future(_run(cells))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return len(cells)
+
+
+async def _run(cells: List[Tuple[float, float]]) -> Dict[str, Any]:
+    _status["running"] += 1
+    try:
+        result = await warm_cells(cells)
+    finally:
+        _status["running"] -= 1
+    _status["last_run"] = {"at": time.time(), **result}
+    return result
+
+
+async def prewarm_forever() -> None:
+    """Startup run, then one run every PREWARM_INTERVAL_S (if > 0)."""
+    if not (PREWARM_BBOXES or PREWARM_HISTORY):
+        return
+    while True:
+        try:
+            result = await run_prewarm()
+            print(f"Prewarm: {result['cells']} cells warmed in {result['seconds']}s")
+        except Exception as e:
+            print(f"WARNING: prewarm run failed: {e}")
+        if PREWARM_INTERVAL_S <= 0:
+            return
+        await asyncio.sleep(PREWARM_INTERVAL_S)
+
+
+def evict_bbox(bbox: BBox) -> Dict[str, int]:
+    """Drop cached building, snow and wind data inside a bbox, in memory and in the disk cache."""
+    evicted = {"buildings": 0, "snow": 0, "wind": 0}
+    for cache, name in ((buildings._BUILDING_CACHE, "buildings"), (buildings._BUILDING_NEGATIVE_CACHE, "buildings")):
+        for key in [k for k in cache if (p := _parse_key(k)) and _in_bbox(*p, bbox)]:
+            del cache[key]
+            evicted[name] += 1
+    for key in [k for k in snow._SNOW_NEGATIVE_CACHE if (p := _parse_key(k)) and _in_bbox(*p, bbox)]:
+        del snow._SNOW_NEGATIVE_CACHE[key]
+    snow_keys = [k for k in snow._SNOW_CACHE if (p := _parse_key(k)) and _in_bbox(*p, bbox)]
+    if snow_keys:
+        dropped = set(snow_keys)
+        for key in snow_keys:
+            del snow._SNOW_CACHE[key]
+        for cote_id in list(snow._COTE_TO_CELLS):
+            cells = snow._COTE_TO_CELLS[cote_id] - dropped
+            if cells:
+                snow._COTE_TO_CELLS[cote_id] = cells
+            else:
+                del snow._COTE_TO_CELLS[cote_id]
+        evicted["snow"] = len(snow_keys)
+    # Geocoded addresses too, so evicted cells are looked up from scratch
+    snow.forget_points({k for k in snow._POINT_CACHE if (p := _parse_key(k)) and _in_bbox(*p, bbox)})
+    for source, sep in (("overpass", ","), ("openmeteo", "_"), ("openmeteo_forecast", "_")):
+        disk_cache.forget(source, lambda k, sep=sep: bool((p := _parse_key(k, sep)) and _in_bbox(*p, bbox)))
+    for key in [k for k in wind_service._wind_cache if (p := _parse_key(k, "_")) and _in_bbox(*p, bbox)]:
+        del wind_service._wind_cache[key]
+        evicted["wind"] += 1
+    return evicted
+
+
+def coverage(bbox: BBox = SERVICE_AREA) -> Dict[str, Any]:
+    """Fraction of the cells in `bbox` that have warm building and snow data."""
+    min_lon, min_lat, max_lon, max_lat = bbox
+    total = (math.floor(max_lat / GRID) - math.ceil(min_lat / GRID) + 1) * \
+            (math.floor(max_lon / GRID) - math.ceil(min_lon / GRID) + 1)
+    total = max(total, 1)
+
+    def count(keys) -> int:
+        return sum(1 for k in keys if (p := _parse_key(k)) and _in_bbox(*p, bbox))
+
+    building_cells = count(buildings._BUILDING_CACHE)
+    snow_cells = count(snow._SNOW_CACHE)
+    return {
+        "service_area": list(bbox),
+        "cells_total": total,
+        "buildings": {"cells": building_cells, "fraction": round(building_cells / total, 4)},
+        "snow": {"cells": snow_cells, "fraction": round(snow_cells / total, 4)},
+        "wind_entries": len(wind_service._wind_cache),
+        "prewarm": dict(_status),
+    }
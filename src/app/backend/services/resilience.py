@@ -0,0 +1,151 @@
+"""
+Resilience helpers for upstream calls: circuit breakers and hedged requests.
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+class CircuitOpenError(Exception):
+    """Raised when every candidate upstream has an open circuit."""
+
+
+class CircuitBreaker:
+    """
+    Classic three-state breaker.
+
+    closed    -> calls go through; `failure_threshold` consecutive failures open it
+    open      -> calls are refused until `reset_timeout_s` has passed
+    half_open -> one trial call is let through; success closes, failure re-opens
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout_s: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_s = reset_timeout_s
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self.total_failures = 0
+        self.total_successes = 0
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_timeout_s:
+                return False
+            self.state = "half_open"
+            self._trial_in_flight = False
+        # half_open: a single trial at a time
+        if self._trial_in_flight:
+            return False
+        self._trial_in_flight = True
+        return True
+
+    def record_success(self) -> None:
+        self.total_successes += 1
+        self.consecutive_failures = 0
+        self._trial_in_flight = False
+        self.state = "closed"
+
+    def record_failure(self) -> None:
+        self.total_failures += 1
+        self.consecutive_failures += 1
+        self._trial_in_flight = False
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """Call when an allowed call was abandoned (e.g. a cancelled hedge) without an outcome."""
+        self._trial_in_flight = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "total_failures": self.total_failures,
+            "total_successes": self.total_successes,
+        }
+
+
+_BREAKERS: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(name: str, failure_threshold: int = 5, reset_timeout_s: float = 30.0) -> CircuitBreaker:
+    """One shared breaker per upstream name."""
+    breaker = _BREAKERS.get(name)
+    if breaker is None:
+        breaker = CircuitBreaker(name, failure_threshold, reset_timeout_s)
+        _BREAKERS[name] = breaker
+    return breaker
+
+
+def breaker_states() -> Dict[str, Dict[str, Any]]:
+    return {name: b.snapshot() for name, b in _BREAKERS.items()}
+
+
+# Why hedged_request cancelled an attempt (the CancelledError's message)
+HEDGE_LOST = "hedge lost"           # another attempt answered first: not a failure
+HEDGE_TIMED_OUT = "hedge timed out"  # nothing answered within timeout_s: counts as a failure
+
+
+def hedge_cancel_reason(error: asyncio.CancelledError) -> Optional[str]:
+    """HEDGE_LOST / HEDGE_TIMED_OUT, or None for any other cancellation (e.g. the caller's)."""
+    reason = error.args[0] if error.args else None
+    return reason if reason in (HEDGE_LOST, HEDGE_TIMED_OUT) else None
+
+
+async def hedged_request(
+    attempts: List[Callable[[], Awaitable[Any]]],
+    hedge_after_s: float,
+    timeout_s: float
+) -> Any:
+    """
+    Run `attempts` in order, starting the next one when the current ones are
+    slower than `hedge_after_s` or have failed. The first success wins and the
+    others are cancelled. If every attempt fails this raises the first real
+    upstream error, or CircuitOpenError only when every attempt was skipped by
+    an open circuit; asyncio.TimeoutError once `timeout_s` has passed. Attempts cancelled here
+    get HEDGE_LOST or HEDGE_TIMED_OUT as the CancelledError message.
+    """
+    if not attempts:
+        raise ValueError("hedged_request needs at least one attempt")
+    deadline = time.monotonic() + timeout_s
+    pending: set = set()
+    remaining = list(attempts)
+    first_error: Optional[BaseException] = None
+    circuit_error: Optional[CircuitOpenError] = None
+
+    def launch_next() -> None:
+        pending.add(asyncio.ensure_future(remaining.pop(0)()))
+
+    launch_next()
+    reason = None  # caller cancelled us or every attempt failed
+    try:
+        while pending:
+            time_left = deadline - time.monotonic()
+            if time_left <= 0:
+                reason = HEDGE_TIMED_OUT
+                raise asyncio.TimeoutError(f"no upstream answered within {timeout_s}s")
+            wait_s = min(hedge_after_s, time_left) if remaining else time_left
+            done, _ = await asyncio.wait(pending, timeout=wait_s, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                pending.discard(task)
+                if task.exception() is None:
+                    reason = HEDGE_LOST
+                    return task.result()
+                error = task.exception()
+                if isinstance(error, CircuitOpenError):
+                    circuit_error = circuit_error or error
+                elif first_error is None:
+                    first_error = error
+            # Either nothing answered in time (hedge) or something failed (fail over)
+            if remaining:
+                launch_next()
+        raise first_error or circuit_error or RuntimeError("all hedged attempts failed")
+    finally:
+        for task in pending:
+            task.cancel(reason)
@@ -0,0 +1,137 @@
+"""
+Adaptive sampling along a route.
+
+Instead of one sample every 40 m, start from coarse samples (every
+`coarse_interval_m`, plus every sharp turn), look up shelter there, and only
+refine the stretches where neighbouring samples disagree by more than
+`shelter_threshold`, largest disagreement first, until the per-route lookup
+budget is spent. Long stretches through parks or uniform blocks then cost a
+handful of lookups instead of one per cell.
+
+Because the samples are uneven, costs should be weighted by segment length
+(see `segment_weights`) so they stay on the same scale as fixed 40 m sampling.
+"""
+import heapq
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from services.routing.route_sampler import calculate_bearing, haversine_distance, sample_route_points
+from services.scoring.interfaces import BuildingServiceInterface, SnowServiceInterface
+
+ROUTE_SAMPLING = os.getenv("ROUTE_SAMPLING", "fixed")  # "fixed" (every 40 m) or "adaptive"
+ADAPTIVE_COARSE_INTERVAL_M = float(os.getenv("ADAPTIVE_COARSE_INTERVAL_M", "300"))
+ADAPTIVE_SHELTER_THRESHOLD = float(os.getenv("ADAPTIVE_SHELTER_THRESHOLD", "0.15"))
+ADAPTIVE_SNOW_THRESHOLD = float(os.getenv("ADAPTIVE_SNOW_THRESHOLD", "0.2"))
+ADAPTIVE_TURN_DEG = float(os.getenv("ADAPTIVE_TURN_DEG", "30"))
+ADAPTIVE_LOOKUPS_PER_KM = float(os.getenv("ADAPTIVE_LOOKUPS_PER_KM", "6"))
+
+Point = Tuple[float, float]
+
+
+def segment_weights(points: List[Point], interval_m: float = 40.0) -> List[float]:
+    """Length of each segment in units of `interval_m` (1.0 = one fixed-interval segment)."""
+    return [haversine_distance(points[i], points[i + 1]) / interval_m for i in range(len(points) - 1)]
+
+
+def _turn_deg(a: Point, b: Point, c: Point) -> float:
+    diff = abs(calculate_bearing(a, b) - calculate_bearing(b, c)) % 360
+    return 360 - diff if diff > 180 else diff
+
+
+async def adaptive_sample_route_points(
+    geometry: Dict[str, Any],
+    interval_m: float = 40.0,
+    building_service: Optional[BuildingServiceInterface] = None,
+    snow_service: Optional[SnowServiceInterface] = None,
+    coarse_interval_m: float = ADAPTIVE_COARSE_INTERVAL_M,
+    shelter_threshold: float = ADAPTIVE_SHELTER_THRESHOLD,
+    snow_threshold: float = ADAPTIVE_SNOW_THRESHOLD,
+    turn_deg: float = ADAPTIVE_TURN_DEG,
+    max_lookups: Optional[int] = None
+) -> List[Point]:
+    """
+    Sample points along a route, dense only where conditions change.
+
+    Args:
+        geometry: GeoJSON geometry from ORS
+        interval_m: Finest spacing refinement can reach (same meaning as in sample_route_points)
+        building_service: Shelter lookups that drive refinement; without it this is
+            coarse sampling plus turns
+        snow_service: Optional; also refine on snow risk differences (costs extra lookups)
+        max_lookups: Lookup budget per route (default ADAPTIVE_LOOKUPS_PER_KM per km, at least
+            enough for the coarse samples)
+
+    Returns:
+        List of (lon, lat) tuples, like sample_route_points
+    """
+    fine = sample_route_points(geometry, interval_m=interval_m)
+    if len(fine) < 3:
+        return fine
+
+    # Cumulative distance along the fine samples
+    cumulative = [0.0]
+    for i in range(len(fine) - 1):
+        cumulative.append(cumulative[-1] + haversine_distance(fine[i], fine[i + 1]))
+
+    # Coarse picks: start, end, every coarse_interval_m, and sharp turns
+    chosen = {0, len(fine) - 1}
+    next_mark = coarse_interval_m
+    for i in range(1, len(fine) - 1):
+        if cumulative[i] >= next_mark:
+            chosen.add(i)
+            next_mark = cumulative[i] + coarse_interval_m
+        elif turn_deg and _turn_deg(fine[i - 1], fine[i], fine[i + 1]) >= turn_deg:
+            chosen.add(i)
+
+    if building_service is None and snow_service is None:
+        return [fine[i] for i in sorted(chosen)]
+
+    if max_lookups is None:
+        max_lookups = int(cumulative[-1] / 1000 * ADAPTIVE_LOOKUPS_PER_KM)
+    max_lookups = max(max_lookups, len(chosen))
+
+    values: Dict[int, Tuple[float, float]] = {}
+    lookups = 0
+
+    async def probe(i: int) -> Tuple[float, float]:
+        nonlocal lookups
+        if i not in values:
+            lon, lat = fine[i]
+            shelter = risk = 0.0
+            if building_service is not None:
+                shelter = (await building_service.get_building_density(lat, lon))["shelter_score"]
+            if snow_service is not None:
+                risk = (await snow_service.get_snow_status(lat, lon))["risk"]
+            values[i] = (shelter, risk)
+            lookups += 1
+        return values[i]
+
+    def disagreement(a: Tuple[float, float], b: Tuple[float, float]) -> float:
+        """How far past its threshold the larger of the two differences is (<= 0 means close enough)."""
+        gaps = [abs(a[0] - b[0]) - shelter_threshold]
+        if snow_service is not None:
+            gaps.append(abs(a[1] - b[1]) - snow_threshold)
+        return max(gaps)
+
+    ordered = sorted(chosen)
+    for i in ordered:
+        await probe(i)
+
+    # Max-heap of stretches to split, most disagreeing first
+    heap = []
+    for i, j in zip(ordered, ordered[1:]):
+        gap = disagreement(values[i], values[j])
+        if gap > 0 and j - i > 1:
+            heapq.heappush(heap, (-gap, i, j))
+
+    while heap and lookups < max_lookups:
+        _, i, j = heapq.heappop(heap)
+        mid = (i + j) // 2
+        await probe(mid)
+        chosen.add(mid)
+        for a, b in ((i, mid), (mid, j)):
+            gap = disagreement(values[a], values[b])
+            if gap > 0 and b - a > 1:
+                heapq.heappush(heap, (-gap, a, b))
+
+    return [fine[i] for i in sorted(chosen)]
@@ -0,0 +1,159 @@
+"""
+Wider candidate generation for comfort routing.
+
+ORS's default alternatives (target_count 2, weight_factor 1.4) often miss the
+sheltered route. Here several ORS queries run concurrently:
+
+    * alternative_routes with different weight/share factors (CANDIDATE_VARIANTS)
+    * single routes through via points on either side of the direct line,
+      snapped to the most sheltered cached cell nearby (cache only, no lookups)
+
+Near-identical geometries are dropped (discrete Hausdorff distance under
+CANDIDATE_DEDUPE_M), and the survivors are scored by the caller. pareto_front
+keeps the candidates no other candidate beats on distance, wind and snow at once.
+"""
+import asyncio
+import math
+import os
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from services import buildings
+from services.routing.route_sampler import sample_route_points
+
+CANDIDATE_DEDUPE_M = float(os.getenv("CANDIDATE_DEDUPE_M", "40"))
+CANDIDATE_CONCURRENCY = int(os.getenv("CANDIDATE_CONCURRENCY", "4"))
+CANDIDATE_VIA_OFFSETS = (0.2, 0.4)  # via point offset from the midpoint, as a fraction of trip length
+CANDIDATE_VIA_SEARCH_CELLS = 1       # look this many cache cells around a via point for shelter
+# alternative_routes parameters (target_count, weight_factor, share_factor)
+CANDIDATE_VARIANTS: Tuple[Tuple[int, float, Optional[float]], ...] = (
+    (2, 1.4, None),  # what /route asks for
+    (3, 1.8, 0.6),
+    (3, 2.0, 0.8),
+)
+
+Point = Tuple[float, float]  # (lon, lat)
+
+
+def via_points(start: Point, end: Point) -> List[Point]:
+    """Points off either side of the direct line, moved to the most sheltered nearby cached cell."""
+    mid_lon, mid_lat = (start[0] + end[0]) / 2, (start[1] + end[1]) / 2
+    cos_lat = math.cos(math.radians(mid_lat))
+    dx, dy = (end[0] - start[0]) * cos_lat, end[1] - start[1]  # direct line in lat-degree units
+    length = math.hypot(dx, dy)
+    if length == 0:
+        return []
+    normal = (-dy / length, dx / length)
+    grid = buildings._CACHE_GRID_SIZE
+
+    points = []
+    for fraction in CANDIDATE_VIA_OFFSETS:
+        for side in (1, -1):
+            offset = side * fraction * length
+            lon = mid_lon + normal[0] * offset / cos_lat
+            lat = mid_lat + normal[1] * offset
+            best, best_shelter = (lon, lat), -1.0
+            for i in range(-CANDIDATE_VIA_SEARCH_CELLS, CANDIDATE_VIA_SEARCH_CELLS + 1):
+                for j in range(-CANDIDATE_VIA_SEARCH_CELLS, CANDIDATE_VIA_SEARCH_CELLS + 1):
+                    cell_lat, cell_lon = lat + i * grid, lon + j * grid
+                    features = buildings._BUILDING_CACHE.get(buildings._get_cache_key(cell_lat, cell_lon))
+                    if features is None:
+                        continue
+                    shelter = buildings._compute_shelter_score(
+                        features.get("building_count_40m", 0), features.get("avg_building_height_m")
+                    )
+                    if shelter > best_shelter:
+                        best, best_shelter = (cell_lon, cell_lat), shelter
+            points.append(best)
+    return points
+
+
+async def fetch_candidates(
+    start: Point,
+    end: Point,
+    get_routes: Callable[..., List[Dict[str, Any]]]
+) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Run all candidate ORS queries concurrently (sync `get_routes` in threads).
+
+    Returns (routes, failed query count). Each route gets a "source" label.
+    """
+    queries: List[Tuple[str, Dict[str, Any]]] = [
+        (f"alt_{target}_{weight}" + (f"_{share}" if share is not None else ""),
+         {"target_count": target, "weight_factor": weight, "share_factor": share})
+        for target, weight, share in CANDIDATE_VARIANTS
+    ]
+    queries += [(f"via_{k}", {"via": [point]}) for k, point in enumerate(via_points(start, end))]
+    semaphore = asyncio.Semaphore(CANDIDATE_CONCURRENCY)
+
+    async def run(label: str, kwargs: Dict[str, Any]):
+        async with semaphore:
+            try:
+                routes = await asyncio.to_thread(get_routes, start, end, **kwargs)
+            except Exception as e:
+                print(f"WARNING: candidate query {label} failed: {e}")
+                return None
+        return [{**route, "source": label} for route in routes]
+
+    results = await asyncio.gather(*(run(label, kwargs) for label, kwargs in queries))
+    routes = [route for result in results if result for route in result]
+    return routes, sum(1 for result in results if result is None)
+
+
+def _projected(geometry: Dict[str, Any], interval_m: float) -> List[Tuple[float, float]]:
+    points = sample_route_points(geometry, interval_m=interval_m)
+    if not points:
+        return []
+    cos_lat = math.cos(math.radians(points[0][1]))
+    return [(lon * 111_320.0 * cos_lat, lat * 110_540.0) for lon, lat in points]
+
+
+def _directed_within(a: Sequence[Tuple[float, float]], b: Sequence[Tuple[float, float]], limit_sq: float) -> bool:
+    """True if every point of `a` has a point of `b` within the limit (starts near the last match)."""
+    j = 0
+    n = len(b)
+    for ax, ay in a:
+        for k in range(n):
+            bx, by = b[(j + k) % n]
+            if (ax - bx) ** 2 + (ay - by) ** 2 <= limit_sq:
+                j = (j + k) % n
+                break
+        else:
+            return False
+    return True
+
+
+def dedupe(routes: List[Dict[str, Any]], threshold_m: float = CANDIDATE_DEDUPE_M) -> List[Dict[str, Any]]:
+    """Drop routes within `threshold_m` (Hausdorff) of an earlier one; keeps the first seen."""
+    kept: List[Tuple[Dict[str, Any], List[Tuple[float, float]]]] = []
+    limit_sq = threshold_m ** 2
+    for route in routes:
+        # Samples at half the threshold so the sampled distance stays close to the true one
+        points = _projected(route["geometry"], max(threshold_m / 2, 5.0))
+        duplicate = any(
+            # Routes of clearly different length are never near-identical; skips most comparisons
+            abs(route["distance_m"] - other["distance_m"]) <= 2 * threshold_m + 0.1 * other["distance_m"]
+            and _directed_within(points, other_points, limit_sq)
+            and _directed_within(other_points, points, limit_sq)
+            for other, other_points in kept
+        )
+        if not duplicate:
+            kept.append((route, points))
+    return [route for route, _ in kept]
+
+
+def pareto_front(routes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Routes whose (distance, wind cost, snow cost) no other route beats in all three."""
+    def costs(route):
+        m = route["metrics"]
+        return (m["distance_m"], m["wind_cost"], m["snow_cost"])
+
+    front = []
+    for route in routes:
+        c = costs(route)
+        dominated = any(
+            all(o <= v for o, v in zip(costs(other), c)) and costs(other) != c
+            for other in routes if other is not route
+        )
+        if not dominated:
+            front.append(route)
+    return front
@@ -111,16 +111,23 @@ def get_route_alternatives(
         raise Exception(f"Error getting routes from OpenRouteService: {str(e)}")'''
 
 import requests
-from typing import List, Tuple, Dict, Any
+from typing import List, Optional, Tuple, Dict, Any
 from .config import ORS_API_KEY, ORS_BASE_URL
 
 def get_route_alternatives(
     start: Tuple[float, float],  # (lon, lat)
-    end: Tuple[float, float]
+    end: Tuple[float, float],
+    via: Optional[List[Tuple[float, float]]] = None,
+    target_count: int = 2,
+    weight_factor: float = 1.4,
+    share_factor: Optional[float] = None
 ) -> List[Dict[str, Any]]:
     """
     Get 2-3 alternative walking routes from OpenRouteService.
     
+    With `via` points, ORS returns a single route through them (it only
+    computes alternatives between two coordinates).
+    
     Returns list of routes with geometry and distance.
     """
     if not ORS_API_KEY:
@@ -131,15 +138,18 @@ def get_route_alternatives(
     
     # Prepare request body
     post_data = {
-        "coordinates": [[start[0], start[1]], [end[0], end[1]]],
+        "coordinates": [[start[0], start[1]], *([lon, lat] for lon, lat in via or ()), [end[0], end[1]]],
         "format": "geojson",
         "geometry": True,
         "instructions": False,
-        "alternative_routes": {
-            "target_count": 2,  # Request 2 alternatives (total 3 routes)
-            "weight_factor": 1.4
-        }
     }
+    if not via:
+        post_data["alternative_routes"] = {
+            "target_count": target_count,  # Request 2 alternatives (total 3 routes)
+            "weight_factor": weight_factor
+        }
+        if share_factor is not None:
+            post_data["alternative_routes"]["share_factor"] = share_factor
     
     # Headers for POST request
     headers = {
@@ -218,10 +228,14 @@ def get_route_alternatives(
             return routes
         
         else:
+            if via:
+                raise Exception("Unexpected response format from OpenRouteService")
             # If POST fails, try GET as fallback
             return _try_get_request(start, end)
         
     except requests.exceptions.RequestException as e:
+        if via:  # the GET fallback can't pass via points
+            raise Exception(f"Network error calling OpenRouteService: {str(e)}")
         # If POST fails, try GET as fallback
         try:
             return _try_get_request(start, end)
@@ -297,4 +311,34 @@ def _try_get_request(
         if routes:
             return routes
     
-    raise Exception("No valid routes returned from OpenRouteService")
\ No newline at end of file
+    raise Exception("No valid routes returned from OpenRouteService")
+
+def get_walking_matrix(
+    locations: List[Tuple[float, float]]  # (lon, lat)
+) -> Dict[str, List[List[float]]]:
+    """
+    Walking distance/duration matrix between all locations from OpenRouteService.
+
+    Returns {"distances": [[m]], "durations": [[s]]}, indexed [from][to].
+    """
+    if not ORS_API_KEY:
+        raise ValueError("ORS_API_KEY is not set! Check your .env file.")
+
+    url = f"{ORS_BASE_URL}/matrix/foot-walking"
+    post_data = {
+        "locations": [[lon, lat] for lon, lat in locations],
+        "metrics": ["distance", "duration"],
+    }
+    headers = {
+        'Accept': 'application/json',
+        'Content-Type': 'application/json',
+        'Authorization': ORS_API_KEY
+    }
+
+    response = requests.post(url, json=post_data, headers=headers, timeout=10)
+    if response.status_code != 200:
+        raise Exception(f"OpenRouteService matrix returned status {response.status_code}: {response.text[:500]}")
+    data = response.json()
+    if "error" in data:
+        raise Exception(f"OpenRouteService matrix error: {data.get('error')}")
+    return {"distances": data["distances"], "durations": data["durations"]}
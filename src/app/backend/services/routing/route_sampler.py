@@ -1,5 +1,10 @@
 from typing import List, Tuple, Dict, Any
 import math
+import os
+
+# Douglas-Peucker tolerances in meters (0 disables): before sampling, and for the returned geometry
+ROUTE_SIMPLIFY_TOLERANCE_M = float(os.getenv("ROUTE_SIMPLIFY_TOLERANCE_M", "0"))
+ROUTE_RESPONSE_SIMPLIFY_TOLERANCE_M = float(os.getenv("ROUTE_RESPONSE_SIMPLIFY_TOLERANCE_M", "0"))
 
 def haversine_distance(point1: Tuple[float, float], point2: Tuple[float, float]) -> float:
     """Calculate distance between two lat/lon points in meters."""
@@ -26,6 +31,58 @@ def interpolate_point(
     lat = point1[1] + (point2[1] - point1[1]) * fraction
     return (lon, lat)
 
+def _segment_distance_m(p: Tuple[float, float], a: Tuple[float, float], b: Tuple[float, float]) -> float:
+    """Distance from p to segment a-b, all in local planar meters."""
+    dx, dy = b[0] - a[0], b[1] - a[1]
+    seg_len_sq = dx * dx + dy * dy
+    if seg_len_sq == 0:
+        return math.hypot(p[0] - a[0], p[1] - a[1])
+    t = max(0.0, min(1.0, ((p[0] - a[0]) * dx + (p[1] - a[1]) * dy) / seg_len_sq))
+    return math.hypot(p[0] - (a[0] + t * dx), p[1] - (a[1] + t * dy))
+
+def simplify_geometry(
+    geometry: Dict[str, Any],
+    tolerance_m: float
+) -> Dict[str, Any]:
+    """
+    Douglas-Peucker simplification of a GeoJSON LineString.
+
+    Vertices closer than `tolerance_m` to the simplified line are dropped; the
+    endpoints are always kept. Returns the input unchanged when tolerance_m <= 0.
+    """
+    coordinates = geometry.get("coordinates", [])
+    if tolerance_m <= 0 or len(coordinates) < 3:
+        return geometry
+
+    # Equirectangular projection around the first point (fine at city scale)
+    R = 6371000
+    lat0 = math.radians(coordinates[0][1])
+    kx = R * math.cos(lat0) * math.pi / 180
+    ky = R * math.pi / 180
+    projected = [(c[0] * kx, c[1] * ky) for c in coordinates]
+
+    keep = [False] * len(coordinates)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(coordinates) - 1)]
+    while stack:
+        first, last = stack.pop()
+        max_dist = 0.0
+        index = first
+        a, b = projected[first], projected[last]
+        for i in range(first + 1, last):
+            dist = _segment_distance_m(projected[i], a, b)
+            if dist > max_dist:
+                max_dist = dist
+                index = i
+        if max_dist > tolerance_m:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+
+    simplified = dict(geometry)
+    simplified["coordinates"] = [c for c, k in zip(coordinates, keep) if k]
+    return simplified
+
 def sample_route_points(
     geometry: Dict[str, Any],
     interval_m: float = 40.0
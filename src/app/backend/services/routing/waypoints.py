@@ -0,0 +1,83 @@
+"""
+Ordering intermediate stops of a multi-waypoint trip.
+
+The first and last waypoints stay fixed; intermediate stops are reordered to
+minimize the summed pairwise cost. Pairwise costs combine the ORS matrix
+walking distance with an estimated wind cost along the straight-line bearing
+(shelter and snow are unknown until the legs are routed, so exposure is a
+fixed assumption here).
+"""
+import itertools
+from typing import Any, Dict, List, Sequence, Tuple
+
+from services.routing.route_sampler import calculate_bearing
+from services.scoring.route_scorer import RouteMetrics, RouteScorer
+from services.scoring.wind_calculator import calculate_headwind_factor, calculate_wind_cost
+
+ASSUMED_SHELTER = 0.5     # used for every pair before real shelter lookups
+EXACT_ORDER_MAX_STOPS = 7  # brute force up to 7! orders, heuristic beyond
+
+
+def comfort_cost_matrix(
+    locations: Sequence[Tuple[float, float]],  # (lon, lat)
+    distances: List[List[float]],
+    wind_data: Dict[str, Any],
+    scorer: RouteScorer,
+    interval_m: float = 40.0
+) -> List[List[float]]:
+    """Estimated route score between every pair of locations."""
+    n = len(locations)
+    costs = [[0.0] * n for _ in range(n)]
+    for i in range(n):
+        for j in range(n):
+            if i == j:
+                continue
+            distance_m = distances[i][j]
+            headwind = calculate_headwind_factor(
+                calculate_bearing(locations[i], locations[j]),
+                wind_data["direction"],
+                wind_data["speed"]
+            )
+            wind_cost = calculate_wind_cost(headwind, ASSUMED_SHELTER) * distance_m / interval_m
+            costs[i][j] = scorer.score_route(RouteMetrics(distance_m, wind_cost, 0.0)).total_score
+    return costs
+
+
+def _path_cost(order: Sequence[int], costs: List[List[float]]) -> float:
+    return sum(costs[a][b] for a, b in zip(order, order[1:]))
+
+
+def plan_stop_order(costs: List[List[float]]) -> List[int]:
+    """
+    Visiting order (indices into the cost matrix) starting at 0 and ending at n - 1.
+
+    Exact for up to EXACT_ORDER_MAX_STOPS intermediate stops, otherwise nearest
+    neighbour followed by 2-opt improvement.
+    """
+    n = len(costs)
+    if n <= 3:
+        return list(range(n))
+    middle = list(range(1, n - 1))
+
+    if len(middle) <= EXACT_ORDER_MAX_STOPS:
+        best = min(itertools.permutations(middle), key=lambda p: _path_cost((0, *p, n - 1), costs))
+        return [0, *best, n - 1]
+
+    order = [0]
+    remaining = set(middle)
+    while remaining:
+        nearest = min(remaining, key=lambda j: costs[order[-1]][j])
+        order.append(nearest)
+        remaining.remove(nearest)
+    order.append(n - 1)
+
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, n - 2):
+            for j in range(i + 1, n - 1):
+                candidate = order[:i] + order[i:j + 1][::-1] + order[j + 1:]
+                if _path_cost(candidate, costs) < _path_cost(order, costs) - 1e-9:
+                    order = candidate
+                    improved = True
+    return order
@@ -1,8 +1,8 @@
-import os
 import json
+import threading
 import time
-from dotenv import load_dotenv
-from google import genai
+
+from services import config
 
 ####################################
 #10 minute cache for Gemini API call
@@ -27,6 +27,26 @@ def _cache_set(key, val): #store cache as timestamp and value
 
 ####################################
 
+# google.genai takes ~0.25 s to import, so it's imported (and the client built) on first use
+_client = None
+_client_lock = threading.Lock()
+
+def _get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            from google import genai
+            http_options = {"base_url": config.GEMINI_BASE_URL} if config.GEMINI_BASE_URL else None
+            _client = genai.Client(api_key=config.GEMINI_API_KEY, http_options=http_options)
+    return _client
+
+def warm_up():
+    """Import google.genai and build the client ahead of the first request (startup hook)."""
+    if config.GEMINI_API_KEY:
+        _get_client()
+
+####################################
+
 ####################################
 # Main function! Using Gemini API to generate the route explanation given the route data
 def generate_route_explanation(payload):
@@ -40,19 +60,8 @@ def generate_route_explanation(payload):
 
     fallback = _fallback(payload) # in case of API failure, use fallback function
 
-    #loading API key
-    from pathlib import Path
-    env_path = Path(__file__).parent.parent.parent.parent.parent.parent / '.env'
-    print(f"DEBUG Gemini: Loading .env from: {env_path}")
-    print(f"DEBUG Gemini: .env exists: {env_path.exists()}")
-    load_dotenv(env_path, override=True)
-    api_key = os.getenv("GEMINI_API_KEY")
-    
-    print(f"DEBUG Gemini: GEMINI_API_KEY loaded: {'Yes' if api_key else 'No'}")
-    if api_key:
-        print(f"DEBUG Gemini: API key starts with: {api_key[:15]}...")
-
-    if not api_key:
+    # API key comes from services/config.py (read once at startup)
+    if not config.GEMINI_API_KEY:
         print("WARNING: GEMINI_API_KEY not found, using fallback")
         return fallback
 
@@ -62,15 +71,14 @@ def generate_route_explanation(payload):
         return cached
 
     try:
-        print("DEBUG Gemini: Creating client...")
-        client = genai.Client(api_key=api_key)
+        client = _get_client()
 
         prompt = _build_prompt(payload)
         print(f"DEBUG Gemini: Prompt length: {len(prompt)} chars")
         print(f"DEBUG Gemini: Making API call to Gemini...")
 
         response = client.models.generate_content(
-            model="models/gemini-2.5-flash",
+            model=config.GEMINI_MODEL,
             contents=prompt,
         )
 
@@ -29,7 +29,8 @@ class SnowServiceInterface(ABC):
         Returns:
             {
                 "status": str,  # "cleared" | "in_progress" | "planned" | "unknown"
-                "risk": float    # 0-1
+                "risk": float,   # 0-1
+                "cote_rue_id": str | None  # optional: street side, when matched
             }
         """
         pass
\ No newline at end of file
@@ -0,0 +1,180 @@
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+from services import shelter_index
+from services.routing.route_sampler import calculate_bearing
+from services.scoring.interfaces import BuildingServiceInterface, SnowServiceInterface
+from services.scoring.wind_calculator import calculate_headwind_factor, calculate_wind_cost
+
+# (bearing in degrees, building shelter 0-1, weight) per segment
+Segment = Tuple[float, float, float]
+
+
+async def collect_route_lookups(
+    sampled_points: List[Tuple[float, float]],
+    building_service: BuildingServiceInterface,
+    snow_service: SnowServiceInterface,
+    weights: Optional[List[float]] = None
+) -> Tuple[List[Segment], List[int], List[Dict[str, Any]]]:
+    """
+    Look up shelter and snow along sampled (lon, lat) points.
+
+    Snow is looked up every 20 points (or every 20 weight units) and applies to
+    the segments up to the next snow sample.
+
+    Returns:
+        (segments, snow_ref, snow_samples) where snow_ref[i] indexes the snow
+        sample (a snow_service result) that covers segment i
+    """
+    segments: List[Segment] = []
+    snow_ref: List[int] = []
+    snow_samples: List[Dict[str, Any]] = []
+    since_snow = 0.0
+
+    for i in range(len(sampled_points) - 1):
+        point = sampled_points[i]
+        next_point = sampled_points[i + 1]
+        weight = weights[i] if weights is not None else 1.0
+
+        # Get building density
+        building = await building_service.get_building_density(
+            point[1], point[0]  # lat, lon
+        )
+
+        # Get snow status - only every 20 points
+        refresh_snow = since_snow >= 20 if weights is not None else i % 20 == 0
+        if refresh_snow or not snow_samples:
+            snow_samples.append(await snow_service.get_snow_status(
+                point[1], point[0]  # lat, lon
+            ))
+            since_snow = 0.0
+        since_snow += weight
+
+        segments.append((calculate_bearing(point, next_point), building["shelter_score"], weight))
+        snow_ref.append(len(snow_samples) - 1)
+
+    return segments, snow_ref, snow_samples
+
+
+async def collect_route_segments(
+    sampled_points: List[Tuple[float, float]],
+    building_service: BuildingServiceInterface,
+    snow_service: SnowServiceInterface,
+    weights: Optional[List[float]] = None
+) -> Tuple[List[Segment], float]:
+    """
+    Shelter segments and snow cost along sampled (lon, lat) points.
+
+    Everything here is independent of the wind, so it can be computed once and
+    scored against many wind conditions.
+
+    Returns:
+        (segments, snow_cost)
+    """
+    segments, snow_ref, snow_samples = await collect_route_lookups(
+        sampled_points, building_service, snow_service, weights
+    )
+    snow_cost = 0.0
+    for (_, _, weight), k in zip(segments, snow_ref):
+        snow_cost += weight * snow_samples[k]["risk"]
+    return segments, snow_cost
+
+
+def wind_cost_for(segments: List[Segment], wind_data: Dict[str, Any]) -> float:
+    """Sum of per-segment wind cost for one wind condition."""
+    wind_cost = 0.0
+    for bearing, shelter, weight in segments:
+        headwind = calculate_headwind_factor(
+            bearing,
+            wind_data["direction"],
+            wind_data["speed"]
+        )
+        wind_cost += weight * calculate_wind_cost(headwind, shelter)
+    return wind_cost
+
+
+async def compute_route_costs(
+    sampled_points: List[Tuple[float, float]],
+    wind_data: Dict[str, Any],
+    building_service: BuildingServiceInterface,
+    snow_service: SnowServiceInterface,
+    weights: Optional[List[float]] = None
+) -> Tuple[float, float]:
+    """
+    Accumulate wind and snow cost along sampled (lon, lat) points.
+
+    With `weights` (one per segment, see adaptive_sampler.segment_weights) each
+    segment counts in proportion to its length, for unevenly spaced samples.
+    With a shelter index loaded (services/shelter_index.py), each segment's
+    shelter is the index value for the current wind direction where it has one.
+
+    Returns:
+        (wind_cost, snow_cost)
+    """
+    segments, snow_cost = await collect_route_segments(sampled_points, building_service, snow_service, weights)
+    if shelter_index.is_loaded():
+        # Shelter from this wind direction where the precomputed index covers the route
+        segments = shelter_index.directional_segments(segments, sampled_points, wind_data["direction"])
+    return wind_cost_for(segments, wind_data), snow_cost
+
+
+class WindExposureProfile:
+    """
+    A route's wind exposure binned by walking bearing, for scoring many wind
+    conditions cheaply.
+
+    Each 1-degree bin keeps the sums of exposure * cos(bearing) and
+    exposure * sin(bearing), where exposure = (1 - shelter) * weight. The
+    headwind cost for wind from direction d is then
+    speed * sum over bins of max(0, cos(d) * C + sin(d) * S),
+    which is O(bins) per wind condition whatever the route length.
+
+    Given the sampled points and with a shelter index loaded, shelter depends on
+    the wind direction (as in compute_route_costs): one set of bins is kept per
+    index direction bin, built the first time a wind from that bin is scored.
+
+    It matches compute_route_costs' wind cost exactly except in the two bins
+    straddling the crosswind direction, which differ by at most a fraction of a
+    degree's worth of cosine.
+    """
+
+    BINS = 360
+
+    def __init__(self, segments: List[Segment], points: Optional[List[Tuple[float, float]]] = None):
+        self._segments = segments
+        self._points = points if points is not None and shelter_index.is_loaded() else None
+        self._directional: Dict[int, List[Tuple[float, float]]] = {}  # index direction bin -> bins
+        self._bins = self._binned(segments)
+
+    def _binned(self, segments: List[Segment]) -> List[Tuple[float, float]]:
+        cos_sums = [0.0] * self.BINS
+        sin_sums = [0.0] * self.BINS
+        for bearing, shelter, weight in segments:
+            exposure = (1 - shelter) * weight
+            if exposure == 0:
+                continue
+            k = int(bearing) % self.BINS
+            rad = math.radians(bearing)
+            cos_sums[k] += exposure * math.cos(rad)
+            sin_sums[k] += exposure * math.sin(rad)
+        return [(c, s) for c, s in zip(cos_sums, sin_sums) if c or s]
+
+    def _bins_for(self, direction: float) -> List[Tuple[float, float]]:
+        if self._points is None:
+            return self._bins
+        k = shelter_index.direction_bin(direction)
+        if k not in self._directional:
+            self._directional[k] = self._binned(
+                shelter_index.directional_segments(self._segments, self._points, direction)
+            )
+        return self._directional[k]
+
+    def wind_cost(self, speed: float, direction: float) -> float:
+        rad = math.radians(direction)
+        cos_d, sin_d = math.cos(rad), math.sin(rad)
+        total = 0.0
+        for c, s in self._bins_for(direction):
+            along = cos_d * c + sin_d * s
+            if along > 0:
+                total += along
+        return speed * total
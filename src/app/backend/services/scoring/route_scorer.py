@@ -48,4 +48,12 @@ class RouteScorer:
         routes_with_scores: List[Dict[str, Any]]
     ) -> Dict[str, Any]:
         """Choose route with lowest score."""
-        return min(routes_with_scores, key=lambda r: r["score"].total_score)
\ No newline at end of file
+        return min(routes_with_scores, key=lambda r: r["score"].total_score)
+
+# Named weight sets for re-ranking (distance, wind, snow); "default" matches RouteScorer()
+SCORING_PROFILES: Dict[str, Dict[str, float]] = {
+    "default": {"distance": 1.0, "wind": 20.0, "snow": 50.0},
+    "avoid_snow": {"distance": 1.0, "wind": 20.0, "snow": 500.0},
+    "avoid_wind": {"distance": 1.0, "wind": 200.0, "snow": 50.0},
+    "shortest": {"distance": 1.0, "wind": 0.0, "snow": 0.0},
+}
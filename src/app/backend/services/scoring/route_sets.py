@@ -0,0 +1,70 @@
+"""
+Raw per-route metrics from a /route call, kept under a route-set id so the same
+routes can be re-ranked under other weights without recomputing anything.
+
+Sets are kept in this worker process only. With several uvicorn workers,
+/route/rerank must reach the worker that served the /route call (sticky routing)
+or it returns 404.
+"""
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from services.scoring.route_scorer import RouteMetrics, RouteScorer
+
+ROUTE_SET_TTL_S = float(os.getenv("ROUTE_SET_TTL_S", "1800"))
+ROUTE_SET_MAX = int(os.getenv("ROUTE_SET_MAX", "10000"))
+
+# route_set_id -> (expires at, routes); oldest first
+_ROUTE_SETS: "OrderedDict[str, tuple]" = OrderedDict()
+
+
+def store_route_set(routes_with_scores: List[Dict[str, Any]]) -> str:
+    """Keep the raw metrics of scored routes; returns the route-set id."""
+    now = time.monotonic()
+    while _ROUTE_SETS and (len(_ROUTE_SETS) >= ROUTE_SET_MAX or next(iter(_ROUTE_SETS.values()))[0] <= now):
+        _ROUTE_SETS.popitem(last=False)
+    routes = [
+        {
+            "id": r["id"],
+            "distance_m": r["distance_m"],
+            "duration_s": r["duration_s"],
+            "metrics": RouteMetrics(r["metrics"]["distance_m"], r["metrics"]["wind_cost"], r["metrics"]["snow_cost"]),
+        }
+        for r in routes_with_scores
+    ]
+    route_set_id = uuid.uuid4().hex
+    _ROUTE_SETS[route_set_id] = (now + ROUTE_SET_TTL_S, routes)
+    return route_set_id
+
+
+def get_route_set(route_set_id: str) -> Optional[List[Dict[str, Any]]]:
+    entry = _ROUTE_SETS.get(route_set_id)
+    if entry is None:
+        return None
+    if entry[0] <= time.monotonic():
+        del _ROUTE_SETS[route_set_id]
+        return None
+    return entry[1]
+
+
+def rerank(routes: List[Dict[str, Any]], scorer: RouteScorer) -> Dict[str, Any]:
+    """Score and order stored routes with `scorer` (lowest score first)."""
+    scored = [{**r, "score": scorer.score_route(r["metrics"])} for r in routes]
+    best = scorer.choose_best_route(scored)
+    ranking = sorted(scored, key=lambda r: r["score"].total_score)
+    return {
+        "chosen_route_id": best["id"],
+        "ranking": [
+            {
+                "id": r["id"],
+                "score": r["score"].total_score,
+                "distance_m": r["distance_m"],
+                "duration_s": r["duration_s"],
+                "metrics": vars(r["metrics"]),
+            }
+            for r in ranking
+        ],
+    }
@@ -0,0 +1,54 @@
+"""
+Per-request shared lookup set for work that runs concurrently (e.g. the legs
+of a multi-waypoint trip).
+
+Each ~100 m cell is looked up at most once per request: concurrent callers
+asking for the same cell await the same in-flight task instead of each going
+to the service (and its upstream) separately.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+from services.buildings import _get_cache_key
+from services.scoring.interfaces import BuildingServiceInterface, SnowServiceInterface
+
+
+class _CellMemo:
+    def __init__(self, fetch: Callable[[float, float], Awaitable[Dict[str, Any]]]):
+        self._fetch = fetch
+        self._tasks: Dict[str, asyncio.Future] = {}
+        self.requested = 0
+
+    async def get(self, lat: float, lon: float) -> Dict[str, Any]:
+        self.requested += 1
+        key = _get_cache_key(lat, lon)
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(lat, lon))
+            self._tasks[key] = task
+        return await asyncio.shield(task)  # one caller being cancelled must not cancel the others
+
+    def stats(self) -> Dict[str, int]:
+        return {"requested": self.requested, "looked_up": len(self._tasks)}
+
+
+class SharedBuildingLookups(BuildingServiceInterface):
+    def __init__(self, inner: BuildingServiceInterface):
+        self._memo = _CellMemo(inner.get_building_density)
+
+    async def get_building_density(self, lat: float, lon: float) -> Dict[str, Any]:
+        return await self._memo.get(lat, lon)
+
+    def stats(self) -> Dict[str, int]:
+        return self._memo.stats()
+
+
+class SharedSnowLookups(SnowServiceInterface):
+    def __init__(self, inner: SnowServiceInterface):
+        self._memo = _CellMemo(inner.get_snow_status)
+
+    async def get_snow_status(self, lat: float, lon: float) -> Dict[str, Any]:
+        return await self._memo.get(lat, lon)
+
+    def stats(self) -> Dict[str, int]:
+        return self._memo.stats()
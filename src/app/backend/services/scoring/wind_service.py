@@ -1,11 +1,16 @@
+import os
 import requests
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, List, Tuple
 from datetime import datetime, timedelta
 from functools import lru_cache
 
+from services import disk_cache
+
 # Simple cache (in production, use Redis)
 _wind_cache = {}
 
+OPEN_METEO_URL = os.getenv("OPEN_METEO_URL", "https://api.open-meteo.com/v1/forecast")
+
 def get_wind_data(lat: float, lon: float) -> Dict[str, float]:
     """
     Get wind speed and direction for a location.
@@ -20,9 +25,15 @@ def get_wind_data(lat: float, lon: float) -> Dict[str, float]:
         cached_time, cached_data = _wind_cache[cache_key]
         if datetime.now() - cached_time < timedelta(minutes=5):
             return cached_data
+
+    # L2 keeps the fetch time, so a restored entry expires when the original would have
+    stored = disk_cache.get("openmeteo", cache_key)
+    if stored is not None:
+        _wind_cache[cache_key] = (datetime.fromtimestamp(stored["fetched_at"]), stored["wind"])
+        return stored["wind"]
     
     # Open-Meteo (free, no API key)
-    url = "https://api.open-meteo.com/v1/forecast"
+    url = OPEN_METEO_URL
     params = {
         "latitude": lat,
         "longitude": lon,
@@ -42,6 +53,53 @@ def get_wind_data(lat: float, lon: float) -> Dict[str, float]:
     }
     
     # Cache it
-    _wind_cache[cache_key] = (datetime.now(), wind_data)
+    fetched_at = datetime.now()
+    _wind_cache[cache_key] = (fetched_at, wind_data)
+    disk_cache.put("openmeteo", cache_key, {"fetched_at": fetched_at.timestamp(), "wind": wind_data})
     
-    return wind_data
\ No newline at end of file
+    return wind_data
+
+# Hourly forecasts change slowly; keep them longer than current conditions
+_forecast_cache = {}
+FORECAST_TTL = timedelta(minutes=30)
+MAX_FORECAST_HOURS = 48
+
+def get_wind_forecast(lat: float, lon: float, hours: int = 12) -> List[Dict[str, Any]]:
+    """
+    Hourly wind forecast for the next `hours` hours (starting with the current hour).
+
+    Returns:
+        [{"time": str (local ISO hour), "speed": float, "direction": float}, ...]
+        in the same units as get_wind_data.
+    """
+    hours = max(1, min(hours, MAX_FORECAST_HOURS))
+    cache_key = f"{round(lat, 2)}_{round(lon, 2)}"
+    if cache_key in _forecast_cache:
+        cached_time, cached_hours = _forecast_cache[cache_key]
+        if datetime.now() - cached_time < FORECAST_TTL and len(cached_hours) >= hours:
+            return cached_hours[:hours]
+    stored = disk_cache.get("openmeteo_forecast", cache_key)
+    if stored is not None and len(stored["forecast"]) >= hours:
+        _forecast_cache[cache_key] = (datetime.fromtimestamp(stored["fetched_at"]), stored["forecast"])
+        return stored["forecast"][:hours]
+
+    params = {
+        "latitude": lat,
+        "longitude": lon,
+        "hourly": "wind_speed_10m,wind_direction_10m",
+        "forecast_hours": MAX_FORECAST_HOURS,  # one fetch serves any horizon
+        "timezone": "America/Montreal"
+    }
+    response = requests.get(OPEN_METEO_URL, params=params)
+    response.raise_for_status()
+    hourly = response.json()["hourly"]
+
+    forecast = [
+        {"time": t, "speed": speed, "direction": direction}
+        for t, speed, direction in zip(hourly["time"], hourly["wind_speed_10m"], hourly["wind_direction_10m"])
+        if speed is not None and direction is not None
+    ]
+    fetched_at = datetime.now()
+    _forecast_cache[cache_key] = (fetched_at, forecast)
+    disk_cache.put("openmeteo_forecast", cache_key, {"fetched_at": fetched_at.timestamp(), "forecast": forecast})
+    return forecast[:hours]
@@ -0,0 +1,218 @@
+"""
+Memory-mapped, read-only GeobaseStore snapshots shared by every worker on a host.
+
+With FROSTBYTE_SHARED_DATA_DIR set, one worker at a time (holding an flock on
+`build.lock`) downloads the geobase and planif data, builds the compact store
+and writes it to `geobase-<generation>.bin`. The file is written to a temp
+name and moved into place with os.replace, then `generation.json` is replaced
+the same way, so readers only ever see complete files.
+
+Every worker maps the current generation read-only. The typed arrays are
+memoryviews over the mapping and street names are binary-searched in the
+mapped string table, so the pages live once in the OS page cache no matter how
+many workers there are, and attaching to a snapshot takes milliseconds.
+
+File layout:
+    8 bytes   magic
+    4 bytes   header length (little endian)
+    header    JSON: generation, built_at, source_digest, sections {name: [offset, nbytes, format]}
+    sections  raw array bytes in native byte order, each aligned to 8 bytes
+"""
+import fcntl
+import json
+import mmap
+import os
+import struct
+import tempfile
+import time
+from array import array
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from services.snow_store import GeobaseStore
+
+SHARED_DATA_DIR = os.getenv("FROSTBYTE_SHARED_DATA_DIR")
+KEEP_GENERATIONS = 2  # older files are unlinked; workers still mapping them keep their pages
+
+_MAGIC = b"FBGEO\x00\x01\x00"
+_GENERATION_FILE = "generation.json"
+_LOCK_FILE = "build.lock"
+
+# store slot -> memoryview format
+_ARRAY_SECTIONS = {
+    "_cote_num": "q",
+    "street_start": "I",
+    "display_code": "I",
+    "debut": "i",
+    "fin": "i",
+    "etat": "B",
+    "_sorted_ids": "q",
+    "_sorted_pos": "I",
+}
+_STRING_SECTIONS = ("street_names", "display_names")
+
+
+class MappedStrings:
+    """Read-only list of strings stored as offsets + one UTF-8 blob in the mapping."""
+
+    def __init__(self, offsets: memoryview, blob: memoryview):
+        self._offsets = offsets
+        self._blob = blob
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return str(self._blob[self._offsets[i]:self._offsets[i + 1]], "utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        return (self[i] for i in range(len(self)))
+
+
+class MappedStreetIndex:
+    """Stand-in for GeobaseStore._street_index: binary search over the sorted street names."""
+
+    def __init__(self, names: MappedStrings):
+        self._names = names
+
+    def get(self, street: str, default=None) -> Optional[int]:
+        i = bisect_left(self._names, street)
+        if i < len(self._names) and self._names[i] == street:
+            return i
+        return default
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+
+def _path(name: str) -> str:
+    return os.path.join(SHARED_DATA_DIR, name)
+
+
+def _write_atomic(path: str, chunks: Iterable[bytes]) -> None:
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def _string_table(strings: Iterable[str]) -> Tuple[bytes, bytes]:
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = [0]
+    for b in encoded:
+        offsets.append(offsets[-1] + len(b))
+    return array("I", offsets).tobytes(), b"".join(encoded)
+
+
+def _sections(store: GeobaseStore) -> Dict[str, Tuple[bytes, str]]:
+    sections = {name: (bytes(memoryview(getattr(store, name)).cast("B")), fmt) for name, fmt in _ARRAY_SECTIONS.items()}
+    for name in _STRING_SECTIONS:
+        offsets, blob = _string_table(getattr(store, name))
+        sections[name + ".offsets"] = (offsets, "I")
+        sections[name + ".blob"] = (blob, "B")
+    return sections
+
+
+def read_generation() -> Optional[Dict[str, Any]]:
+    """Contents of generation.json, or None if nothing has been published yet."""
+    try:
+        with open(_path(_GENERATION_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def publish(store: GeobaseStore) -> Dict[str, Any]:
+    """Write `store` as the next generation. Call while holding build_lock()."""
+    if store._cote_str is not None:
+        raise ValueError("only numeric cote_rue_ids can be memory-mapped")
+    current = read_generation()
+    generation = (current["generation"] if current else 0) + 1
+    file_name = f"geobase-{generation}.bin"
+
+    sections = _sections(store)
+    layout: Dict[str, list] = {}
+    offset = 0
+    for name, (data, fmt) in sections.items():
+        layout[name] = [offset, len(data), fmt]
+        offset += len(data) + (-len(data) % 8)
+    info = {
+        "generation": generation,
+        "file": file_name,
+        "built_at": time.time(),
+        "source_digest": store.source_digest,
+        "segments": len(store),
+    }
+    header = json.dumps({**info, "sections": layout}).encode("utf-8")
+    prefix = _MAGIC + struct.pack("<I", len(header)) + header
+    prefix += b"\0" * (-len(prefix) % 8)
+
+    def chunks():
+        yield prefix
+        for data, _ in sections.values():
+            yield data
+            yield b"\0" * (-len(data) % 8)
+
+    _write_atomic(_path(file_name), chunks())
+    _write_atomic(_path(_GENERATION_FILE), [json.dumps(info).encode("utf-8")])
+
+    for old in range(1, generation - KEEP_GENERATIONS + 1):
+        try:
+            os.unlink(_path(f"geobase-{old}.bin"))
+        except FileNotFoundError:
+            pass
+    return info
+
+
+def open_generation(info: Dict[str, Any]) -> GeobaseStore:
+    """Map a published generation read-only and wrap it as a GeobaseStore."""
+    with open(_path(info["file"]), "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if mm[:len(_MAGIC)] != _MAGIC:
+        raise ValueError(f"{info['file']} is not a geobase snapshot")
+    (header_len,) = struct.unpack_from("<I", mm, len(_MAGIC))
+    start = len(_MAGIC) + 4
+    header = json.loads(mm[start:start + header_len])
+    base = start + header_len + (-(start + header_len) % 8)
+
+    whole = memoryview(mm)
+    views = {
+        name: whole[base + offset:base + offset + nbytes].cast(fmt)
+        for name, (offset, nbytes, fmt) in header["sections"].items()
+    }
+
+    store = GeobaseStore.__new__(GeobaseStore)
+    for name in _ARRAY_SECTIONS:
+        setattr(store, name, views[name])
+    for name in _STRING_SECTIONS:
+        setattr(store, name, MappedStrings(views[name + ".offsets"], views[name + ".blob"]))
+    store._cote_str = None
+    store._id_index = None
+    store._street_index = MappedStreetIndex(store.street_names)
+    store.source_digest = header.get("source_digest")
+    return store
+
+
+@contextmanager
+def build_lock():
+    """Non-blocking exclusive lock for building; yields False if another worker holds it."""
+    os.makedirs(SHARED_DATA_DIR, exist_ok=True)
+    with open(_path(_LOCK_FILE), "a+") as f:
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
@@ -0,0 +1,260 @@
+"""
+Directional shelter index: one shelter value per grid cell per wind direction.
+
+`_compute_shelter_score` counts buildings within 40 m, so it can't tell whether
+they stand upwind. This index is built offline from building centres and
+heights. Each cell gets a shelter value for each of BINS compass bins (the
+direction the wind comes from). A building contributes to a bin when it lies
+in that direction from the cell centre. Its shelter fades linearly to nothing
+WAKE_HEIGHTS building heights downwind. Contributions combine as
+1 - prod(1 - s), so two half-shelters give 0.75.
+
+The index is a flat uint8 array (rows x cols x BINS, 0-255) behind a small JSON
+header, memory-mapped read-only. A lookup is one index computation into the
+mapping, and the pages are shared by every worker on the host.
+
+Build (from the backend directory):
+
+    python -m services.shelter_index --out shelter.idx [--bbox=minlon,minlat,maxlon,maxlat]
+                                     [--overpass-json file.json ...] [--grid 0.0005]
+
+Without --overpass-json, building centres are fetched from Overpass in tiles.
+At runtime FROSTBYTE_SHELTER_INDEX names the file; it is mapped at startup.
+
+File layout:
+    8 bytes   magic
+    4 bytes   header length (little endian)
+    header    JSON: min_lat, min_lon, grid_deg, rows, cols, bins, built_at, buildings
+    data      rows * cols * bins bytes, 8-byte aligned
+"""
+import argparse
+import json
+import math
+import mmap
+import os
+import struct
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+SHELTER_INDEX_PATH = os.getenv("FROSTBYTE_SHELTER_INDEX")
+BINS = 16
+GRID_DEG = 0.0005          # ~55 m north-south, ~40 m east-west in Montreal
+WAKE_HEIGHTS = 5.0         # a building shelters up to this many heights downwind
+MAX_RADIUS_M = 120.0       # buildings farther away than this are ignored
+DEFAULT_HEIGHT_M = 9.0     # untagged buildings (~3 floors)
+HALF_WIDTH_M = 8.0         # assumed half-width of a building seen from a cell
+MAX_SHELTER = 0.9          # one building never blocks the wind completely
+
+_MAGIC = b"FBSHI\x00\x01\x00"
+_M_PER_DEG_LAT = 110_540.0
+_M_PER_DEG_LON = 111_320.0
+
+Building = Tuple[float, float, float]  # (lat, lon, height_m)
+
+_index: Optional[Dict[str, Any]] = None  # header fields + "data" (memoryview over the mapping)
+
+
+def direction_bin(direction: float) -> int:
+    """Compass bin of a meteorological wind direction (where the wind comes from)."""
+    return int(round((direction % 360) / (360 / BINS))) % BINS
+
+
+# ---- building ----
+
+def build(buildings: Iterable[Building], bbox: Tuple[float, float, float, float],
+          grid_deg: float = GRID_DEG) -> Tuple[Dict[str, Any], bytearray]:
+    """(header, rows*cols*BINS uint8 shelter) for a bbox (min_lon, min_lat, max_lon, max_lat)."""
+    min_lon, min_lat, max_lon, max_lat = bbox
+    rows = int(math.ceil((max_lat - min_lat) / grid_deg)) + 1
+    cols = int(math.ceil((max_lon - min_lon) / grid_deg)) + 1
+    cos_lat = math.cos(math.radians((min_lat + max_lat) / 2))
+    cell_h, cell_w = grid_deg * _M_PER_DEG_LAT, grid_deg * _M_PER_DEG_LON * cos_lat
+    bin_width = 360 / BINS
+
+    # exposure = prod(1 - s) per cell and bin, only for cells near a building
+    exposure: Dict[int, List[float]] = {}
+    count = 0
+    for lat, lon, height in buildings:
+        if not (min_lat <= lat <= max_lat and min_lon <= lon <= max_lon):
+            continue
+        count += 1
+        reach = min(WAKE_HEIGHTS * height, MAX_RADIUS_M)
+        r0, c0 = (lat - min_lat) / grid_deg, (lon - min_lon) / grid_deg
+        dr, dc = int(reach / cell_h) + 1, int(reach / cell_w) + 1
+        for r in range(max(0, int(r0) - dr), min(rows, int(r0) + dr + 2)):
+            for c in range(max(0, int(c0) - dc), min(cols, int(c0) + dc + 2)):
+                north, east = (r0 - r) * cell_h, (c0 - c) * cell_w  # cell centre -> building
+                distance = math.hypot(north, east)
+                if distance >= reach:
+                    continue
+                shelter = MAX_SHELTER * (1 - distance / reach)
+                bearing = math.degrees(math.atan2(east, north)) % 360
+                # Nearby buildings fill a wider arc of the horizon
+                half_arc = math.degrees(math.atan2(HALF_WIDTH_M, max(distance, 1.0)))
+                cell = exposure.setdefault(r * cols + c, [1.0] * BINS)
+                first = int(math.floor((bearing - half_arc) / bin_width + 0.5))
+                last = int(math.floor((bearing + half_arc) / bin_width + 0.5))
+                for k in range(first, last + 1):
+                    cell[k % BINS] *= 1 - shelter
+
+    data = bytearray(rows * cols * BINS)
+    for i, cell in exposure.items():
+        data[i * BINS:(i + 1) * BINS] = bytes(int(round((1 - e) * 255)) for e in cell)
+    header = {
+        "min_lat": min_lat, "min_lon": min_lon, "grid_deg": grid_deg,
+        "rows": rows, "cols": cols, "bins": BINS,
+        "built_at": time.time(), "buildings": count,
+    }
+    return header, data
+
+
+def write(path: str, header: Dict[str, Any], data: bytes) -> None:
+    """Write an index file atomically (temp file + os.replace)."""
+    encoded = json.dumps(header).encode("utf-8")
+    prefix = _MAGIC + struct.pack("<I", len(encoded)) + encoded
+    prefix += b"\0" * (-len(prefix) % 8)
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(prefix)
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def buildings_from_overpass(data: Dict[str, Any]) -> List[Building]:
+    """(lat, lon, height) from an Overpass JSON response with `out tags center`."""
+    from services.buildings import _estimate_height_m
+
+    out = []
+    for element in data.get("elements", []):
+        center = element.get("center") or element
+        if "lat" not in center or "lon" not in center:
+            continue
+        height = _estimate_height_m(element.get("tags") or {}) or DEFAULT_HEIGHT_M
+        out.append((center["lat"], center["lon"], height))
+    return out
+
+
+def fetch_buildings(bbox: Tuple[float, float, float, float], tile_deg: float = 0.02) -> List[Building]:
+    """All building centres in a bbox from Overpass, a tile at a time (offline build only)."""
+    import requests
+    from services.buildings import OVERPASS_URL
+
+    min_lon, min_lat, max_lon, max_lat = bbox
+    found: Dict[Tuple[float, float], Building] = {}  # buildings on a tile edge come back twice
+    lat = min_lat
+    while lat < max_lat:
+        lon = min_lon
+        while lon < max_lon:
+            south, west = lat, lon
+            north, east = min(lat + tile_deg, max_lat), min(lon + tile_deg, max_lon)
+            query = f"""
+            [out:json][timeout:120];
+            (
+              way["building"]({south},{west},{north},{east});
+              relation["building"]({south},{west},{north},{east});
+            );
+            out tags center;
+            """
+            response = requests.post(OVERPASS_URL, data=query, timeout=180)
+            response.raise_for_status()
+            for b in buildings_from_overpass(response.json()):
+                found[(round(b[0], 7), round(b[1], 7))] = b
+            print(f"Shelter index: tile {south:.3f},{west:.3f} done, {len(found)} buildings so far")
+            lon += tile_deg
+        lat += tile_deg
+    return list(found.values())
+
+
+# ---- lookups ----
+
+def load(path: Optional[str] = None) -> bool:
+    """Map an index file read-only. Returns False (and keeps any current index) on failure."""
+    global _index
+    path = path or SHELTER_INDEX_PATH
+    if not path:
+        return False
+    try:
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if mm[:len(_MAGIC)] != _MAGIC:
+            raise ValueError(f"{path} is not a shelter index")
+        (header_len,) = struct.unpack_from("<I", mm, len(_MAGIC))
+        start = len(_MAGIC) + 4
+        header = json.loads(mm[start:start + header_len])
+        base = start + header_len + (-(start + header_len) % 8)
+        size = header["rows"] * header["cols"] * header["bins"]
+        if header["bins"] != BINS or len(mm) < base + size:
+            raise ValueError(f"{path} has an unexpected layout")
+    except (OSError, ValueError) as e:
+        print(f"WARNING: shelter index not loaded: {e}")
+        return False
+    _index = {**header, "path": path, "data": memoryview(mm)[base:base + size]}
+    print(f"Shelter index: {header['rows']}x{header['cols']} cells from {header['buildings']} buildings")
+    return True
+
+
+def is_loaded() -> bool:
+    return _index is not None
+
+
+def shelter_for(lat: float, lon: float, direction: float) -> Optional[float]:
+    """Shelter (0-1) from wind blowing from `direction` at a point; None outside the index."""
+    index = _index
+    if index is None:
+        return None
+    r = int(round((lat - index["min_lat"]) / index["grid_deg"]))
+    c = int(round((lon - index["min_lon"]) / index["grid_deg"]))
+    if not (0 <= r < index["rows"] and 0 <= c < index["cols"]):
+        return None
+    return index["data"][(r * index["cols"] + c) * BINS + direction_bin(direction)] / 255
+
+
+def directional_shelter(shelter: List[float], points: List[Tuple[float, float]], direction: float) -> List[float]:
+    """Per-segment shelter (segment i starts at (lon, lat) points[i]) for `direction` wherever the index covers it."""
+    out = []
+    for s, (lon, lat) in zip(shelter, points):
+        directional = shelter_for(lat, lon, direction)
+        out.append(s if directional is None else directional)
+    return out
+
+
+def directional_segments(segments: List[Tuple[float, float, float]], points: List[Tuple[float, float]],
+                         direction: float) -> List[Tuple[float, float, float]]:
+    """Segments (bearing, shelter, weight) with shelter for `direction` wherever the index covers them."""
+    shelter = directional_shelter([s for _, s, _ in segments], points, direction)
+    return [(bearing, s, weight) for (bearing, _, weight), s in zip(segments, shelter)]
+
+
+def status() -> Dict[str, Any]:
+    if _index is None:
+        return {"loaded": False, "path": SHELTER_INDEX_PATH}
+    return {"loaded": True, **{k: v for k, v in _index.items() if k != "data"}}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Build the directional shelter index")
+    parser.add_argument("--out", required=True, help="index file to write")
+    parser.add_argument("--bbox", help="min_lon,min_lat,max_lon,max_lat (default: the service area)")
+    parser.add_argument("--overpass-json", nargs="*", help="Overpass responses (out tags center) instead of fetching")
+    parser.add_argument("--grid", type=float, default=GRID_DEG, help="cell size in degrees")
+    args = parser.parse_args(argv)
+
+    from services.prewarm import SERVICE_AREA, normalize_bbox
+
+    bbox = normalize_bbox(args.bbox.split(",")) if args.bbox else SERVICE_AREA
+    if args.overpass_json:
+        buildings: List[Building] = []
+        for path in args.overpass_json:
+            with open(path, encoding="utf-8") as f:
+                buildings += buildings_from_overpass(json.load(f))
+    else:
+        buildings = fetch_buildings(bbox)
+    started = time.perf_counter()
+    header, data = build(buildings, bbox, args.grid)
+    write(args.out, header, data)
+    print(f"Shelter index: {header['rows']}x{header['cols']}x{BINS} from {header['buildings']} buildings "
+          f"in {time.perf_counter() - started:.1f}s -> {args.out} ({len(data) / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
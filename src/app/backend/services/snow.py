@@ -163,18 +163,25 @@ async def get_snow_status(lat: float, lon: float) -> Dict[str, Any]:
 
 # Snow status service (fallback-first)
 from __future__ import annotations
+import asyncio
+import hashlib
+import json
+import os
+import threading
 import time
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
 
 import httpx
 from services.scoring.interfaces import SnowServiceInterface
+from services.upstream_scheduler import scheduler
+from services.snow_store import GeobaseStore
+from services import shared_store
 
 # caching the data
-PLANIF_URL = "https://raw.githubusercontent.com/ludodefgh/planif-neige-public-api/main/data/planif-neige.json" # "live" snow status feed
-GEOMAP_URL = "https://raw.githubusercontent.com/ludodefgh/planif-neige-public-api/main/data/geobase-map.json" # mapping that tells you what cote_rue_id corresponds to what street and address range
+PLANIF_URL = os.getenv("PLANIF_URL", "https://raw.githubusercontent.com/ludodefgh/planif-neige-public-api/main/data/planif-neige.json") # "live" snow status feed
+GEOMAP_URL = os.getenv("GEOMAP_URL", "https://raw.githubusercontent.com/ludodefgh/planif-neige-public-api/main/data/geobase-map.json") # mapping that tells you what cote_rue_id corresponds to what street and address range
 
-_planif_by_cote: Dict[str, Dict[str, Any]] = {} # lookup table: cote_rue_id -> planif record
-_geomap: Dict[str, Dict[str, Any]] = {} # geobase map loaded as-is
+_store: GeobaseStore = GeobaseStore() # compact geobase map + planif snapshot (see snow_store.py)
 _last_loaded_ts: float = 0.0 # when we last downloaded the data
 
 REFRESH_EVERY = 20 * 60  # 20 minutes
@@ -183,21 +190,158 @@ REFRESH_EVERY = 20 * 60  # 20 minutes
 _SNOW_CACHE = {}
 _SNOW_CACHE_GRID_SIZE = 0.002 # ~100m grid
 
+# Failed lookups (Nominatim or dataset download down) are remembered only briefly:
+# they have no address, so no refresh could ever fix them in _SNOW_CACHE
+SNOW_NEGATIVE_TTL_S = float(os.getenv("SNOW_NEGATIVE_TTL_S", "60"))
+_SNOW_NEGATIVE_CACHE: Dict[str, float] = {}  # cache_key -> expiry (time.monotonic())
+
+# Reverse map for targeted updates: cote_rue_id -> snow cache keys whose result depends on it
+_COTE_TO_CELLS: Dict[str, Set[str]] = {}
+
+# _SNOW_CACHE results are composed from two layers that change at different rates:
+#   _POINT_CACHE  cell -> reverse-geocoded {"street", "house_number"}. Addresses don't change,
+#                 so this lives for the whole process and is appended to
+#                 FROSTBYTE_SNOW_POINT_CACHE (JSON lines) to survive restarts.
+#   _COTE_STATUS  cote_rue_id -> (has_planif, status, risk) read from the current snapshot,
+#                 cleared whenever a new snapshot is installed.
+# A refresh re-composes the affected cells from these without any geocoding.
+POINT_CACHE_PATH = os.getenv("FROSTBYTE_SNOW_POINT_CACHE")
+_POINT_CACHE: Dict[str, Dict[str, Any]] = {}
+_COTE_STATUS: Dict[str, Tuple[bool, str, float]] = {}
+_point_file_lock = threading.Lock()
+
+# Called with the set of cote_rue_ids whose state changed after each refresh
+_planif_listeners: List[Callable[[Set[str]], None]] = []
+
+_geomap_digest: Optional[str] = None # lets a refresh keep the geobase arrays when the file is unchanged
+_refresh_lock = asyncio.Lock()
+_refresh_task: Optional[asyncio.Task] = None
+_shared_generation: Optional[int] = None # mapped generation in multi-worker mode
+SHARED_RETRY_S = 30 # how soon a worker re-checks while another one is building
+
 def _get_snow_cache_key(lat: float, lon: float) -> str:
     """Round coordinates to cache grid"""
     lat_rounded = round(lat / _SNOW_CACHE_GRID_SIZE) * _SNOW_CACHE_GRID_SIZE
     lon_rounded = round(lon / _SNOW_CACHE_GRID_SIZE) * _SNOW_CACHE_GRID_SIZE
     return f"{lat_rounded:.4f},{lon_rounded:.4f}"
 
-async def load_planif_data(force: bool = False) -> None:
-    """
-    Loads data set into memory
-    Refreshes every REFRESH_EVERY seconds unless force=True
-    """
-    global _planif_by_cote, _geomap, _last_loaded_ts
-    now = time.time()
-    if not force and _last_loaded_ts and (now-_last_loaded_ts) < REFRESH_EVERY:
+def _cache_result(cache_key: str, result: Dict[str, Any]) -> None:
+    _SNOW_CACHE[cache_key] = result
+    cote_id = result.get("cote_rue_id")
+    if cote_id:
+        _COTE_TO_CELLS.setdefault(cote_id, set()).add(cache_key)
+
+def _append_points(records: List[Dict[str, Any]]) -> None:
+    if not POINT_CACHE_PATH:
         return
+    lines = "".join(json.dumps(r, separators=(",", ":")) + "\n" for r in records)
+    try:
+        with _point_file_lock:
+            with open(POINT_CACHE_PATH, "a", encoding="utf-8") as f:
+                f.write(lines)
+    except OSError as e:
+        print(f"WARNING: snow point cache not written: {e}")
+
+def _remember_point(cache_key: str, address: Dict[str, Any]) -> None:
+    _POINT_CACHE[cache_key] = address
+    _append_points([{"k": cache_key, **address}])
+
+def forget_points(cache_keys: Set[str]) -> None:
+    """Drop geocoded addresses (e.g. admin evict); recorded as tombstones in the persisted file."""
+    keys = [k for k in cache_keys if _POINT_CACHE.pop(k, None) is not None]
+    if keys:
+        _append_points([{"k": k, "deleted": True} for k in keys])
+
+def load_point_cache(path: Optional[str] = None) -> int:
+    """Read persisted addresses (last record per cell wins), compacting the file if mostly stale."""
+    path = path or POINT_CACHE_PATH
+    if not path or not os.path.exists(path):
+        return 0
+    lines = 0
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            lines += 1
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # torn last line after a crash
+            key = record.pop("k", None)
+            if key is None:
+                continue
+            if record.get("deleted"):
+                _POINT_CACHE.pop(key, None)
+            else:
+                _POINT_CACHE[key] = record
+    if lines > 2 * len(_POINT_CACHE) + 1000:
+        tmp = f"{path}.tmp-{os.getpid()}"
+        with _point_file_lock:
+            with open(tmp, "w", encoding="utf-8") as f:
+                for key, address in _POINT_CACHE.items():
+                    f.write(json.dumps({"k": key, **address}, separators=(",", ":")) + "\n")
+            os.replace(tmp, path)
+    return len(_POINT_CACHE)
+
+def _cote_status(cote_id: str) -> Tuple[bool, str, float]:
+    cached = _COTE_STATUS.get(cote_id)
+    if cached is None:
+        has_planif, etat = _store.planif_etat(_store.index_of(cote_id))
+        status, risk = etat_to_status_risk(etat) if has_planif else ("unknown", 0.3)
+        cached = _COTE_STATUS[cote_id] = (has_planif, status, risk)
+    return cached
+
+def _compose(address: Dict[str, Any]) -> Dict[str, Any]:
+    """Snow result for a geocoded address against the current snapshot (no I/O)."""
+    street, house_number = address.get("street"), address.get("house_number")
+    if not street: # if no street then we can't match schedule obvi
+        return {"status": "unknown", "risk": 0.3, "source": "fallback_no_street"}
+    cote_id = find_cote_rue_id(street, house_number)
+    if not cote_id:
+        return {
+            "status": "unknown",
+            "risk": 0.3,
+            "source": "fallback_no_match",
+            "street": street,
+            "house_number": house_number,
+        }
+    has_planif, status, risk = _cote_status(cote_id)
+    return {
+        "status": status,
+        "risk": risk,
+        "source": "planif_neige_public_api" if has_planif else "fallback_no_planif", # no current record for this street
+        "cote_rue_id": cote_id,
+        "street": street,
+        "house_number": house_number,
+    }
+
+def _recompose(cache_keys: Iterable[str]) -> int:
+    """Rebuild cached results from their geocoded addresses; cells without one are dropped."""
+    updated = 0
+    for cache_key in cache_keys:
+        old = _SNOW_CACHE.pop(cache_key, None)
+        old_cote = old.get("cote_rue_id") if old else None
+        if old_cote and old_cote in _COTE_TO_CELLS:
+            _COTE_TO_CELLS[old_cote].discard(cache_key)
+        address = _POINT_CACHE.get(cache_key)
+        if address is not None:
+            _cache_result(cache_key, _compose(address))
+            updated += 1
+    return updated
+
+def rebuild_from_points() -> int:
+    """Compose results for every geocoded cell (after loading persisted addresses). Needs a snapshot."""
+    if not len(_store):
+        return 0
+    return _recompose(list(_POINT_CACHE))
+
+def add_planif_listener(fn: Callable[[Set[str]], None]) -> None:
+    """Register a callback for changed cote_rue_ids (e.g. to drop cached routes that used them)."""
+    _planif_listeners.append(fn)
+
+def _stale() -> bool:
+    return not _last_loaded_ts or (time.time() - _last_loaded_ts) >= REFRESH_EVERY
+
+async def _download() -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]], str]:
+    """planifications, parsed geomap (None when unchanged since the last build) and the geomap digest."""
     async with httpx.AsyncClient(timeout = 30) as client:
         planif_resp = await client.get(PLANIF_URL)
         planif_resp.raise_for_status()
@@ -205,18 +349,121 @@ async def load_planif_data(force: bool = False) -> None:
 
         geomap_resp = await client.get(GEOMAP_URL)
         geomap_resp.raise_for_status()
-        geomap_data = geomap_resp.json()
-    planif_by_cote: Dict[str, Dict[str, Any]] = {}
-    for rec in planif_data.get("planifications", []):
-        cid = str(rec.get("cote_rue_id"))
-        if cid:
-            planif_by_cote[cid] = rec
-    _planif_by_cote = planif_by_cote
-    _geomap = geomap_data
-    _last_loaded_ts = now
+        digest = hashlib.sha1(geomap_resp.content).hexdigest()
+        geomap_data = geomap_resp.json() if digest != _geomap_digest or not len(_store) else None
+    return planif_data.get("planifications", []), geomap_data, digest
+
+def _build_store(planifications: List[Dict[str, Any]], geomap_data: Optional[Dict[str, Any]], digest: str) -> GeobaseStore:
+    # The parsed JSON is only used to build the compact store and then dropped
+    if geomap_data is None and len(_store):
+        return _store.with_planif(planifications)
+    store = GeobaseStore.build(geomap_data or {}, planifications)
+    store.source_digest = digest
+    return store
+
+def _install_store(new_store: GeobaseStore, loaded_ts: float) -> None:
+    """Swap in a new snapshot and re-compose only the cached results that changed."""
+    global _store, _last_loaded_ts, _geomap_digest
+    old_store = _store
+    first_load = not len(old_store)
+    geobase_changed = not new_store.same_geobase(old_store)
+    changed = set() if first_load else new_store.changed_segments(old_store)
+
+    _store = new_store
+    _geomap_digest = new_store.source_digest
+    _last_loaded_ts = loaded_ts
+    _COTE_STATUS.clear()
+    _SNOW_NEGATIVE_CACHE.clear()  # cells that failed for lack of data can retry now
+
+    if first_load:
+        # Persisted addresses become results straight away, without geocoding
+        rebuild_from_points()
+        return
+    if geobase_changed: # address ranges may have moved, so every cell is re-matched
+        updated = _recompose(list(_SNOW_CACHE))
+    else:
+        updated = _recompose({key for cote_id in changed for key in _COTE_TO_CELLS.get(cote_id, ())})
+    print(f"Planif refresh: {len(changed)} street sides changed, {updated} cached cells updated")
+    for listener in _planif_listeners:
+        try:
+            listener(changed)
+        except Exception as e:
+            print(f"WARNING: planif listener failed: {e}")
+
+def _attach(info: Dict[str, Any]) -> None:
+    global _shared_generation
+    _install_store(shared_store.open_generation(info), info["built_at"])
+    _shared_generation = info["generation"]
+
+def attach_shared_snapshot() -> bool:
+    """Map the published snapshot if it's newer than ours (multi-worker mode). True if attached."""
+    if not shared_store.SHARED_DATA_DIR:
+        return False
+    info = shared_store.read_generation()
+    if info is None or info["generation"] == _shared_generation:
+        return False
+    _attach(info)
+    return True
+
+async def _load_shared(force: bool) -> None:
+    """Multi-worker refresh: one worker builds and publishes, the others map the result."""
+    global _last_loaded_ts
+    info = shared_store.read_generation()
+    if info and not force and time.time() - info["built_at"] < REFRESH_EVERY:
+        if info["generation"] != _shared_generation:
+            _attach(info)
+        return
+    with shared_store.build_lock() as acquired:
+        if not acquired: # another worker is building; check back shortly
+            if info and info["generation"] != _shared_generation:
+                _attach(info)
+            _last_loaded_ts = time.time() - REFRESH_EVERY + SHARED_RETRY_S
+            return
+        latest = shared_store.read_generation()
+        if latest and latest != info and not force: # published while we were waiting for the lock
+            _attach(latest)
+            return
+        now = time.time()
+        new_store = _build_store(*await _download())
+        try:
+            info = await asyncio.to_thread(shared_store.publish, new_store)
+        except ValueError as e: # non-numeric ids: keep this worker's private copy
+            print(f"WARNING: shared snapshot not written ({e})")
+            _install_store(new_store, now)
+            return
+    _attach(info)
+
+async def load_planif_data(force: bool = False) -> None:
+    """
+    Loads data set into memory
+    Refreshes every REFRESH_EVERY seconds unless force=True
+
+    A refresh re-composes the cached snow results whose street side changed
+    state from their stored addresses (no geocoding); everything else stays
+    as it is. With FROSTBYTE_SHARED_DATA_DIR
+    set, the snapshot is built once per host and memory-mapped by every worker
+    (see shared_store.py).
+    """
+    if not force and not _stale():
+        return
+    async with _refresh_lock:
+        if not force and not _stale(): # another caller refreshed while we waited
+            return
+        if shared_store.SHARED_DATA_DIR:
+            await _load_shared(force)
+            return
+        now = time.time()
+        _install_store(_build_store(*await _download()), now)
+
+def _refresh_in_background() -> None:
+    """Refresh a stale snapshot without making the current request wait for it."""
+    global _refresh_task
+    if _refresh_task is None or _refresh_task.done():
+        _refresh_task = asyncio.ensure_future(load_planif_data())
+        _refresh_task.add_done_callback(lambda t: t.cancelled() or t.exception())  # errors retried next time
 
 # reverse geocoding: converting (lat, lon) -> address
-NOMINATIM_URL = "https://nominatim.openstreetmap.org/reverse"
+NOMINATIM_URL = os.getenv("NOMINATIM_URL", "https://nominatim.openstreetmap.org/reverse")
 async def reverse_geocode(lat: float, lon: float) -> Tuple[Optional[str], Optional[int]]:
     params = {
         "format":"jsonv2",
@@ -228,6 +475,7 @@ async def reverse_geocode(lat: float, lon: float) -> Tuple[Optional[str], Option
     headers = {
         "User-Agent":"frost-byte"
     }
+    await scheduler.acquire("nominatim")  # stay under Nominatim's fair-use limit
     async with httpx.AsyncClient(timeout=20) as client:
         r = await client.get(NOMINATIM_URL, params=params, headers=headers)
         r.raise_for_status()
@@ -244,37 +492,11 @@ async def reverse_geocode(lat: float, lon: float) -> Tuple[Optional[str], Option
             house_number = None
     return street, house_number
 
-def _norm(s: str) -> str: # normalizes the address, could vary in capitalization, accents, etc
-    return "".join(ch.lower() for ch in s.strip() if ch.isalnum() or ch.isspace()).strip()
-
 # find the best matching cote_rue_id to the address
+# (narrowest address range containing the house number, or the street's first
+# segment when there is no house number)
 def find_cote_rue_id(street: str, house_number: Optional[int]) -> Optional[str]:
-    if not street:
-        return None
-    street_n = _norm(street)
-    best_id = None
-    best_range = None
-    for cid, info in _geomap.items():
-        nom_voie = info.get("nom_voie")
-        if not nom_voie: # skips entries not the same street name
-            continue
-        if _norm(nom_voie) != street_n:
-            continue
-        if house_number is not None:
-            try: 
-                start = int(info.get("debut_adresse"))
-                end = int(info.get("fin_adresse"))
-            except Exception:
-                continue
-            if start <= house_number <= end:
-                rng = end - start
-                if best_range is None or rng < best_range:
-                    best_range = rng
-                    best_id = str(cid)
-        else: # if there's no house number take the first street match
-            best_id = str(cid)
-            break
-    return best_id
+    return _store.find_cote_rue_id(street, house_number)
 
 # converts the numeric codes in the dataset to state and score
 def etat_to_status_risk(etat: Optional[int]) -> Tuple[str, float]:
@@ -291,63 +513,45 @@ def etat_to_status_risk(etat: Optional[int]) -> Tuple[str, float]:
     }
     return mapping.get(etat, ("unknown", 0.35))
 
+def status_for_cote(cote_id: str) -> Optional[Tuple[str, float]]:
+    """Current (status, risk) of a street side from the loaded snapshot, without any lookup. None if unknown."""
+    pos = _store.index_of(cote_id)
+    if pos is None:
+        return None
+    has_planif, etat = _store.planif_etat(pos)
+    if not has_planif:
+        return ("unknown", 0.3)
+    return etat_to_status_risk(etat)
+
 
 
 async def get_snow_status(lat: float, lon: float) -> Dict[str, Any]:
+    if _last_loaded_ts and _stale():
+        _refresh_in_background()
+
     # Check cache first
     cache_key = _get_snow_cache_key(lat, lon)
     if cache_key in _SNOW_CACHE:
         return _SNOW_CACHE[cache_key]
+    expires = _SNOW_NEGATIVE_CACHE.get(cache_key)
+    if expires is not None:
+        if time.monotonic() < expires:
+            return {"status": "unknown", "risk": 0.3, "source": "fallback_exception_cached"}
+        del _SNOW_NEGATIVE_CACHE[cache_key]
     
     try:
         await load_planif_data()
-        street, house_number = await reverse_geocode(lat, lon)
-        if not street: # if no street then we can't match schedule obvi
-            result = {"status":"unknown", "risk":0.3, "source": "fallback_no_street"}
-            _SNOW_CACHE[cache_key] = result
-            return result
-        
-        cote_id = find_cote_rue_id(street, house_number)
-        if not cote_id:
-            result = {
-                "status": "unknown",
-                "risk": 0.3,
-                "source": "fallback_no_match",
-                "street": street,
-                "house_number": house_number,
-            }
-            _SNOW_CACHE[cache_key] = result
-            return result
-        
-        planif = _planif_by_cote.get(cote_id)
-        if not planif: # no current record for this street
-            result = {
-                "status": "unknown",
-                "risk": 0.3,
-                "source": "fallback_no_planif",
-                "cote_rue_id": cote_id,
-                "street": street,
-                "house_number": house_number,
-            }
-            _SNOW_CACHE[cache_key] = result
-            return result
-        
-        etat = planif.get("etat_deneig")
-        status, risk = etat_to_status_risk(etat)
-        result = {
-                "status": status,
-                "risk": risk,
-                "source": "planif_neige_public_api",
-                "cote_rue_id": cote_id,
-                "street": street,
-                "house_number": house_number,
-            }
-        _SNOW_CACHE[cache_key] = result
+        address = _POINT_CACHE.get(cache_key)
+        if address is None: # only never-seen cells go to Nominatim
+            street, house_number = await reverse_geocode(lat, lon)
+            address = {"street": street, "house_number": house_number}
+            _remember_point(cache_key, address)
+        result = _compose(address)
+        _cache_result(cache_key, result)
         return result
     except Exception:
-        result = {"status": "unknown", "risk": 0.3, "source": "fallback_exception"}
-        _SNOW_CACHE[cache_key] = result
-        return result
+        _SNOW_NEGATIVE_CACHE[cache_key] = time.monotonic() + SNOW_NEGATIVE_TTL_S
+        return {"status": "unknown", "risk": 0.3, "source": "fallback_exception"}
 
 class SnowService(SnowServiceInterface):
     """Real snow service implementation."""
@@ -363,4 +567,5 @@ class SnowService(SnowServiceInterface):
         return {
             "status": result.get("status", "unknown"),
             "risk": result.get("risk", 0.3),
+            "cote_rue_id": result.get("cote_rue_id"),  # lets live sessions re-read by street side
         }
\ No newline at end of file
@@ -0,0 +1,278 @@
+"""
+Compact in-memory store for the geobase map and planif-neige snapshot.
+
+Instead of keeping every parsed JSON record as a dict, segments get a dense
+integer id and their fields live in flat typed arrays:
+
+    street code  -> normalized street name (interned), and the contiguous
+                    range of dense ids on that street (original order kept)
+    dense id     -> cote_rue_id (array('q') when ids are numeric, as in the
+                    real dataset), display name code, debut/fin address
+                    (array('i')), etat_deneig (one byte)
+
+Segments with no street name are dropped since no lookup can reach them.
+"""
+from __future__ import annotations
+
+import sys
+from array import array
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+NO_ADDRESS = -(2 ** 31)  # debut/fin missing or not a number
+NO_PLANIF = 255          # no planif record for this segment
+ETAT_NONE = 254          # record present but etat_deneig is null
+ETAT_OTHER = 253         # record present with a code that doesn't fit in a byte
+_OTHER_CODE = -1         # what ETAT_OTHER decodes to (unknown to etat_to_status_risk)
+
+
+def norm_street(s: str) -> str:
+    """Normalize a street name (case, punctuation, surrounding spaces)."""
+    return "".join(ch.lower() for ch in s.strip() if ch.isalnum() or ch.isspace()).strip()
+
+
+def _to_address(value: Any) -> int:
+    try:
+        return int(value)
+    except Exception:
+        return NO_ADDRESS
+
+
+def encode_etat(etat: Any) -> int:
+    if etat is None:
+        return ETAT_NONE
+    if isinstance(etat, int) and 0 <= etat < ETAT_OTHER:
+        return etat
+    return ETAT_OTHER
+
+
+def decode_etat(code: int) -> Optional[int]:
+    """Byte code -> etat value for etat_to_status_risk (caller checks NO_PLANIF first)."""
+    if code == ETAT_NONE:
+        return None
+    if code == ETAT_OTHER:
+        return _OTHER_CODE
+    return code
+
+
+class SegmentView:
+    """Read-only view of the few fields we use for one street side."""
+    __slots__ = ("cote_rue_id", "nom_voie", "debut_adresse", "fin_adresse", "etat_deneig", "has_planif")
+
+    def __init__(self, cote_rue_id, nom_voie, debut_adresse, fin_adresse, etat_deneig, has_planif):
+        self.cote_rue_id = cote_rue_id
+        self.nom_voie = nom_voie
+        self.debut_adresse = debut_adresse
+        self.fin_adresse = fin_adresse
+        self.etat_deneig = etat_deneig
+        self.has_planif = has_planif
+
+    def __repr__(self):
+        return (f"SegmentView({self.cote_rue_id!r}, {self.nom_voie!r}, "
+                f"{self.debut_adresse}-{self.fin_adresse}, etat={self.etat_deneig})")
+
+
+class GeobaseStore:
+    __slots__ = (
+        "_cote_num", "_cote_str", "street_names", "street_start", "display_names", "display_code",
+        "debut", "fin", "etat", "_street_index", "_sorted_ids", "_sorted_pos", "_id_index",
+        "source_digest",
+    )
+
+    def __init__(self):
+        self._cote_num = array("q")            # dense id -> cote_rue_id (numeric ids)
+        self._cote_str: Optional[List[str]] = None  # dense id -> cote_rue_id (otherwise)
+        self.street_names: List[str] = []      # street code -> normalized name (sorted)
+        self.street_start = array("I", [0])    # street code -> first dense id (len = streets + 1)
+        self.display_names: List[str] = []     # interned original spellings
+        self.display_code = array("I")         # dense id -> index into display_names
+        self.debut = array("i")
+        self.fin = array("i")
+        self.etat = bytearray()
+        self._street_index: Dict[str, int] = {}
+        # cote_rue_id -> dense id, as sorted integer keys when ids are numeric (the usual case)
+        self._sorted_ids = array("q")
+        self._sorted_pos = array("I")
+        self._id_index: Optional[Dict[str, int]] = None
+        self.source_digest: Optional[str] = None  # digest of the geobase file this was built from
+
+    # ---- building ----
+
+    @classmethod
+    def build(cls, geomap: Dict[str, Dict[str, Any]], planifications: Iterable[Dict[str, Any]] = ()) -> "GeobaseStore":
+        store = cls()
+        by_street: Dict[str, List[Tuple[str, str, int, int]]] = {}
+        for cid, info in geomap.items():
+            nom_voie = info.get("nom_voie")
+            if not nom_voie:
+                continue
+            name = sys.intern(nom_voie)
+            by_street.setdefault(norm_street(nom_voie), []).append(
+                (sys.intern(str(cid)), name, _to_address(info.get("debut_adresse")), _to_address(info.get("fin_adresse")))
+            )
+
+        cote_ids: List[str] = []
+        display_index: Dict[str, int] = {}
+        for street in sorted(by_street):
+            store._street_index[street] = len(store.street_names)
+            store.street_names.append(sys.intern(street))
+            for cid, name, debut, fin in by_street[street]:
+                code = display_index.get(name)
+                if code is None:
+                    code = display_index[name] = len(store.display_names)
+                    store.display_names.append(name)
+                cote_ids.append(cid)
+                store.display_code.append(code)
+                store.debut.append(debut)
+                store.fin.append(fin)
+            store.street_start.append(len(cote_ids))
+        store.etat = bytearray([NO_PLANIF]) * len(cote_ids)
+        store._build_id_index(cote_ids)
+        store.apply_planif(planifications)
+        return store
+
+    def _build_id_index(self, cote_ids: List[str]) -> None:
+        try:
+            nums = [int(cid) for cid in cote_ids]
+            numeric = all(str(n) == cid for n, cid in zip(nums, cote_ids))  # "0123" must stay a string
+        except ValueError:
+            numeric = False
+        if not numeric:
+            self._cote_str = cote_ids
+            self._id_index = {cid: pos for pos, cid in enumerate(cote_ids)}
+            return
+        self._cote_num = array("q", nums)
+        keyed = sorted((n, pos) for pos, n in enumerate(nums))
+        self._sorted_ids = array("q", (k for k, _ in keyed))
+        self._sorted_pos = array("I", (p for _, p in keyed))
+
+    def apply_planif(self, planifications: Iterable[Dict[str, Any]]) -> None:
+        """Overwrite etat codes from planif records (later records win, like a dict load)."""
+        etat = self.etat
+        for rec in planifications:
+            pos = self.index_of(str(rec.get("cote_rue_id")))
+            if pos is not None:
+                etat[pos] = encode_etat(rec.get("etat_deneig"))
+
+    def with_planif(self, planifications: Iterable[Dict[str, Any]]) -> "GeobaseStore":
+        """New store sharing the geobase arrays with a fresh planif snapshot."""
+        store = GeobaseStore.__new__(GeobaseStore)
+        for slot in GeobaseStore.__slots__:
+            setattr(store, slot, getattr(self, slot))
+        store.etat = bytearray([NO_PLANIF]) * len(self)
+        store.apply_planif(planifications)
+        return store
+
+    def same_geobase(self, other: "GeobaseStore") -> bool:
+        """True when both stores share the same geobase (only planif differs)."""
+        if self.debut is other.debut:
+            return True
+        # e.g. two memory-mapped generations built from the same geobase file
+        return self.source_digest is not None and self.source_digest == other.source_digest
+
+    def changed_segments(self, old: "GeobaseStore") -> Set[str]:
+        """cote_rue_ids whose planif state differs from `old` (including segments added or removed)."""
+        changed: Set[str] = set()
+        if self.same_geobase(old):
+            new_etat, old_etat = self.etat, old.etat
+            for pos in range(len(self)):
+                if new_etat[pos] != old_etat[pos]:
+                    changed.add(self.cote_id(pos))
+            return changed
+        for pos in range(len(self)):
+            cid = self.cote_id(pos)
+            old_pos = old.index_of(cid)
+            old_code = old.etat[old_pos] if old_pos is not None else None
+            if old_code != self.etat[pos]:
+                changed.add(cid)
+        for pos in range(len(old)):
+            cid = old.cote_id(pos)
+            if self.index_of(cid) is None:
+                changed.add(cid)
+        return changed
+
+    # ---- lookups ----
+
+    def __len__(self) -> int:
+        return len(self.debut)
+
+    def cote_id(self, pos: int) -> str:
+        if self._cote_str is not None:
+            return self._cote_str[pos]
+        return str(self._cote_num[pos])
+
+    def index_of(self, cote_id: str) -> Optional[int]:
+        if self._id_index is not None:
+            return self._id_index.get(cote_id)
+        try:
+            key = int(cote_id)
+        except (TypeError, ValueError):
+            return None
+        if str(key) != cote_id:  # " 12" or "012" are different ids
+            return None
+        i = bisect_left(self._sorted_ids, key)
+        if i < len(self._sorted_ids) and self._sorted_ids[i] == key:
+            return self._sorted_pos[i]
+        return None
+
+    def find(self, street: str, house_number: Optional[int]) -> Optional[int]:
+        """Dense id of the best matching street side (narrowest address range), or None."""
+        if not street:
+            return None
+        code = self._street_index.get(norm_street(street))
+        if code is None:
+            return None
+        first, last = self.street_start[code], self.street_start[code + 1]
+        if house_number is None:  # no house number: first segment on the street
+            return first
+        best = None
+        best_range = None
+        debut, fin = self.debut, self.fin
+        for pos in range(first, last):
+            start, end = debut[pos], fin[pos]
+            if start == NO_ADDRESS or end == NO_ADDRESS:
+                continue
+            if start <= house_number <= end:
+                rng = end - start
+                if best_range is None or rng < best_range:
+                    best_range = rng
+                    best = pos
+        return best
+
+    def find_cote_rue_id(self, street: str, house_number: Optional[int]) -> Optional[str]:
+        pos = self.find(street, house_number)
+        return self.cote_id(pos) if pos is not None else None
+
+    def planif_etat(self, pos: int) -> Tuple[bool, Optional[int]]:
+        """(has planif record, etat_deneig) for a dense id."""
+        code = self.etat[pos]
+        if code == NO_PLANIF:
+            return False, None
+        return True, decode_etat(code)
+
+    def view(self, pos: int) -> SegmentView:
+        has_planif, etat = self.planif_etat(pos)
+        debut, fin = self.debut[pos], self.fin[pos]
+        return SegmentView(
+            self.cote_id(pos),
+            self.display_names[self.display_code[pos]],
+            None if debut == NO_ADDRESS else debut,
+            None if fin == NO_ADDRESS else fin,
+            etat,
+            has_planif,
+        )
+
+    def memory_bytes(self) -> int:
+        """Rough footprint of the store (arrays, strings and indexes)."""
+        size = sum(sys.getsizeof(a) for a in (
+            self._cote_num, self.street_start, self.display_code, self.debut, self.fin, self.etat,
+            self._sorted_ids, self._sorted_pos,
+        ))
+        if self._cote_str is not None:
+            size += sys.getsizeof(self._cote_str) + sum(sys.getsizeof(s) for s in self._cote_str)
+        size += sys.getsizeof(self.street_names) + sum(sys.getsizeof(s) for s in self.street_names)
+        size += sys.getsizeof(self.display_names) + sum(sys.getsizeof(s) for s in self.display_names)
+        size += sys.getsizeof(self._street_index)
+        if self._id_index is not None:
+            size += sys.getsizeof(self._id_index)
+        return size
@@ -0,0 +1,282 @@
+"""
+Snow-status vector tiles (Mapbox Vector Tile v2) for the map overlay.
+
+Each street side with geometry becomes a line feature carrying its planif-neige
+state (etat_deneig mapped through etat_to_status_risk). The geobase map has no
+geometry, so segment lines come from the city's Géobase "côté de rue" GeoJSON
+(FROSTBYTE_SNOW_TILES_GEOMETRY, a local file with a COTE_RUE_ID property per
+LineString/MultiLineString feature). Without it the endpoint serves nothing.
+
+Tiles for zooms MIN_ZOOM..MAX_ZOOM are built in a background thread whenever a
+new planif snapshot is installed: a full build when the geobase changes (or the
+first time), otherwise only the tiles containing street sides whose state
+changed. They are kept gzip-compressed with a content hash as ETag, so serving
+a tile is a dict lookup and an unchanged tile keeps its ETag across refreshes.
+
+Config (environment):
+    FROSTBYTE_SNOW_TILES_GEOMETRY   Géobase côté-de-rue GeoJSON path (feature disabled if unset)
+    FROSTBYTE_SNOW_TILES_CHECK_S    how often to check for a new planif snapshot (default 10)
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+import math
+import os
+import struct
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from services import snow
+
+SNOW_TILES_GEOMETRY = os.getenv("FROSTBYTE_SNOW_TILES_GEOMETRY")
+SNOW_TILES_CHECK_S = float(os.getenv("FROSTBYTE_SNOW_TILES_CHECK_S", "10"))
+MIN_ZOOM = 13
+MAX_ZOOM = 16
+EXTENT = 4096  # tile coordinate units (MVT default)
+BUFFER = 64    # features within this many units of a tile edge are included
+LAYER = "snow"
+_EXTENT_BITS = 12
+_KEYS = ("cote_rue_id", "status", "risk")
+
+TileKey = Tuple[int, int, int]  # (z, x, y)
+
+# cote_rue_id -> world coordinates at MAX_ZOOM * EXTENT, one array('i') (x, y, x, y...) per part
+_geometry: Optional[Dict[str, List[array]]] = None
+_tiles: Dict[TileKey, Tuple[bytes, str]] = {}  # -> (gzip'd tile, ETag)
+_tile_segments: Dict[TileKey, List[str]] = {}   # street sides drawn in each tile
+_segment_tiles: Dict[str, List[TileKey]] = {}   # reverse index for incremental rebuilds
+_built_store = None
+_status: Dict[str, Any] = {"tiles": 0, "segments": 0, "last_build": None}
+
+
+# ---- protobuf / MVT encoding ----
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _zigzag(value: int) -> int:
+    return (value << 1) ^ (value >> 31)
+
+
+def _field(number: int, payload: bytes) -> bytes:
+    """Length-delimited field."""
+    return _varint((number << 3) | 2) + _varint(len(payload)) + payload
+
+
+def _uint_field(number: int, value: int) -> bytes:
+    return _varint(number << 3) + _varint(value)
+
+
+def _packed(number: int, values: Iterable[int]) -> bytes:
+    return _field(number, b"".join(_varint(v) for v in values))
+
+
+def _value(value: Any) -> bytes:
+    if isinstance(value, str):
+        return _field(1, value.encode("utf-8"))
+    if isinstance(value, float):
+        return _varint((3 << 3) | 1) + struct.pack("<d", value)  # double
+    return _uint_field(5, value)
+
+
+def _line_geometry(parts: Iterable[List[Tuple[int, int]]]) -> List[int]:
+    """MVT command stream (MoveTo + LineTo per part, zigzag deltas)."""
+    commands: List[int] = []
+    cx = cy = 0
+    for points in parts:
+        commands.append((1 & 7) | (1 << 3))
+        x, y = points[0]
+        commands += (_zigzag(x - cx), _zigzag(y - cy))
+        cx, cy = x, y
+        commands.append((2 & 7) | ((len(points) - 1) << 3))
+        for x, y in points[1:]:
+            commands += (_zigzag(x - cx), _zigzag(y - cy))
+            cx, cy = x, y
+    return commands
+
+
+def encode_tile(features: List[Tuple[Optional[int], Dict[str, Any], List[List[Tuple[int, int]]]]]) -> bytes:
+    """One-layer MVT from (id, properties, line parts in tile coordinates)."""
+    values: Dict[Any, int] = {}
+    encoded = []
+    for feature_id, properties, parts in features:
+        tags = []
+        for key, value in properties.items():
+            tags.append(_KEYS.index(key))
+            tags.append(values.setdefault((type(value), value), len(values)))
+        body = b""
+        if feature_id is not None:
+            body += _uint_field(1, feature_id)
+        body += _packed(2, tags) + _uint_field(3, 2) + _packed(4, _line_geometry(parts))  # type 2 = LINESTRING
+        encoded.append(_field(2, body))
+    layer = b"".join((
+        _uint_field(15, 2),
+        _field(1, LAYER.encode()),
+        *encoded,
+        *(_field(3, key.encode()) for key in _KEYS),
+        *(_field(4, _value(value)) for _, value in values),
+        _uint_field(5, EXTENT),
+    ))
+    return _field(3, layer)
+
+
+# ---- geometry ----
+
+def _world(lon: float, lat: float) -> Tuple[int, int]:
+    """Web-mercator position in MAX_ZOOM tile units * EXTENT."""
+    scale = (1 << (MAX_ZOOM + _EXTENT_BITS))
+    lat = max(min(lat, 85.0511), -85.0511)
+    x = (lon + 180) / 360 * scale
+    y = (1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * scale
+    return int(x), int(y)
+
+
+def _cote_id(value: Any) -> str:
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+
+def load_geometry(path: str) -> Dict[str, List[array]]:
+    """cote_rue_id -> projected line parts from a Géobase côté-de-rue GeoJSON file."""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    geometry: Dict[str, List[array]] = {}
+    for feature in data.get("features", []):
+        properties = feature.get("properties") or {}
+        cote_id = properties.get("COTE_RUE_ID", properties.get("cote_rue_id"))
+        geom = feature.get("geometry") or {}
+        if cote_id is None or geom.get("type") not in ("LineString", "MultiLineString"):
+            continue
+        lines = [geom["coordinates"]] if geom["type"] == "LineString" else geom["coordinates"]
+        parts = geometry.setdefault(_cote_id(cote_id), [])
+        for line in lines:
+            if len(line) >= 2:
+                parts.append(array("i", [v for lon, lat, *_ in line for v in _world(lon, lat)]))
+    return geometry
+
+
+def _tiles_of(parts: List[array], z: int) -> Set[Tuple[int, int]]:
+    """Tiles at zoom z touched by the buffered bounding box of a segment."""
+    shift = MAX_ZOOM - z
+    xs = [v >> shift for part in parts for v in part[0::2]]
+    ys = [v >> shift for part in parts for v in part[1::2]]
+    return {
+        (x, y)
+        for x in range((min(xs) - BUFFER) >> _EXTENT_BITS, ((max(xs) + BUFFER) >> _EXTENT_BITS) + 1)
+        for y in range((min(ys) - BUFFER) >> _EXTENT_BITS, ((max(ys) + BUFFER) >> _EXTENT_BITS) + 1)
+    }
+
+
+def _tile_parts(parts: List[array], z: int, x: int, y: int) -> List[List[Tuple[int, int]]]:
+    """Line parts in tile coordinates, dropping points that land on the previous one."""
+    shift = MAX_ZOOM - z
+    ox, oy = x << _EXTENT_BITS, y << _EXTENT_BITS
+    out = []
+    for part in parts:
+        points: List[Tuple[int, int]] = []
+        for i in range(0, len(part), 2):
+            point = ((part[i] >> shift) - ox, (part[i + 1] >> shift) - oy)
+            if not points or point != points[-1]:
+                points.append(point)
+        if len(points) >= 2:
+            out.append(points)
+    return out
+
+
+# ---- building ----
+
+def _properties(store, cote_id: str) -> Optional[Tuple[Optional[int], Dict[str, Any]]]:
+    pos = store.index_of(cote_id)
+    if pos is None:
+        return None
+    _, etat = store.planif_etat(pos)
+    status, risk = snow.etat_to_status_risk(etat)
+    feature_id = int(cote_id) if cote_id.isdigit() else None
+    return feature_id, {"cote_rue_id": feature_id if feature_id is not None else cote_id, "status": status, "risk": risk}
+
+
+def _render(store, key: TileKey) -> Optional[Tuple[bytes, str]]:
+    z, x, y = key
+    features = []
+    for cote_id in _tile_segments.get(key, ()):
+        props = _properties(store, cote_id)
+        parts = _tile_parts(_geometry[cote_id], z, x, y)
+        if props is not None and parts:
+            features.append((props[0], props[1], parts))
+    if not features:
+        return None
+    raw = encode_tile(features)
+    return gzip.compress(raw, 6), f'"{hashlib.sha1(raw).hexdigest()[:16]}"'
+
+
+def _index() -> None:
+    _tile_segments.clear()
+    _segment_tiles.clear()
+    for cote_id, parts in _geometry.items():
+        if not parts:
+            continue
+        keys = [(z, x, y) for z in range(MIN_ZOOM, MAX_ZOOM + 1) for x, y in _tiles_of(parts, z)]
+        _segment_tiles[cote_id] = keys
+        for key in keys:
+            _tile_segments.setdefault(key, []).append(cote_id)
+
+
+def rebuild(store, changed: Optional[Set[str]] = None) -> int:
+    """Render all tiles (changed=None) or only those containing `changed` street sides. Returns tiles rendered."""
+    global _geometry, _tiles
+    if _geometry is None:
+        _geometry = load_geometry(SNOW_TILES_GEOMETRY)
+        _index()
+    if changed is None:
+        keys = list(_tile_segments)
+    else:
+        keys = list({key for cote_id in changed for key in _segment_tiles.get(cote_id, ())})
+    rendered = {key: _render(store, key) for key in keys}
+    if changed is None:
+        _tiles = {key: tile for key, tile in rendered.items() if tile is not None}
+    else:
+        for key, tile in rendered.items():
+            if tile is None:
+                _tiles.pop(key, None)
+            else:
+                _tiles[key] = tile
+    _status.update(tiles=len(_tiles), segments=len(_segment_tiles))
+    return len(keys)
+
+
+def get_tile(z: int, x: int, y: int) -> Optional[Tuple[bytes, str]]:
+    """(gzip'd MVT, ETag) or None when the tile has no street sides."""
+    return _tiles.get((z, x, y))
+
+
+async def refresh_forever() -> None:
+    """Rebuild tiles after every planif snapshot swap (see snow._install_store)."""
+    global _built_store
+    if not SNOW_TILES_GEOMETRY:
+        return
+    while True:
+        store = snow._store
+        if store is not _built_store and len(store):
+            try:
+                if _built_store is None or not store.same_geobase(_built_store):
+                    count = await asyncio.to_thread(rebuild, store)
+                else:
+                    count = await asyncio.to_thread(rebuild, store, store.changed_segments(_built_store))
+                _built_store = store
+                _status["last_build"] = {"tiles_rendered": count}
+                print(f"Snow tiles: {count} tiles rendered, {len(_tiles)} non-empty")
+            except Exception as e:
+                print(f"WARNING: snow tile build failed: {e}")
+        await asyncio.sleep(SNOW_TILES_CHECK_S)
+
+
+def status() -> Dict[str, Any]:
+    return {"enabled": bool(SNOW_TILES_GEOMETRY), **_status}
@@ -0,0 +1,79 @@
+"""
+Startup warmup and readiness (see /healthz and /readyz in main.py).
+
+Importing the app does no I/O. The lifespan hook starts `warm_up()`, which
+loads the planif/geobase datasets and persisted geocodes and builds the Gemini
+client in the background, so the process starts listening at once.
+/readyz reports not-ready until the datasets are in memory, so a load balancer only sends traffic
+to warm pods.
+
+If the datasets still aren't loaded after READY_TIMEOUT_S (e.g. the city API
+is down), the pod reports ready anyway. Snow lookups then fall back to
+"unknown", as they would during a runtime outage. Otherwise every pod would stay out of
+rotation. The load keeps being retried every RETRY_S until it succeeds.
+"""
+import asyncio
+import os
+import time
+from typing import Any, Dict
+
+from services import config, disk_cache, shelter_index, snow
+from services.scoring import gemini
+
+READY_TIMEOUT_S = float(os.getenv("FROSTBYTE_READY_TIMEOUT_S", "120"))
+RETRY_S = float(os.getenv("FROSTBYTE_STARTUP_RETRY_S", "10"))
+
+_started = time.monotonic()
+_steps: Dict[str, Dict[str, Any]] = {}
+
+
+async def _step(name: str, fn) -> bool:
+    began = time.monotonic()
+    try:
+        await fn()
+    except Exception as e:
+        _steps[name] = {"ok": False, "error": str(e) or repr(e), "seconds": round(time.monotonic() - began, 3)}
+        print(f"WARNING: startup step {name} failed: {_steps[name]['error']}")
+        return False
+    _steps[name] = {"ok": True, "seconds": round(time.monotonic() - began, 3)}
+    return True
+
+
+async def warm_up() -> None:
+    """Load datasets and warm clients; retries the dataset load until it succeeds."""
+    global _started
+    _started = time.monotonic()
+    print(f"Config: {config.summary()}")
+    # Slow import + client setup off the event loop; the explanation falls back if this fails
+    await _step("gemini_client", lambda: asyncio.to_thread(gemini.warm_up))
+    # Open (and create) the disk cache here rather than on the first request's lookup
+    await _step("disk_cache", lambda: asyncio.to_thread(disk_cache.open_cache))
+    # Geocoded addresses from earlier runs (FROSTBYTE_SNOW_POINT_CACHE): no Nominatim calls for known cells
+    if await _step("snow_point_cache", lambda: asyncio.to_thread(snow.load_point_cache)):
+        snow.rebuild_from_points()
+    while True:
+        # Multi-worker mode: another worker may be building; its snapshot is mapped once published
+        snow.attach_shared_snapshot()
+        await _step("snow_datasets", snow.load_planif_data)
+        if datasets_loaded():
+            break
+        await asyncio.sleep(RETRY_S)
+    print(f"Startup: warm after {time.monotonic() - _started:.1f}s")
+
+
+def datasets_loaded() -> bool:
+    return len(snow._store) > 0
+
+
+def readiness() -> Dict[str, Any]:
+    """Readiness report; "ready" is False until the datasets are loaded (or READY_TIMEOUT_S passes)."""
+    loaded = datasets_loaded()
+    waited = time.monotonic() - _started
+    return {
+        "ready": loaded or waited >= READY_TIMEOUT_S,
+        "datasets": {
+            "snow": {"loaded": loaded, "segments": len(snow._store), "loaded_at": snow._last_loaded_ts or None},
+            "shelter_index": shelter_index.status()["loaded"],
+        },
+        "startup": {"seconds": round(waited, 1), "steps": dict(_steps)},
+    }
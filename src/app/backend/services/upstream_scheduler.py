@@ -0,0 +1,213 @@
+"""
+Central rate-limit scheduler for fair-use upstreams (Overpass, Nominatim).
+
+Every call to a limited upstream first awaits `scheduler.acquire(name)`.
+Each upstream has a token bucket; callers that can't get a token right away
+wait in a queue ordered by priority (interactive before batch/prefetch) and,
+within a priority, round-robin across request flows so one long route can't
+starve short ones.
+
+The flow and priority come from context variables set per request with
+`request_context(...)`, so service code does not need to pass them around.
+"""
+import asyncio
+import itertools
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Optional
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 1
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_BATCH: "batch"}
+
+_flow_id: ContextVar[Optional[str]] = ContextVar("frostbyte_flow_id", default=None)
+_priority: ContextVar[int] = ContextVar("frostbyte_priority", default=PRIORITY_INTERACTIVE)
+_anonymous_flows = itertools.count()
+
+_WAIT_SAMPLES = 1000  # recent waits kept per upstream for percentiles
+
+
+@contextmanager
+def request_context(flow_id: str, priority: int = PRIORITY_INTERACTIVE):
+    """Tag upstream calls made inside this block with a flow id and priority."""
+    flow_token = _flow_id.set(flow_id)
+    priority_token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _flow_id.reset(flow_token)
+        _priority.reset(priority_token)
+
+
+class TokenBucket:
+    def __init__(self, rate_per_s: float, burst: float):
+        self.rate_per_s = rate_per_s
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate_per_s)
+        self.updated = now
+
+    def take(self) -> bool:
+        self._refill()
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+    def seconds_until_token(self) -> float:
+        self._refill()
+        if self.tokens >= 1.0:
+            return 0.0
+        return (1.0 - self.tokens) / self.rate_per_s
+
+
+class UpstreamQueue:
+    """Token bucket plus a priority / per-flow round-robin wait queue for one upstream."""
+
+    def __init__(self, name: str, rate_per_s: float, burst: float):
+        self.name = name
+        self.bucket = TokenBucket(rate_per_s, burst)
+        # priority -> flow id -> waiting futures (OrderedDict order = round-robin order)
+        self._waiting: Dict[int, "OrderedDict[str, Deque[asyncio.Future]]"] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._timer_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._waits_ms: Deque[float] = deque(maxlen=_WAIT_SAMPLES)
+        self.granted = 0
+        self.max_depth = 0
+
+    def depth(self, priority: Optional[int] = None) -> int:
+        levels = [priority] if priority is not None else list(self._waiting)
+        return sum(
+            sum(1 for f in q if not f.done())
+            for level in levels
+            for q in self._waiting.get(level, {}).values()
+        )
+
+    async def acquire(self) -> float:
+        """Wait for a token; returns the time waited in seconds."""
+        if not self._waiting and self.bucket.take():
+            self._record(0.0)
+            return 0.0
+
+        flow = _flow_id.get() or f"anonymous-{next(_anonymous_flows)}"
+        priority = _priority.get()
+        future = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(priority, OrderedDict()).setdefault(flow, deque()).append(future)
+        self.max_depth = max(self.max_depth, self.depth())
+
+        t0 = time.monotonic()
+        self._pump()
+        try:
+            await future  # cancelled waiters are skipped by _pump
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Cancelled after being granted a token: hand it to the next waiter
+                self.bucket.tokens = min(self.bucket.burst, self.bucket.tokens + 1.0)
+                self._pump()
+            raise
+        waited = time.monotonic() - t0
+        self._record(waited)
+        return waited
+
+    def _record(self, waited_s: float) -> None:
+        self.granted += 1
+        self._waits_ms.append(waited_s * 1000)
+
+    def _next_waiter(self) -> Optional[asyncio.Future]:
+        for priority in sorted(self._waiting):
+            flows = self._waiting[priority]
+            while flows:
+                flow, queue = next(iter(flows.items()))
+                future = queue.popleft()
+                if queue:
+                    flows.move_to_end(flow)  # this flow goes to the back of the line
+                else:
+                    del flows[flow]
+                if not future.done() and not future.get_loop().is_closed():
+                    return future
+            del self._waiting[priority]
+        return None
+
+    def _pump(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._timer is not None and (self._timer_loop is not loop or self._timer_loop.is_closed()):
+            # The queue outlives event loops (TestClient, benchmarks, lifespan restarts);
+            # a timer left on an old loop would never fire
+            self._timer.cancel()
+            self._timer = None
+        while self._waiting:
+            delay = self.bucket.seconds_until_token()
+            if delay > 0:
+                if self._timer is None:
+                    self._timer = loop.call_later(delay, self._on_timer)
+                    self._timer_loop = loop
+                return
+            future = self._next_waiter()
+            if future is None:
+                return
+            self.bucket.take()
+            future.set_result(None)
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._pump()
+
+    def stats(self) -> Dict[str, Any]:
+        waits = sorted(self._waits_ms)
+
+        def pct(p: float) -> float:
+            if not waits:
+                return 0.0
+            return round(waits[min(int(p / 100 * len(waits)), len(waits) - 1)], 1)
+
+        return {
+            "rate_per_s": self.bucket.rate_per_s,
+            "burst": self.bucket.burst,
+            "queue_depth": {PRIORITY_NAMES.get(p, str(p)): self.depth(p) for p in (PRIORITY_INTERACTIVE, PRIORITY_BATCH)},
+            "max_queue_depth": self.max_depth,
+            "granted": self.granted,
+            "wait_ms": {
+                "mean": round(sum(waits) / len(waits), 1) if waits else 0.0,
+                "p50": pct(50),
+                "p95": pct(95),
+                "max": round(waits[-1], 1) if waits else 0.0,
+            },
+        }
+
+
+class UpstreamScheduler:
+    def __init__(self):
+        self._queues: Dict[str, UpstreamQueue] = {}
+
+    def configure(self, name: str, rate_per_s: float, burst: float) -> None:
+        self._queues[name] = UpstreamQueue(name, rate_per_s, burst)
+
+    async def acquire(self, name: str) -> float:
+        queue = self._queues.get(name)
+        if queue is None:  # unknown upstreams are not limited
+            return 0.0
+        return await queue.acquire()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: q.stats() for name, q in self._queues.items()}
+
+
+scheduler = UpstreamScheduler()
+# Nominatim's usage policy allows at most 1 request/s, so no bursts either; Overpass asks for modest parallelism
+scheduler.configure(
+    "nominatim",
+    float(os.getenv("NOMINATIM_RATE_PER_S", "1")),
+    float(os.getenv("NOMINATIM_BURST", "1")),
+)
+scheduler.configure(
+    "overpass",
+    float(os.getenv("OVERPASS_RATE_PER_S", "2")),
+    float(os.getenv("OVERPASS_BURST", "10")),
+)
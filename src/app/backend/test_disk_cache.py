@@ -0,0 +1,63 @@
+import os
+import sqlite3
+
+from services import disk_cache
+
+
+def _fill(cache, count, start=0, source="overpass"):
+    for i in range(start, start + count):
+        cache.put(source, f"{i}", {"building_count_40m": i, "heights": [i * 0.37 % 31 for _ in range(20)]})
+
+
+def _stored_bytes(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(f"SELECT COALESCE(SUM({disk_cache._ROW_BYTES}), 0) FROM entries").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_eviction_settles_near_evict_to(tmp_path):
+    path = str(tmp_path / "l2.sqlite")
+    cache = disk_cache.DiskCache(path, max_bytes=10 * 1024 * 1024)
+    _fill(cache, 5000)
+    cache.close()
+    full = _stored_bytes(path)
+
+    # Reopen with a limit well under what is stored: one eviction pass lands just under EVICT_TO
+    limit = full // 2
+    cache = disk_cache.DiskCache(path, max_bytes=limit)
+    cache.close()
+    assert cache._bytes == full
+    conn = cache._connect()
+    cache._evict(conn)
+    conn.close()
+    target = limit * disk_cache.EVICT_TO
+    assert target * 0.99 <= cache._bytes <= target
+    assert cache._bytes == _stored_bytes(path)
+    assert cache.get("overpass", "0") is None  # oldest went first
+    assert cache.get("overpass", "4999")["building_count_40m"] == 4999
+
+    # Writing far past the limit keeps the store between EVICT_TO and the limit
+    cache = disk_cache.DiskCache(path, max_bytes=limit)
+    _fill(cache, 20000, start=5000)
+    cache.close()
+    assert target * 0.99 <= cache._bytes <= limit
+    assert cache._bytes == _stored_bytes(path)
+    assert os.path.getsize(path) < full * 2
+
+
+def test_expired_rows_are_evicted_first(tmp_path, monkeypatch):
+    path = str(tmp_path / "l2.sqlite")
+    cache = disk_cache.DiskCache(path, max_bytes=10 * 1024 * 1024)
+    monkeypatch.setitem(disk_cache.SOURCE_TTL_S, "openmeteo", -1)
+    _fill(cache, 1000, source="openmeteo")
+    _fill(cache, 500)
+    cache.close()
+
+    # Just over the limit; dropping the expired rows alone gets under EVICT_TO
+    cache = disk_cache.DiskCache(path, max_bytes=cache._bytes - 1)
+    conn = cache._connect()
+    cache._evict(conn)
+    conn.close()
+    assert cache.status()["entries"] == {"overpass": 500}
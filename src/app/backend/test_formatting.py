@@ -0,0 +1,43 @@
+from api.formatting import encode_polyline, quantize_coordinates
+
+# Google's reference example (GeoJSON order: [lon, lat])
+_GOOGLE_POINTS = [[-120.2, 38.5], [-120.95, 40.7], [-126.453, 43.252]]
+_GOOGLE_ENCODED = "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+
+
+def _decode_polyline(encoded, precision=5):
+    coords, index, lat, lng = [], 0, 0, 0
+    while index < len(encoded):
+        deltas = []
+        for _ in range(2):
+            shift = result = 0
+            while True:
+                b = ord(encoded[index]) - 63
+                index += 1
+                result |= (b & 0x1F) << shift
+                shift += 5
+                if b < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lng += deltas[1]
+        coords.append([lng / 10 ** precision, lat / 10 ** precision])
+    return coords
+
+
+def test_encode_polyline_matches_google_reference():
+    assert encode_polyline(_GOOGLE_POINTS) == _GOOGLE_ENCODED
+
+
+def test_encodings_round_trip():
+    coords = [[-73.5673, 45.5017], [-73.566012, 45.502388], [-73.5534, 45.5088], [-73.5534, 45.5088]]
+    assert _decode_polyline(encode_polyline(coords)) == [[round(x, 5), round(y, 5)] for x, y in coords]
+
+    flat = quantize_coordinates(coords)
+    lat = lng = 0
+    decoded = []
+    for dlat, dlng in zip(flat[::2], flat[1::2]):
+        lat += dlat
+        lng += dlng
+        decoded.append([lng / 10 ** 6, lat / 10 ** 6])
+    assert decoded == coords
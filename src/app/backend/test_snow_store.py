@@ -0,0 +1,64 @@
+import random
+
+from services.snow_store import GeobaseStore, norm_street
+
+
+def _dict_scan(geomap, street, house_number):
+    """find_cote_rue_id as it was before GeobaseStore: a scan over the geobase dict."""
+    if not street:
+        return None
+    street_n = norm_street(street)
+    best_id = None
+    best_range = None
+    for cid, info in geomap.items():
+        nom_voie = info.get("nom_voie")
+        if not nom_voie:
+            continue
+        if norm_street(nom_voie) != street_n:
+            continue
+        if house_number is not None:
+            try:
+                start = int(info.get("debut_adresse"))
+                end = int(info.get("fin_adresse"))
+            except Exception:
+                continue
+            if start <= house_number <= end:
+                rng = end - start
+                if best_range is None or rng < best_range:
+                    best_range = rng
+                    best_id = str(cid)
+        else:
+            best_id = str(cid)
+            break
+    return best_id
+
+
+def _geomap(rng, string_ids=False):
+    streets = ["Rue Sainte-Catherine", "rue sainte catherine", "Boulevard Saint-Laurent", "Avenue du Parc", "Rue Peel"]
+    geomap = {}
+    for i in range(400):
+        cid = f"C{i:04d}" if string_ids else str(10000 + rng.randrange(10 ** 6) * 7 + i)
+        start = rng.randrange(0, 2000)
+        info = {
+            "nom_voie": rng.choice(streets + [None, ""]),
+            "debut_adresse": rng.choice([start, str(start), None, "n/a"]),
+            "fin_adresse": start + rng.randrange(0, 400),
+        }
+        geomap[cid] = info
+    return geomap
+
+
+def _queries(rng):
+    streets = ["Rue Sainte-Catherine", "RUE SAINTE-CATHERINE ", "Boulevard Saint-Laurent", "Avenue du Parc",
+               "Rue Peel", "Rue Inconnue", ""]
+    return [(rng.choice(streets), rng.choice([None, rng.randrange(0, 2400)])) for _ in range(2000)]
+
+
+def test_find_cote_rue_id_matches_dict_scan():
+    rng = random.Random(7)
+    for string_ids in (False, True):
+        geomap = _geomap(rng, string_ids)
+        store = GeobaseStore.build(geomap)
+        for street, house_number in _queries(rng):
+            assert store.find_cote_rue_id(street, house_number) == _dict_scan(geomap, street, house_number), \
+                (street, house_number, string_ids)